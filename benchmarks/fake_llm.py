@@ -0,0 +1,65 @@
+"""Deterministic local stand-in for the ChatOpenAI client used by the benchmarks.
+
+Responses are pseudo-random words seeded by the prompt, so the same prompt always gets the same
+answer, and each call sleeps for a configurable latency plus per-token generation time.
+When a conversation message is listed in `tool_calls`, the "model" answers it with a call to that
+tool, the way the real model would when tools are bound.
+"""
+import hashlib
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+WORDS = (
+    "focus review ship roadmap feedback goal milestone sync blocker scope design spec tickets "
+    "merge priority growth impact mentor quality tests latency plan week calendar collaborate"
+).split()
+
+_lock = threading.Lock()
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = 0.0  # seconds per call, before generation
+    seconds_per_token: float = 0.0
+    output_tokens: int = 200
+    tool_calls: Dict[str, str] = {}  # conversation message -> name of the tool the model calls
+    tool_args: Dict[str, Dict[str, Any]] = {}  # tool name -> arguments it is called with
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"output_tokens": self.output_tokens}
+
+    def bind_tools(self, tools: List[Any], **kwargs) -> "FakeChatModel":
+        return self
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with _lock:
+            self.calls += 1
+            call_id = self.calls
+        time.sleep(self.latency + self.seconds_per_token * self.output_tokens)
+
+        last = messages[-1]
+        tool = self.tool_calls.get(last.content) if isinstance(last, HumanMessage) else None
+        if tool:
+            message = AIMessage(content="", tool_calls=[{"name": tool, "args": self.tool_args.get(tool, {}), "id": f"call_{call_id}"}])
+        else:
+            prompt = "\n".join(str(m.content) for m in messages)
+            rng = random.Random(hashlib.sha256(prompt.encode()).digest())
+            message = AIMessage(content=" ".join(rng.choice(WORDS) for _ in range(self.output_tokens)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,127 @@
+"""Startup benchmark: cold import time of the entry points, and graph compile time.
+
+Each measurement runs in a fresh interpreter with no API keys set, so it also checks that
+importing never needs credentials or builds clients (they are resolved on first use). Reports:
+- wall time of importing each module, best of `--repeat` runs
+- the first `get_graph()` (compile) and a second one (should be ~0, the graph is reused)
+- the slowest modules by cumulative import time (`python -X importtime`)
+- whether modules that should stay lazy (langchain_openai, ...) got imported
+
+Run with `python -m benchmarks.import_time` (or `make bench-import`).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ENTRY_POINTS = ["src.chatbot.chatbot", "src.batch", "src.server"]
+
+# Only needed once the model is called or the Github sync starts
+LAZY_MODULES = ["langchain_openai", "openai", "langgraph.prebuilt", "src.chatbot.github_sync"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+result = {{"import_s": imported - started, "loaded": [m for m in {lazy!r} if m in sys.modules]}}
+if {compile}:
+    from src.chatbot.chatbot import get_graph
+    get_graph()
+    compiled = time.perf_counter()
+    get_graph()
+    result["first_get_graph_s"] = compiled - imported
+    result["second_get_graph_s"] = time.perf_counter() - compiled
+print(json.dumps(result))
+"""
+
+
+def _env() -> Dict[str, str]:
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "TAVILY_API_KEY", "GITHUB_ACCESS_TOKEN")}
+    for name in ("COACH_CHECKPOINT_DB", "COACH_LLM_CACHE_DB", "COACH_BRIEFINGS_DB", "COACH_FOCUS_DB"):
+        env[name] = ":memory:"
+    env["PYTHONPATH"] = str(ROOT)
+    return env
+
+
+def probe(module: str, compile_graph: bool = False) -> Dict[str, Any]:
+    code = PROBE.format(module=module, compile=compile_graph, lazy=LAZY_MODULES)
+    proc = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=ROOT, env=_env(), capture_output=True, text=True)
+    if proc.returncode:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, top: int) -> List[Dict[str, Any]]:
+    """Top-level-ish modules by cumulative import time, from `python -X importtime`."""
+    proc = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        # Depth is the indentation of the name; only packages imported directly by us or one level down
+        depth = (len(line.rsplit("|", 1)[1]) - len(line.rsplit("|", 1)[1].lstrip())) // 2
+        if depth <= 2:
+            rows.append({"module": name, "cumulative_ms": int(cumulative_us) / 1000, "self_ms": int(self_us) / 1000})
+    return sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+
+
+def run(modules: Optional[List[str]] = None, repeat: int = 3, top: int = 10) -> Dict[str, Any]:
+    results = {}
+    for module in modules or ENTRY_POINTS:
+        runs = [probe(module, compile_graph=(i == 0)) for i in range(repeat)]
+        if "error" in runs[0]:
+            results[module] = {"error": runs[0]["error"]}
+            continue
+        results[module] = {
+            "import_ms": round(min(r["import_s"] for r in runs) * 1000, 1),
+            "first_get_graph_ms": round(runs[0]["first_get_graph_s"] * 1000, 1),
+            "second_get_graph_ms": round(runs[0]["second_get_graph_s"] * 1000, 3),
+            "lazy_modules_loaded": runs[0]["loaded"],
+            "slowest_imports": slowest_imports(module, top),
+        }
+    return results
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    for module, result in report.items():
+        if "error" in result:
+            print(f"== {module}: failed to import ({result['error']})")
+            continue
+        print(
+            f"== {module}: import {result['import_ms']:.0f} ms, first get_graph() {result['first_get_graph_ms']:.0f} ms, "
+            f"second {result['second_get_graph_ms']:.3f} ms"
+        )
+        if result["lazy_modules_loaded"]:
+            print(f"  !! imported eagerly: {', '.join(result['lazy_modules_loaded'])}")
+        for row in result["slowest_imports"]:
+            print(f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold import and graph compile time")
+    parser.add_argument("--module", action="append", help=f"default: {', '.join(ENTRY_POINTS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per module; the best import time is reported")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--json", type=Path, help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.module, args.repeat, args.top)
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    if any("error" in r or r["lazy_modules_loaded"] for r in report.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Benchmark harness: scripted multi-turn conversations through `graph` with a fake LLM.
+
+Runs entirely locally:
+- no API keys are needed, because dummy values are set before src.config is imported
+- the shared `llm` is replaced with benchmarks.fake_llm.FakeChatModel before the graph is imported
+- checkpoints, the LLM cache, briefings and focus items are kept in memory, retrieval indexes in a temp dir
+- data sources point at synthetic data `--scale` times the size of src/mocks (1 uses the mocks themselves)
+
+For each scenario it reports wall time per turn, node and tool, prompt tokens per node/tool
+(counted on every chat model call), and peak traced memory per turn.
+
+Run with `python -m benchmarks.run --scale 10` (or `make bench`). `--json` writes the report
+for comparing runs.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+for _name in ("OPENAI_API_KEY", "TAVILY_API_KEY", "GITHUB_ACCESS_TOKEN"):
+    os.environ.setdefault(_name, "benchmark")
+for _name in ("COACH_CHECKPOINT_DB", "COACH_LLM_CACHE_DB", "COACH_BRIEFINGS_DB", "COACH_FOCUS_DB"):
+    os.environ[_name] = ":memory:"
+# Retrieval indexes are built per run, so their build time is part of the first turn that needs them
+os.environ["COACH_RETRIEVAL_DIR"] = tempfile.mkdtemp(prefix="coach-bench-retrieval-")
+atexit.register(shutil.rmtree, os.environ["COACH_RETRIEVAL_DIR"], True)
+
+import argparse
+import json
+import logging
+import statistics
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+
+from benchmarks import synthetic_data
+from benchmarks.fake_llm import FakeChatModel
+
+logger = logging.getLogger(__name__)
+
+# scenario -> turns of (user message, tool the fake model calls for it, if it reaches the chatbot)
+SCENARIOS: Dict[str, List[Tuple[str, Optional[str]]]] = {
+    "morning_checkin": [
+        ("give me a simple run down of my calendar", None),
+        ("synthesize my week", None),
+        ("zoom in on my focus items", "zoom_in"),
+        ("save these items for later", "save_focus_items"),
+        ("what focus items did I save?", "get_focus_items"),
+        ("how long are my tickets taking?", "get_jira_metrics"),
+    ],
+    "synthesis_first": [
+        ("give me an in depth synthesis of the week ahead", None),
+        ("zoom in on my focus items", "zoom_in"),
+    ],
+    "career": [
+        ("what level am I", "get_user_context_string"),
+        ("zoom out and think about my career", "zoom_out"),
+        ("help me grow in my career", "grow_in_career"),
+        ("how am I doing on github", "comprehensive_github_analysis"),
+    ],
+}
+
+# Arguments the fake model passes to the tools that take any
+TOOL_ARGS: Dict[str, Dict[str, Any]] = {
+    "save_focus_items": {"items": ["Get the synthesis nodes PR merged", "Sync with Caleb on Lattice Coach"]},
+    "get_focus_items": {"week": "this_week"},
+}
+
+
+class Profiler(BaseCallbackHandler):
+    """Collects wall time per graph node and tool, and prompt tokens per chat model call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # run_id -> (kind, name, parent run_id, started)
+        self.runs: Dict[UUID, Tuple[Optional[str], str, Optional[UUID], float]] = {}
+        self.seconds: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+        self.prompt_tokens: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.llm_calls: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def _start(self, kind: Optional[str], name: str, run_id: UUID, parent_run_id: Optional[UUID]) -> None:
+        with self._lock:
+            self.runs[run_id] = (kind, name, parent_run_id, time.perf_counter())
+
+    def _end(self, run_id: UUID) -> None:
+        with self._lock:
+            kind, name, _, started = self.runs.get(run_id, (None, "", None, 0.0))
+            if kind is not None:
+                self.seconds[(kind, name)].append(time.perf_counter() - started)
+
+    def _owner(self, run_id: Optional[UUID]) -> Tuple[str, str]:
+        """The closest enclosing tool, or else node, of a run."""
+        node = None
+        with self._lock:
+            while run_id is not None and run_id in self.runs:
+                kind, name, parent, _ = self.runs[run_id]
+                if kind == "tool":
+                    return (kind, name)
+                if kind == "node" and node is None:
+                    node = (kind, name)
+                run_id = parent
+        return node or ("node", "(none)")
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or ""
+        # Node runs are the ones named after the node they run in
+        kind = "node" if metadata and metadata.get("langgraph_node") == name else None
+        self._start(kind, name, run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start("tool", kwargs.get("name") or (serialized or {}).get("name", ""), run_id, parent_run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        from src.chatbot.context import message_tokens
+
+        owner = self._owner(parent_run_id)
+        tokens = sum(message_tokens(m) for m in messages[0])
+        with self._lock:
+            self.prompt_tokens[owner] += tokens
+            self.llm_calls[owner] += 1
+
+    def report(self) -> Dict[str, Any]:
+        rows = {}
+        for key in sorted(set(self.seconds) | set(self.prompt_tokens)):
+            seconds = self.seconds.get(key, [])
+            rows[f"{key[0]}:{key[1]}"] = {
+                "count": len(seconds),
+                "total_ms": round(sum(seconds) * 1000, 2),
+                "mean_ms": round(statistics.mean(seconds) * 1000, 2) if seconds else 0.0,
+                "llm_calls": self.llm_calls.get(key, 0),
+                "prompt_tokens": self.prompt_tokens.get(key, 0),
+            }
+        return rows
+
+
+def load_graph(fake: FakeChatModel, llm_cache: bool):
+    """Swaps the shared llm for the fake and imports the graph built on it."""
+    import src.chatbot.llm as llm_module
+
+    if llm_cache:
+        from src.chatbot.llm_cache import CachedChatModel
+
+        llm_module.llm = CachedChatModel(fake, ":memory:", ttls=llm_module.LLM_CACHE_TTLS)
+    else:
+        llm_module.llm = fake
+    from src.chatbot.chatbot import graph
+
+    return graph
+
+
+def run_scenario(graph, name: str, turns: List[Tuple[str, Optional[str]]], think_time: float = 0.0) -> Dict[str, Any]:
+    profiler = Profiler()
+    config = {"configurable": {"thread_id": f"bench-{name}-{uuid.uuid4()}"}, "callbacks": [profiler]}
+    inputs = [{"messages": [], "starter_done": False, "tool_processed": False}]
+    inputs += [{"messages": [HumanMessage(content=message)]} for message, _ in turns]
+    labels = ["(conversation starter)"] + [message for message, _ in turns]
+
+    turn_reports = []
+    for i, (label, graph_input) in enumerate(zip(labels, inputs)):
+        if i:
+            # The user reading and typing; speculative work runs meanwhile, not counted in the turn
+            time.sleep(think_time)
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        graph.invoke(graph_input, config)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        turn_reports.append({"message": label, "wall_ms": round(elapsed * 1000, 2), "peak_kib": round(peak / 1024, 1)})
+
+    return {
+        "turns": turn_reports,
+        "wall_ms": round(sum(t["wall_ms"] for t in turn_reports), 2),
+        "peak_kib": max(t["peak_kib"] for t in turn_reports),
+        "breakdown": profiler.report(),
+    }
+
+
+def run(
+    scale: int = 1,
+    scenarios: Optional[List[str]] = None,
+    latency: float = 0.0,
+    seconds_per_token: float = 0.0,
+    output_tokens: int = 200,
+    llm_cache: bool = False,
+    data_dir: Optional[Path] = None,
+    think_time: float = 0.0,
+) -> Dict[str, Any]:
+    scenarios = scenarios or list(SCENARIOS)
+    tool_calls = {message: tool for name in scenarios for message, tool in SCENARIOS[name] if tool}
+    fake = FakeChatModel(latency=latency, seconds_per_token=seconds_per_token, output_tokens=output_tokens, tool_calls=tool_calls, tool_args=TOOL_ARGS)
+    graph = load_graph(fake, llm_cache)
+
+    from src.chatbot.chatbot import speculator
+    from src.chatbot.data_sources import data_sources
+
+    with tempfile.TemporaryDirectory(prefix="coach-bench-") as tmp:
+        if scale > 1:
+            started = time.perf_counter()
+            data_sources.register(synthetic_data.generate(scale, data_dir or Path(tmp)))
+            logger.info(f"Generated {scale}x synthetic data in {time.perf_counter() - started:.1f}s")
+        data_sources.invalidate()
+
+        tracemalloc.start()
+        try:
+            results = {name: run_scenario(graph, name, SCENARIOS[name], think_time) for name in scenarios}
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "scale": scale,
+        "fake_llm": {"latency": latency, "seconds_per_token": seconds_per_token, "output_tokens": output_tokens, "calls": fake.calls},
+        "llm_cache": llm_cache,
+        "think_time": think_time,
+        "speculation": speculator.stats.as_dict(),
+        "scenarios": results,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"scale={report['scale']}x fake_llm={report['fake_llm']} llm_cache={report['llm_cache']} think_time={report['think_time']}s")
+    print(f"speculation={report['speculation']}")
+    for name, result in report["scenarios"].items():
+        print(f"\n== {name}: {result['wall_ms']:.1f} ms, peak {result['peak_kib']:.0f} KiB")
+        for turn in result["turns"]:
+            print(f"  {turn['wall_ms']:>10.1f} ms {turn['peak_kib']:>9.0f} KiB  {turn['message']}")
+        print(f"  {'':<36}{'count':>6}{'total ms':>11}{'mean ms':>10}{'llm':>5}{'prompt tok':>12}")
+        for key, row in result["breakdown"].items():
+            print(
+                f"  {key:<36}{row['count']:>6}{row['total_ms']:>11.1f}{row['mean_ms']:>10.1f}"
+                f"{row['llm_calls']:>5}{row['prompt_tokens']:>12}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scripted conversations with a fake LLM")
+    parser.add_argument("--scale", type=int, default=1, help="data size as a multiple of src/mocks (e.g. 10, 100, 1000)")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="default: all")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake LLM seconds per call")
+    parser.add_argument("--seconds-per-token", type=float, default=0.0, help="fake LLM generation time per output token")
+    parser.add_argument("--output-tokens", type=int, default=200, help="fake LLM output length")
+    parser.add_argument("--llm-cache", action="store_true", help="put the LLM response cache in front of the fake")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds the user takes between turns (not counted)")
+    parser.add_argument("--data-dir", type=Path, help="keep the generated data here instead of a temp dir")
+    parser.add_argument("--json", type=Path, help="also write the report as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run(
+        scale=args.scale,
+        scenarios=args.scenario,
+        latency=args.latency,
+        seconds_per_token=args.seconds_per_token,
+        output_tokens=args.output_tokens,
+        llm_cache=args.llm_cache,
+        data_dir=args.data_dir,
+        think_time=args.think_time,
+    )
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
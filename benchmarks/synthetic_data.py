@@ -0,0 +1,188 @@
+"""Synthetic data sources at a multiple of the size of src/mocks.
+
+`generate(scale, out_dir)` writes a complete data directory (the same file names as src/mocks)
+where the Google Calendar events, Jira tickets, Github PRs and weekly updates are `scale` times
+as many as in the mocks. The other sources are copied unchanged. Data is seeded, so a given
+scale always produces the same files, and is anchored on the mocks' "today" (src/mocks/tenant.json).
+"""
+import argparse
+import json
+import random
+import shutil
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+
+from src.chatbot.data_sources import MOCKS_DIR
+
+TODAY = date(2024, 11, 18)
+PACIFIC = timezone(timedelta(hours=-8))
+
+SCALED_SOURCES = ("gcal.json", "jira.json", "github_prs_results.json", "user_updates.json")
+
+# (summary, start hour, duration in hours, attendees)
+EVENT_TEMPLATES = [
+    ("Lattice Assistant UI Feature - Focus Work", 9, 2, 0),
+    ("Code Review Session", 11.5, 1, 0),
+    ("Lunch Break", 12.5, 1, 0),
+    ("Team Workblock - Daily Review", 14, 1, 5),
+    ("1:1 with Adnan", 15.5, 0.5, 2),
+    ("Sprint Planning", 10, 1, 8),
+    ("Tech Debt Cleanup - Focus Work", 15, 2, 0),
+    ("Interview: Backend Engineer", 16, 1, 3),
+]
+TEAMMATES = ["Caleb", "Carrie", "Hannah", "Natasha", "Gilles"]
+TICKET_TOPICS = [
+    "synthesis nodes", "assistant suggestions", "Jira integration", "Github integration", "calendar sync",
+    "prompt templates", "feedback modal", "competency matrix", "Slack notifications", "API endpoints",
+]
+TICKET_VERBS = ["Add", "Implement", "Optimize", "Test", "Document", "Fix", "Integrate", "Design"]
+UPDATE_ITEMS = [
+    "Reviewed {name}'s PR: https://github.com/latticehr/lattice/pull/{n}",
+    "Worked on {topic}.",
+    "Paired with {name} on {topic}.",
+    "Merged PR: https://github.com/latticehr/lattice/pull/{n}",
+    "Wrote the design doc for {topic}.",
+]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+
+def _monday(weeks_back: int) -> date:
+    return TODAY - timedelta(days=TODAY.weekday() + 7 * weeks_back)
+
+
+def _at(day: date, hour: float) -> datetime:
+    return datetime.combine(day, time(int(hour), int(hour % 1 * 60)), tzinfo=PACIFIC)
+
+
+def gcal(rng: random.Random, weeks: int) -> dict:
+    events = []
+    # The last generated week is the current one, like the mocks (last week + this week)
+    for week in range(weeks - 1, -1, -1):
+        for offset in range(5):
+            day = _monday(week) + timedelta(days=offset)
+            for summary, hour, duration, attendees in rng.sample(EVENT_TEMPLATES, 4):
+                event = {
+                    "id": str(len(events) + 1),
+                    "summary": summary,
+                    "description": f"{summary}.",
+                    "location": rng.choice(["Office", "Zoom"]),
+                    "start": {"dateTime": _at(day, hour).isoformat(), "timeZone": "America/Los_Angeles"},
+                    "end": {"dateTime": _at(day, hour + duration).isoformat(), "timeZone": "America/Los_Angeles"},
+                }
+                if attendees:
+                    event["attendees"] = [{"email": f"{n.lower()}@lattice.com"} for n in rng.sample(TEAMMATES, min(attendees, len(TEAMMATES)))]
+                events.append(event)
+    return {"events": events}
+
+
+def jira(rng: random.Random, count: int, weeks: int, assignee: str) -> list:
+    tickets = []
+    for i in range(count):
+        created = _monday(weeks - 1) + timedelta(days=rng.randrange(weeks * 7))
+        tech_debt = rng.random() < 0.2
+        title = f"{rng.choice(TICKET_VERBS)} {rng.choice(TICKET_TOPICS)}"
+        changes = [{"status": "To Do", "changed_at": created.isoformat()}]
+        status = rng.choices(["To Do", "In Progress", "Done"], weights=[6, 2, 3])[0]
+        if status != "To Do":
+            started = min(created + timedelta(days=rng.randrange(1, 10)), TODAY)
+            changes.append({"status": "In Progress", "changed_at": started.isoformat()})
+            if status == "Done":
+                changes.append({"status": "Done", "changed_at": min(started + timedelta(days=rng.randrange(1, 6)), TODAY).isoformat()})
+        tickets.append(
+            {
+                "id": f"LC-{1000 + i}",
+                "title": f"[Tech Debt] {title}" if tech_debt else title,
+                "description": f"{title} for Lattice Coach.",
+                "status": status,
+                "type": rng.choice(["Task", "Feature"]),
+                "points": rng.choice([1, 2, 3, 5, 8]),
+                "assigned_to": assignee if rng.random() < 0.7 else rng.choice(TEAMMATES),
+                "created_at": created.isoformat(),
+                "status_changes": changes,
+            }
+        )
+    return tickets
+
+
+def github_prs(rng: random.Random, count: int, weeks: int, body: str) -> list:
+    prs = []
+    now = _at(TODAY, 17).astimezone(timezone.utc)
+    for i in range(count):
+        created = now - timedelta(hours=rng.uniform(0, weeks * 7 * 24))
+        closed = created + timedelta(hours=rng.uniform(1, 200))
+        is_open = closed > now or rng.random() < 0.1
+        prs.append(
+            {
+                "title": f"Lattice Coach: {rng.choice(TICKET_VERBS).lower()} {rng.choice(TICKET_TOPICS)}",
+                "created_at": str(created.replace(microsecond=0)),
+                "closed_at": None if is_open else str(closed.replace(microsecond=0)),
+                "updated_at": str((now if is_open else closed).replace(microsecond=0)),
+                "state": "open" if is_open else "closed",
+                "html_url": f"https://github.com/latticehr/lattice/pull/{90000 + i}",
+                "body": body,
+                "comments": rng.randrange(0, 30),
+            }
+        )
+    return sorted(prs, key=lambda pr: pr["created_at"], reverse=True)
+
+
+def user_updates(rng: random.Random, weeks: int) -> dict:
+    updates = []
+    for week in range(weeks):
+        monday = _monday(week)
+        daily = {
+            day: [
+                rng.choice(UPDATE_ITEMS).format(name=rng.choice(TEAMMATES), topic=rng.choice(TICKET_TOPICS), n=rng.randrange(85000, 90000))
+                for _ in range(rng.randrange(2, 5))
+            ]
+            for day in WEEKDAYS[: rng.randrange(3, 6)]
+        }
+        updates.append(
+            {
+                "weekOf": f"{monday.strftime('%B %d')} - {(monday + timedelta(days=4)).strftime('%B %d')}",
+                "dailyUpdates": daily,
+                "plansForNextWeek": [f"Work on {rng.choice(TICKET_TOPICS)}.", f"Sync with {rng.choice(TEAMMATES)}."],
+                "challenges": f"Balancing {rng.choice(TICKET_TOPICS)} with {rng.choice(TICKET_TOPICS)}.",
+                "generalThoughts": "Making steady progress on Lattice Coach.",
+                "feeling": rng.choice(["Positive", "Neutral", "Stressed"]),
+            }
+        )
+    return {"weeklyUpdates": updates}
+
+
+def _write(path: Path, data) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def generate(scale: int, out_dir: Path, seed: int = 0) -> Path:
+    """Writes a data directory `scale` times the size of src/mocks into `out_dir` and returns it."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for source in MOCKS_DIR.iterdir():
+        if source.is_file() and source.name not in SCALED_SOURCES:
+            shutil.copy(source, out_dir / source.name)
+
+    def load(name):
+        with open(MOCKS_DIR / name) as f:
+            return json.load(f)
+
+    rng = random.Random(seed)
+    assignee = load("employee_data.json")["first_name"].lower()
+    mock_prs = load("github_prs_results.json")
+    body = max((pr["body"] or "" for pr in mock_prs), key=len)[:1500]
+
+    _write(out_dir / "gcal.json", gcal(rng, weeks=len(load("gcal.json")["events"]) // 20 * scale))
+    _write(out_dir / "jira.json", jira(rng, len(load("jira.json")) * scale, weeks=2 * scale, assignee=assignee))
+    _write(out_dir / "github_prs_results.json", github_prs(rng, len(mock_prs) * scale, weeks=4 * scale, body=body))
+    _write(out_dir / "user_updates.json", user_updates(rng, len(load("user_updates.json")["weeklyUpdates"]) * scale))
+    return out_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic data sources")
+    parser.add_argument("scale", type=int)
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate(args.scale, args.out_dir, args.seed))
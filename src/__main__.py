@@ -1,33 +1,97 @@
 # from langchain_community.tools.tavily_search import TavilySearchResults
+import argparse
 import logging
+import sys
+import time
 import uuid
 from langchain_core.messages import (
     AIMessage,
     HumanMessage,
     ToolMessage,
 )
-from src.chatbot.chatbot import graph
+from src.chatbot.chatbot import get_graph
+from src.chatbot.data_sources import data_sources
 from src.chatbot.state import State
+from src.chatbot.tools import start_github_sync
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Node whose LLM tokens are the user-facing answer
+FINAL_NODE = "chatbot"
+
+
+def stream_turn(graph_input, config) -> State:
+    """Runs one turn through the graph, printing node progress and final-node tokens as they arrive."""
+    started = time.monotonic()
+    first_token_at = None
+
+    for mode, chunk in get_graph().stream(graph_input, config, stream_mode=["debug", "messages"]):
+        if mode == "messages":
+            message_chunk, metadata = chunk
+            if metadata.get("langgraph_node") != FINAL_NODE or not message_chunk.content:
+                continue
+            if first_token_at is None:
+                first_token_at = time.monotonic()
+                print("Assistant: ", end="", flush=True)
+            print(message_chunk.content, end="", flush=True)
+        elif chunk["type"] == "task":
+            print(f"[{chunk['payload']['name']}] started", file=sys.stderr, flush=True)
+        elif chunk["type"] == "task_result":
+            status = "failed" if chunk["payload"]["error"] else "finished"
+            print(f"[{chunk['payload']['name']}] {status} after {time.monotonic() - started:.2f}s", file=sys.stderr, flush=True)
+
+    state = get_graph().get_state(config).values
+    if first_token_at is None:
+        # Nothing was streamed from the final node (e.g. starter, cal_sum), print the last reply whole
+        for message in reversed(state.get("messages", [])):
+            if isinstance(message, AIMessage):
+                message.pretty_print()
+                break
+    else:
+        print()
+        logger.info(f"Time to first token: {first_token_at - started:.2f}s, total: {time.monotonic() - started:.2f}s")
+    return state
+
+
+def run_streaming(state: State, config) -> None:
+    stream_turn(state, config)
+    while True:
+        user_input = input("User: ")
+        if user_input.lower() in ["quit", "exit", "q"]:
+            print("Assistant: Goodbye!")
+            break
+        # The checkpointer holds the thread's history, so only the new message is sent
+        stream_turn({"messages": [HumanMessage(content=user_input)]}, config)
+
 
 # Interaction loop
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat with the Agentic Coach.")
+    parser.add_argument("--stream", action="store_true", help="Stream tokens and node progress as the graph runs.")
+    parser.add_argument("--user", help="employee_id to coach (default: COACH_DEFAULT_USER, or the mocks' employee)")
+    args = parser.parse_args()
+
+    if args.user:
+        data_sources.set_default_user(args.user)
+    start_github_sync()
     config = {"configurable": {"thread_id": str(uuid.uuid4())}}
     state: State = {"messages": [], "starter_done": False, "tool_processed": False} 
 
     try:
-        state = graph.invoke(state, config)
+        if args.stream:
+            run_streaming(state, config)
+            sys.exit(0)
+
+        state = get_graph().invoke(state, config)
 
         # Print the initial AI message to initiate the conversation
         if "messages" in state and state["messages"]:
-            logger.info("Initial message found: %s", state["messages"][-1])
+            logger.debug("Initial message found: %s", state["messages"][-1])
             initial_message = state["messages"][-1]
             if isinstance(initial_message, AIMessage):
-                logger.info("Initial message content: %s", initial_message.content)
+                logger.debug("Initial message content: %s", initial_message.content)
                 initial_message.pretty_print()
             else:
                 logger.warning("The first message is not an AIMessage.")
@@ -44,7 +108,7 @@ if __name__ == "__main__":
             state["messages"].append(HumanMessage(content=user_input))
 
             # Invoke the graph and display the assistant's response
-            state = graph.invoke(state, config)
+            state = get_graph().invoke(state, config)
 
             # Find the last non-tool message
             for message in reversed(state["messages"]):
@@ -52,7 +116,7 @@ if __name__ == "__main__":
                     if isinstance(message, AIMessage):
                         message.pretty_print()
                     elif isinstance(message, ToolMessage):
-                        logger.info("Tool message found: %s", message.content)
+                        logger.debug("Tool message found: %s", message.content)
                         # message.pretty_print()
                     break
             else:
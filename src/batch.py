@@ -0,0 +1,112 @@
+"""Batch job that precomputes briefings for a list of users, e.g. overnight from cron.
+
+For each user it generates the Github health check, the weekly synthesis and the zoom-in focus
+list, and stores them keyed by user + input-data fingerprint (see src/chatbot/briefings.py).
+It also generates the summaries of the user's recent weekly updates that are missing.
+The interactive tools then serve them without any LLM call for as long as the data is unchanged.
+Briefings whose fingerprint already matches are skipped.
+
+Run with `python -m src.batch [--users E001 E002] [--workers 4] [--jobs-per-minute 30]` (or `make batch`).
+"""
+import argparse
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from src.chatbot.data_sources import data_sources, use_user
+from src.chatbot.tools import BRIEFINGS, briefing_fingerprint, get_briefing_store, summarize_update_weeks
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The other briefings embed the Github health check, so it is generated first and served from the store to them
+PHASES = (("github_health",), ("weekly_synthesis", "zoom_in"))
+
+
+class RateLimiter:
+    """Spaces job starts at least 60 / per_minute seconds apart, across all workers."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60 / per_minute if per_minute else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        time.sleep(start - now)
+
+
+def run_job(user_id: str, kind: str, limiter: RateLimiter, force: bool = False) -> str:
+    with use_user(user_id):
+        fingerprint = briefing_fingerprint(kind)
+        if not force and get_briefing_store().has(user_id, kind, fingerprint):
+            return "fresh"
+        limiter.wait()
+        started = time.monotonic()
+        content = BRIEFINGS[kind][1]()
+    get_briefing_store().put(user_id, kind, fingerprint, content)
+    logger.info(f"Generated {kind} for {user_id} in {time.monotonic() - started:.1f}s")
+    return "generated"
+
+
+def run_update_summaries(user_id: str, limiter: RateLimiter) -> str:
+    with use_user(user_id):
+        limiter.wait()
+        generated = summarize_update_weeks()
+    if generated:
+        logger.info(f"Generated {generated} weekly update summaries for {user_id}")
+    return "generated" if generated else "fresh"
+
+
+def run_batch(
+    user_ids: Optional[List[str]] = None,
+    workers: int = 4,
+    jobs_per_minute: float = 30,
+    force: bool = False,
+) -> Dict[str, int]:
+    """Precomputes every briefing for `user_ids` (default: every user with a data partition). Returns counts per outcome."""
+    user_ids = user_ids or data_sources.user_ids()
+    for user_id in [u for u in user_ids if not data_sources.has_user(u)]:
+        logger.warning(f"No data for user {user_id}, skipping")
+    user_ids = [u for u in user_ids if data_sources.has_user(u)]
+
+    limiter = RateLimiter(jobs_per_minute)
+    counts: Dict[str, int] = {"generated": 0, "fresh": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        for kinds in PHASES:
+            futures = {
+                pool.submit(run_job, user_id, kind, limiter, force): (user_id, kind)
+                for user_id in user_ids
+                for kind in kinds
+            }
+            if kinds is PHASES[-1]:
+                futures.update({pool.submit(run_update_summaries, user_id, limiter): (user_id, "update_summaries") for user_id in user_ids})
+            for future, (user_id, kind) in futures.items():
+                try:
+                    counts[future.result()] += 1
+                except Exception:
+                    counts["failed"] += 1
+                    logger.exception(f"Failed to generate {kind} for {user_id}")
+    logger.info(f"Batch finished: {counts}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute coaching briefings")
+    parser.add_argument("--users", nargs="*", help="employee ids (default: every user with a data partition)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--jobs-per-minute", type=float, default=30, help="rate limit on briefing generations")
+    parser.add_argument("--force", action="store_true", help="regenerate even if the stored briefing is fresh")
+    args = parser.parse_args()
+    counts = run_batch(args.users, args.workers, args.jobs_per_minute, args.force)
+    if counts["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Store of precomputed briefings (weekly synthesis, zoom-in focus list, Github health check).
+
+The batch job (src/batch.py) generates briefings ahead of time. Each one is stored with a
+fingerprint of the input data it was generated from. The interactive tools only serve a stored
+briefing while the fingerprint of the current data still matches; otherwise they compute it live.
+"""
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS briefings (
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (user_id, kind)
+);
+"""
+
+
+class BriefingStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str, kind: str, fingerprint: str) -> Optional[str]:
+        """The stored briefing, if it was generated from data with this fingerprint."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content FROM briefings WHERE user_id=? AND kind=? AND fingerprint=?",
+                (user_id, kind, fingerprint),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, user_id: str, kind: str, fingerprint: str, content: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO briefings (user_id, kind, fingerprint, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                (user_id, kind, fingerprint, content, time.time()),
+            )
+
+    def has(self, user_id: str, kind: str, fingerprint: str) -> bool:
+        with self._lock:
+            return (
+                self.conn.execute(
+                    "SELECT 1 FROM briefings WHERE user_id=? AND kind=? AND fingerprint=?",
+                    (user_id, kind, fingerprint),
+                ).fetchone()
+                is not None
+            )
@@ -0,0 +1,110 @@
+"""Interval index over Google Calendar events.
+
+Events are parsed once (per version of gcal.json) and kept sorted by start time, so day/week
+range queries are a bisect plus the matching events instead of a scan that re-parses every event.
+The index assumes recurring events are already expanded into instances (singleEvents=true).
+"""
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class CalendarEvent:
+    start: datetime
+    end: datetime
+    summary: str
+    raw: dict
+
+    @property
+    def minutes(self) -> float:
+        return (self.end - self.start).total_seconds() / 60
+
+
+def _parse(value: dict) -> datetime:
+    # All-day events only carry a date
+    if "dateTime" in value:
+        return datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+    return datetime.fromisoformat(value["date"])
+
+
+class CalendarIndex:
+    def __init__(self, events: List[dict]):
+        parsed = [(_parse(e["start"]), _parse(e["end"]), e) for e in events]
+        self.tz: Optional[tzinfo] = next((start.tzinfo for start, _, _ in parsed if start.tzinfo), None)
+
+        def localize(dt: datetime) -> datetime:
+            return dt.replace(tzinfo=self.tz) if dt.tzinfo is None else dt
+
+        self.events: List[CalendarEvent] = sorted(
+            (CalendarEvent(localize(start), localize(end), e.get("summary", ""), e) for start, end, e in parsed),
+            key=lambda e: e.start.timestamp(),
+        )
+        self.starts: List[float] = [e.start.timestamp() for e in self.events]
+        # The longest event bounds how far back an overlapping event can start
+        self.max_duration = max((e.end.timestamp() - e.start.timestamp() for e in self.events), default=0)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def _local(self, day: date) -> datetime:
+        return datetime.combine(day, time(), tzinfo=self.tz)
+
+    def starting_between(self, start: datetime, end: datetime) -> List[CalendarEvent]:
+        """Events that start in [start, end)."""
+        lo = bisect_left(self.starts, start.timestamp())
+        hi = bisect_left(self.starts, end.timestamp())
+        return self.events[lo:hi]
+
+    def overlapping(self, start: datetime, end: datetime) -> List[CalendarEvent]:
+        """Events that overlap [start, end), including ones that started before `start`."""
+        lo = bisect_left(self.starts, start.timestamp() - self.max_duration)
+        hi = bisect_left(self.starts, end.timestamp())
+        return [e for e in self.events[lo:hi] if e.end > start]
+
+    def day(self, day: date) -> List[CalendarEvent]:
+        return self.starting_between(self._local(day), self._local(day + timedelta(days=1)))
+
+    def week(self, monday: date) -> List[CalendarEvent]:
+        return self.starting_between(self._local(monday), self._local(monday + timedelta(days=7)))
+
+    def free_slots(
+        self,
+        start_day: date,
+        days: int = 5,
+        min_minutes: int = 120,
+        workday: Tuple[int, int] = (9, 18),
+    ) -> List[Tuple[datetime, datetime]]:
+        """Free blocks of at least `min_minutes` within working hours, skipping weekends."""
+        slots = []
+        for offset in range(days):
+            day = start_day + timedelta(days=offset)
+            if day.weekday() >= 5:
+                continue
+            cursor = self._local(day) + timedelta(hours=workday[0])
+            day_end = self._local(day) + timedelta(hours=workday[1])
+            for event in self.overlapping(cursor, day_end):
+                if event.start > cursor and (event.start - cursor) >= timedelta(minutes=min_minutes):
+                    slots.append((cursor, event.start))
+                cursor = max(cursor, event.end)
+            if day_end - cursor >= timedelta(minutes=min_minutes):
+                slots.append((cursor, day_end))
+        return slots
+
+    @staticmethod
+    def minutes_by(events: List[CalendarEvent], key: Callable[[CalendarEvent], str] = lambda e: e.summary) -> Dict[str, float]:
+        """Total minutes per category (by default, per event summary)."""
+        totals: Dict[str, float] = {}
+        for event in events:
+            totals[key(event)] = totals.get(key(event), 0) + event.minutes
+        return dict(sorted(totals.items(), key=lambda kv: kv[1], reverse=True))
+
+
+def format_slot(slot: Tuple[datetime, datetime]) -> str:
+    start, end = slot
+    return f"{start.strftime('%A %B %d, %I:%M %p')} - {end.strftime('%I:%M %p')}"
+
+
+def format_event(event: CalendarEvent) -> str:
+    return f"{event.start.strftime('%B %d, %Y')} at {event.start.strftime('%I:%M %p')} - {event.end.strftime('%I:%M %p')}: {event.summary}"
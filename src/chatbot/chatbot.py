@@ -1,7 +1,7 @@
 # from langchain_community.tools.tavily_search import TavilySearchResults
 import json
 import logging
-from langchain_openai import ChatOpenAI
+from functools import lru_cache
 from langchain_core.messages import (
     ToolMessage,
     SystemMessage,
@@ -9,9 +9,8 @@ from langchain_core.messages import (
     HumanMessage,
 )
 from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.checkpoint.memory import MemorySaver
-from typing import List, Literal
+from typing import List, Literal, Optional
+from langchain_core.runnables import RunnableConfig
 
 
 from .tools import (
@@ -24,6 +23,11 @@ from .tools import (
     get_user_first_name,
     get_user_first_name_tool,
     save_focus_items,
+    get_focus_items,
+    update_focus_item,
+    get_jira_metrics,
+    tool_output_kind,
+    OUTPUT_KIND_PROSE,
     get_calendar_summary,
     create_synthesis_of_week,
     rethink_schedule,
@@ -35,6 +39,21 @@ from .tools import (
     zoom_out,
 )
 from .llm import llm
+from .llm_cache import cache_scope
+from .data_sources import data_sources, use_user
+from .router import Router
+from .checkpointer import SqliteCheckpointer
+from .context import ContextManager
+from .speculation import Speculator
+from src.config import (
+    CHECKPOINT_DB_PATH,
+    CHECKPOINT_EVICT_INTERVAL_SECONDS,
+    CHECKPOINT_IDLE_TTL_SECONDS,
+    CONTEXT_KEEP_TURNS,
+    CONTEXT_TOKEN_BUDGET,
+    SPECULATION_MAX_INFLIGHT,
+    SPECULATION_TTL_SECONDS,
+)
 
 from .state import State
 
@@ -58,10 +77,15 @@ When the user asks about zooming in or out, use the `zoom_in` or `zoom_out` tool
 When the user asks about what the coach can do, use the `what_can_coach_do` tool.
 
 When the user asks about saving items, say you will be happy to do so and will save them
-in a todo list that can be reviewed later. Use the `save_focus_items` tool.
+in a todo list that can be reviewed later. Use the `save_focus_items` tool, passing the items.
+
+When the user asks what they committed to or how their focus items are going, use the `get_focus_items` tool,
+and `update_focus_item` when they say an item is done or no longer relevant.
 
 If the user asks about their github activity, use the `comprehensive_github_analysis` tool.
 
+If the user asks how their tickets are going or how fast they are delivering, use the `get_jira_metrics` tool.
+
 Available tools:
 1. `get_calendar_summary`: Provides a summary of the user's calendar.
 2. `save_focus_items`: Saves the user's focus items for the week. Use this when the user asks to save their focus items.
@@ -77,15 +101,37 @@ Available tools:
 12. `zoom_in`: Helps the user zoom in on a specific focus item.
 13. `zoom_out`: Helps the user zoom out and think big picture about their career growth.'
 14. `comprehensive_github_analysis`: Provides a comprehensive analysis of the user's github activity.
+15. `get_focus_items`: Retrieves the focus items the user saved (this week, last week or all), optionally by status.
+16. `update_focus_item`: Marks a saved focus item as done, dropped or open.
+17. `get_jira_metrics`: Cycle time, time in progress, time per status and points done per week of the user's (or a teammate's) Jira tickets.
 Remember to:
 - Use the provided tools when necessary to fetch and synthesize information
 - Do not guess information; always use tools to fetch accurate data
 - After fetching data from a tool, format the response in a clear and conversational manner for the user.
-- For example, if the user asks about their level, use the get_user_context_string tool, parse the json for relevant information, and then respond with "You are currently at level L4." instead of displaying raw data.
+- For example, if the user asks about their level, use the get_user_context_string tool, parse the json for relevant information, and then respond with "You are currently at level <their level>." instead of displaying raw data.
 """
 
-def get_messages_info(messages):
-    return [SystemMessage(content=template)] + messages
+def summarize(prompt: str) -> str:
+    # Tagged so graph streaming doesn't show the summary tokens as part of the reply
+    return llm.invoke(prompt, config=cache_scope("summarize", {"tags": ["langsmith:nostream"]})).content.strip()
+
+context_manager = ContextManager(
+    token_budget=CONTEXT_TOKEN_BUDGET,
+    keep_turns=CONTEXT_KEEP_TURNS,
+    summarizer=summarize,
+)
+
+def get_messages_info(state):
+    """System prompt plus the token-budgeted conversation, updating the rolling summary in state."""
+    messages, summary, summarized_upto = context_manager.build(
+        template,
+        state["messages"],
+        summary=state.get("summary", ""),
+        summarized_upto=state.get("summarized_upto", 0),
+    )
+    state["summary"] = summary
+    state["summarized_upto"] = summarized_upto
+    return messages
 
 # Tools for the LLM (returns strings)
 llm_tools = [
@@ -104,15 +150,22 @@ llm_tools = [
     zoom_out,
     comprehensive_github_analysis,
     save_focus_items,
+    get_focus_items,
+    update_focus_item,
+    get_jira_metrics,
 ]
-llm_with_tools = llm.bind_tools(llm_tools)
+
+@lru_cache(maxsize=None)
+def get_llm_with_tools():
+    # Binding resolves the model (see llm.py), so it waits for the first chatbot turn
+    return llm.bind_tools(llm_tools)
 
 # New system prompt
 prompt_system = """Based on the following user input, offer relevant information and continue the conversation:
 {reqs}"""
 
 def get_chatbot_messages(messages: list):
-    logger.info("top of get_chatbot_messages")
+    logger.debug("top of get_chatbot_messages")
     # Always include the system prompt with tools information
     messages_to_send = [SystemMessage(content=template)]
     
@@ -121,17 +174,17 @@ def get_chatbot_messages(messages: list):
         if not isinstance(m, ToolMessage):
             messages_to_send.append(m)
         
-    logger.info(f"Sending {len(messages_to_send)} messages to LLM")
+    logger.debug(f"Sending {len(messages_to_send)} messages to LLM")
     return messages_to_send
 
-def chatbot_gen_chain(state):
-    logger.info('get type of messages: %s', type(state["messages"][-1]))
-    logger.info("Is this a tool message? %s", isinstance(state["messages"][-1], ToolMessage))
+def chatbot_gen_chain(state, config: RunnableConfig):
+    logger.debug('get type of messages: %s', type(state["messages"][-1]))
+    logger.debug("Is this a tool message? %s", isinstance(state["messages"][-1], ToolMessage))
     
-    messages = get_messages_info(state["messages"])
+    messages = get_messages_info(state)
 
     if isinstance(state["messages"][-1], ToolMessage):
-        logger.info("Processing ToolMessage.")
+        logger.debug("Processing ToolMessage.")
         tool_result = state["messages"][-1].content
         user_message = next(
         (
@@ -150,7 +203,8 @@ def chatbot_gen_chain(state):
         """
         
         # Invoke the LLM to format the response
-        formatted_response = llm_with_tools.invoke([SystemMessage(content=formatting_prompt) ] + messages)
+        with llm.upstream_call():
+            formatted_response = get_llm_with_tools().invoke([SystemMessage(content=formatting_prompt) ] + messages)
         formatted_text = formatted_response.content.strip()
         
         # Append the formatted message as AIMessage
@@ -158,15 +212,18 @@ def chatbot_gen_chain(state):
         
         # Set the flag indicating a tool has been processed
         state["tool_processed"] = True
-        logger.info("Formatted AIMessage appended in chatbot_gen_chain.")
+        logger.debug("Formatted AIMessage appended in chatbot_gen_chain.")
         return state
     
     if isinstance(state["messages"][-1], HumanMessage):
+        # The user didn't pick one of the starter's options
+        speculator.discard(thread_id(config))
         try:
             # Simple, synchronous invocation
-            response = llm_with_tools.invoke(messages)
+            with llm.upstream_call():
+                response = get_llm_with_tools().invoke(messages)
             state["messages"].append(response)
-            logger.info("Chatbot response appended to state.")
+            logger.debug("Chatbot response appended to state.")
         except Exception as e:
             logger.exception("Error while getting response from LLM: %s", e)
             state["messages"].append(AIMessage(content="I'm sorry, something went wrong while generating the response."))
@@ -179,44 +236,96 @@ def chatbot_gen_chain(state):
         logger.info("Message wasnt any discernable type")
         return state
 
-def conversation_starter_chain(state: State):
+# The starter's two options, computed ahead while the user answers (see speculation.py)
+def this_week_calendar_summary() -> str:
+    return get_calendar_summary.invoke({"week": "this_week"})
+
+def synthesis_of_week() -> str:
+    return create_synthesis_of_week.invoke({})
+
+# node -> what it computes; the synthesis first, it has the most latency to hide
+SPECULATED_NODES = {
+    "create_synthesis_of_week": synthesis_of_week,
+    "cal_sum": this_week_calendar_summary,
+}
+
+speculator = Speculator(SPECULATION_MAX_INFLIGHT, SPECULATION_TTL_SECONDS)
+
+def thread_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+def speculate_starter_options(thread: Optional[str], employee_id: str) -> None:
+    for node, compute in SPECULATED_NODES.items():
+        def speculation(compute=compute):
+            with use_user(employee_id):
+                return compute()
+        speculator.start(thread, node, speculation)
+
+def run_speculated(node: str, config: RunnableConfig) -> str:
+    """The node's result, taken from its speculation when the starter started one for this thread."""
+    hit, result = speculator.take(thread_id(config), node)
+    return result if hit else SPECULATED_NODES[node]()
+
+def conversation_starter_chain(state: State, config: RunnableConfig):
     if state.get("starter_done", False):
-        logger.info("Conversation starter chain already done.")
+        logger.debug("Conversation starter chain already done.")
         return state  # Skip if already done
 
-    logger.info("Conversation starter chain invoked!")
+    logger.debug("Conversation starter chain invoked!")
     user_first_name = get_user_first_name.run({})
     weekday = get_day_of_week.run({})
     content = f"Hi {user_first_name}, today is {weekday}. Would you like to start by getting a simple run down of what is on your calendar for this week, or do you want a more indepth synthesis of the week ahead?"
     state["messages"].append(AIMessage(content=content))
     state["starter_done"] = True  # Indicate the starter has completed
-    logger.info("Conversation starter chain completed!")
+    # Whose data the thread is about, so a resumed session is bound to the same user
+    state["employee_id"] = data_sources.current_user()
+    speculate_starter_options(thread_id(config), state["employee_id"])
+    logger.debug("Conversation starter chain completed!")
     return state
 
-def calendar_summary_chain(state):
-    logger.info("Calendar summary chain invoked.")
-    response = get_calendar_summary.invoke({"week": "this_week"})
-    state["messages"].append(response)
+def calendar_summary_chain(state, config: RunnableConfig):
+    logger.debug("Calendar summary chain invoked.")
+    response = run_speculated("cal_sum", config)
+    state["messages"].append(AIMessage(content=response))
     return state
 
-def create_synthesis_of_week_chain(state):
-    logger.info("Create synthesis of week chain invoked.")
-    response = create_synthesis_of_week.run({})
-    state["messages"].append(response)
+def create_synthesis_of_week_chain(state, config: RunnableConfig):
+    logger.debug("Create synthesis of week chain invoked.")
+    response = run_speculated("create_synthesis_of_week", config)
+    state["messages"].append(AIMessage(content=response))
     return state
 
 
 
+# Routing prompt for messages the local router tiers can't classify confidently
+routing_prompt = """Given the following user message, determine which node to route to.
+Available nodes:
+- "cal_sum": For calendar-related queries (e.g., schedule, meetings, events)
+- "create_synthesis_of_week": For an in-depth synthesis of the user's week (e.g., last week's recap, priorities for the week ahead)
+- "chatbot": For general queries and tool usage (e.g., user info, competencies, actions)
+
+User message: "{message}"
+
+Respond with only one one of the given string names from the available nodes above".
+"""
+
+def classify_route_with_llm(user_message: str) -> str:
+    response = llm.invoke(routing_prompt.format(message=user_message), config=cache_scope("classify_route_with_llm"))
+    return response.content
+
+router = Router(llm_classifier=classify_route_with_llm)
+
+
 # TODO: start implementing analysis based on the data, and synthesizing with github
 # generate insights and action items based on gcal, github, and lattice data
 # TODO: also figure out why the router calls all the fns every time?
 def route_based_on_human_input(state):
     if not state.get("starter_done", False):
-        logger.info("About to start the conversation with conversation starter chain.")
+        logger.debug("About to start the conversation with conversation starter chain.")
         return "conversation_starter_chain"
 
     if state.get("tool_processed", False):
-            logger.info("Tool processed, skipping routing.")
+            logger.debug("Tool processed, skipping routing.")
             state["tool_processed"] = False
             return "chatbot"
         
@@ -228,32 +337,9 @@ def route_based_on_human_input(state):
     ),
     "",
     )
-    
 
-    # Create a routing prompt for the LLM
-    routing_prompt = """Given the following user message, determine which node to route to.
-    Available nodes:
-    - "cal_sum": For calendar-related queries (e.g., schedule, meetings, events)
-    - "create_synthesis_of_week": For questions around competencies for given role
-    - "chatbot": For general queries and tool usage (e.g., user info, competencies, actions)
-    
-    User message: "{message}"
-    
-    Respond with only one one of the given string names from the available nodes above".
-    """
-    
-    # Get routing decision from LLM
-    response = llm.invoke(routing_prompt.format(message=user_message))
-    route = response.content.strip().lower()
-    
-    logger.info(f"LLM routing decision: {route} for message: {user_message}")
-    
-    # Validate the response
-    if route in ["cal_sum", "create_synthesis_of_week"]:
-        return route
-    else:
-        logger.info(f"Not one of the chosen routes...defaulting to chatbot")
-        return "chatbot"
+    # Keyword/bag-of-words tiers decide most messages locally, the LLM is only a fallback
+    return router.route(user_message).route
 
 
 # Tools for the ToolNode (must be properly formatted)
@@ -275,31 +361,78 @@ tools_for_node = [
     zoom_out,
     comprehensive_github_analysis,
     save_focus_items,
+    get_focus_items,
+    update_focus_item,
+    get_jira_metrics,
 ]
-tool_node = ToolNode(tools=tools_for_node)
+# Plain functions become tools named after themselves, as ToolNode names them
+tool_output_kinds = {getattr(t, "name", None) or t.__name__: tool_output_kind(t) for t in tools_for_node}
 
 
-memory = MemorySaver()
-graph_builder = StateGraph(State)
+def last_tool_messages(messages: list) -> List[ToolMessage]:
+    """The ToolMessages answering the most recent round of tool calls."""
+    tool_messages = []
+    for message in reversed(messages):
+        if not isinstance(message, ToolMessage):
+            break
+        tool_messages.append(message)
+    return list(reversed(tool_messages))
 
-# Add nodes to graph
-graph_builder.add_node("conversation_starter_chain", conversation_starter_chain)
-graph_builder.add_node("cal_sum", calendar_summary_chain)
-graph_builder.add_node("create_synthesis_of_week", create_synthesis_of_week_chain)
-graph_builder.add_node("chatbot", chatbot_gen_chain)
-graph_builder.add_node("tools", tool_node)
 
+def route_tool_output(state) -> Literal["deliver_tool_output", "chatbot"]:
+    """User-ready tool output skips the chatbot's formatting pass."""
+    tool_messages = last_tool_messages(state["messages"])
+    if tool_messages and all(
+        tool_output_kinds.get(m.name) == OUTPUT_KIND_PROSE and m.status != "error" for m in tool_messages
+    ):
+        logger.info("Delivering user-ready tool output directly: %s", [m.name for m in tool_messages])
+        return "deliver_tool_output"
+    return "chatbot"
 
 
-graph_builder.set_entry_point("conversation_starter_chain")
-graph_builder.add_conditional_edges(
-    "conversation_starter_chain",
-    route_based_on_human_input,
-)
-graph_builder.add_conditional_edges("chatbot", tools_condition)
-graph_builder.add_edge("tools", "chatbot")
+def deliver_tool_output(state):
+    content = "\n\n".join(str(m.content).strip() for m in last_tool_messages(state["messages"]))
+    state["messages"].append(AIMessage(content=content))
+    return state
+
+
+@lru_cache(maxsize=None)
+def get_graph():
+    """Compiles the graph on first use; later calls (CLI, server, batch, benchmarks) reuse it."""
+    # langgraph.prebuilt pulls in a large import tree; only the compiled graph needs it
+    from langgraph.prebuilt import ToolNode, tools_condition
+
+    # Persists threads across restarts; idle threads get their history compacted
+    memory = SqliteCheckpointer(
+        CHECKPOINT_DB_PATH, idle_ttl=CHECKPOINT_IDLE_TTL_SECONDS, evict_interval=CHECKPOINT_EVICT_INTERVAL_SECONDS
+    )
+    graph_builder = StateGraph(State)
+
+    # Add nodes to graph
+    graph_builder.add_node("conversation_starter_chain", conversation_starter_chain)
+    graph_builder.add_node("cal_sum", calendar_summary_chain)
+    graph_builder.add_node("create_synthesis_of_week", create_synthesis_of_week_chain)
+    graph_builder.add_node("chatbot", chatbot_gen_chain)
+    graph_builder.add_node("tools", ToolNode(tools=tools_for_node))
+    graph_builder.add_node("deliver_tool_output", deliver_tool_output)
+
+    graph_builder.set_entry_point("conversation_starter_chain")
+    graph_builder.add_conditional_edges(
+        "conversation_starter_chain",
+        route_based_on_human_input,
+    )
+    graph_builder.add_conditional_edges("chatbot", tools_condition)
+    graph_builder.add_conditional_edges("tools", route_tool_output)
+    graph_builder.add_edge("deliver_tool_output", END)
+
+    graph_builder.add_edge("cal_sum", "chatbot")
+    graph_builder.add_edge("create_synthesis_of_week", "chatbot")
+
+    return graph_builder.compile(checkpointer=memory)
 
-graph_builder.add_edge("cal_sum", "chatbot")
-graph_builder.add_edge("create_synthesis_of_week", "chatbot")
 
-graph = graph_builder.compile(checkpointer=memory)
\ No newline at end of file
+def __getattr__(name: str):
+    # `from src.chatbot.chatbot import graph` keeps working, compiling on first access
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
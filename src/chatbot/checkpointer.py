@@ -0,0 +1,473 @@
+"""SQLite-backed LangGraph checkpointer.
+
+Replaces MemorySaver so conversations survive restarts and idle threads don't live in the heap:
+- checkpoints only reference channel versions; a channel's value is stored once per new version
+- list channels (the message history) are stored as deltas: the appended tail plus a base version
+- every payload is zlib-compressed
+- nothing is held in memory per thread except a small LRU of message digests used for the deltas;
+  a thread is read back from disk lazily the first time it is accessed
+- threads idle for longer than a TTL have their history compacted down to the latest checkpoint, by a
+  background thread every `evict_interval` seconds rather than by the turns that write checkpoints
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+logger = logging.getLogger(__name__)
+
+# Write a full snapshot of a list channel after this many consecutive deltas
+MAX_DELTA_CHAIN = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    base_version TEXT,
+    depth INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    blob BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_last_access ON threads (last_access);
+"""
+
+
+class SqliteCheckpointer(BaseCheckpointSaver):
+    def __init__(
+        self,
+        path: str,
+        idle_ttl: Optional[float] = None,
+        evict_interval: float = 3600,
+        digest_cache_size: int = 256,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.evict_interval = evict_interval
+        self.digest_cache_size = digest_cache_size
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        # (thread_id, ns, channel) -> (version, depth, per-item digests) of the last stored list value
+        self._digests: "OrderedDict[Tuple[str, str, str], Tuple[str, int, List[bytes]]]" = OrderedDict()
+        self._stop = threading.Event()
+        self._maintenance: Optional[threading.Thread] = None
+        if idle_ttl is not None:
+            self._maintenance = threading.Thread(target=self._run_maintenance, name="checkpointer_maintenance", daemon=True)
+            self._maintenance.start()
+
+    # Serialization
+
+    def _dump(self, value: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        return type_, zlib.compress(data)
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        return self.serde.loads_typed((type_, zlib.decompress(data)))
+
+    def _item_digests(self, items: list) -> List[bytes]:
+        return [hashlib.blake2b(self.serde.dumps_typed(item)[1], digest_size=16).digest() for item in items]
+
+    # Blobs
+
+    def _load_blob(self, thread_id: str, checkpoint_ns: str, channel: str, version: str) -> Any:
+        row = self.conn.execute(
+            "SELECT type, blob, base_version FROM blobs WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+            (thread_id, checkpoint_ns, channel, version),
+        ).fetchone()
+        if row is None or row[0] == "empty":
+            raise KeyError(version)
+        type_, blob, base_version = row
+        value = self._load(type_, blob)
+        if base_version is not None:
+            value = self._load_blob(thread_id, checkpoint_ns, channel, base_version) + value
+        return value
+
+    def _load_channel_values(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        channel_values = {}
+        for channel, version in versions.items():
+            try:
+                channel_values[channel] = self._load_blob(thread_id, checkpoint_ns, channel, str(version))
+            except KeyError:
+                continue
+        return channel_values
+
+    def _cached_digests(self, key: Tuple[str, str, str]) -> Optional[Tuple[str, int, List[bytes]]]:
+        if key in self._digests:
+            self._digests.move_to_end(key)
+            return self._digests[key]
+        # Lazily rebuild from disk, e.g. after a restart
+        row = self.conn.execute(
+            "SELECT version, depth FROM blobs WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND type != 'empty' "
+            "ORDER BY version DESC LIMIT 1",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        value = self._load_blob(*key, row[0])
+        if not isinstance(value, list):
+            return None
+        return self._remember_digests(key, row[0], row[1], self._item_digests(value))
+
+    def _remember_digests(self, key, version: str, depth: int, digests: List[bytes]):
+        self._digests[key] = (version, depth, digests)
+        self._digests.move_to_end(key)
+        while len(self._digests) > self.digest_cache_size:
+            self._digests.popitem(last=False)
+        return self._digests[key]
+
+    def _put_blob(self, thread_id: str, checkpoint_ns: str, channel: str, version: str, values: Dict[str, Any]) -> None:
+        if channel not in values:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO blobs (thread_id, checkpoint_ns, channel, version, type, blob) VALUES (?, ?, ?, ?, 'empty', NULL)",
+                (thread_id, checkpoint_ns, channel, version),
+            )
+            return
+
+        value = values[channel]
+        base_version, depth, payload = None, 0, value
+        if isinstance(value, list):
+            key = (thread_id, checkpoint_ns, channel)
+            digests = self._item_digests(value)
+            previous = self._cached_digests(key)
+            if previous is not None:
+                prev_version, prev_depth, prev_digests = previous
+                if (
+                    prev_version != version
+                    and prev_depth < MAX_DELTA_CHAIN
+                    and digests[: len(prev_digests)] == prev_digests
+                ):
+                    base_version, depth, payload = prev_version, prev_depth + 1, value[len(prev_digests):]
+            self._remember_digests(key, version, depth, digests)
+
+        type_, blob = self._dump(payload)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO blobs (thread_id, checkpoint_ns, channel, version, type, blob, base_version, depth) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (thread_id, checkpoint_ns, channel, version, type_, blob, base_version, depth),
+        )
+
+    # BaseCheckpointSaver
+
+    def _touch(self, thread_id: str) -> None:
+        self.conn.execute(
+            "INSERT INTO threads (thread_id, last_access) VALUES (?, ?) "
+            "ON CONFLICT(thread_id) DO UPDATE SET last_access=excluded.last_access",
+            (thread_id, time.time()),
+        )
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint = self._load(type_, checkpoint_blob)
+        writes = self.conn.execute(
+            "SELECT task_id, channel, type, blob FROM writes WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=? "
+            "ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_channel_values(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self._load(metadata_type, metadata_blob),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[(task_id, channel, self._load(t, b)) for task_id, channel, t, b in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            self._touch(thread_id)
+            return self._tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints"
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id=?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns=?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id=?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        # Read everything under the lock and yield after releasing it: a caller that is slow to
+        # consume the iterator (or abandons it) must not hold up every other thread's checkpoints
+        checkpoint_tuples = []
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(checkpoint_tuples) >= limit:
+                    break
+                checkpoint_tuple = self._tuple(thread_id, checkpoint_ns, row)
+                if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                checkpoint_tuples.append(checkpoint_tuple)
+        yield from checkpoint_tuples
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values = c.pop("channel_values")
+        type_, checkpoint_blob = self._dump(c)
+        metadata_type, metadata_blob = self._dump(metadata)
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                # Only channels that changed in this step get a new blob
+                for channel, version in new_versions.items():
+                    self._put_blob(thread_id, checkpoint_ns, channel, str(version), values)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        config["configurable"].get("checkpoint_id"),
+                        type_,
+                        checkpoint_blob,
+                        metadata_type,
+                        metadata_blob,
+                    ),
+                )
+                self._touch(thread_id)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                # The digest cache may now describe a version that was never written
+                self._digests.clear()
+                raise
+
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special writes (errors, interrupts...) are idempotent, regular ones replace previous attempts
+        verb = "INSERT OR REPLACE" if all(w[0] in WRITES_IDX_MAP for w in writes) else "INSERT OR IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self._dump(value)
+            rows.append(
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel, type_, blob, task_path)
+            )
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("COMMIT")
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.conn.execute("BEGIN")
+            for table in ("checkpoints", "blobs", "writes", "threads"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id=?", (thread_id,))
+            self.conn.execute("COMMIT")
+            for key in [k for k in self._digests if k[0] == thread_id]:
+                del self._digests[key]
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # Idle threads
+
+    def compact_thread(self, thread_id: str) -> None:
+        """Drops a thread's history, keeping only its latest checkpoint fully materialized."""
+        with self._lock:
+            latest = self.get_tuple({"configurable": {"thread_id": thread_id}})
+            if latest is None:
+                return
+            checkpoint_ns = latest.config["configurable"]["checkpoint_ns"]
+            self.delete_thread(thread_id)
+            self.put(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}},
+                latest.checkpoint,
+                latest.metadata,
+                latest.checkpoint["channel_versions"],
+            )
+
+    def evict_idle(self, ttl: float) -> int:
+        """Compacts the history of threads not accessed in `ttl` seconds and drops their cached digests."""
+        cutoff = time.time() - ttl
+        with self._lock:
+            thread_ids = [
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT t.thread_id FROM threads t WHERE t.last_access < ? "
+                    "AND (SELECT COUNT(*) FROM checkpoints c WHERE c.thread_id = t.thread_id) > 1",
+                    (cutoff,),
+                )
+            ]
+        compacted = 0
+        # One thread at a time, so turns of other threads get the lock in between
+        for thread_id in thread_ids:
+            with self._lock:
+                row = self.conn.execute("SELECT last_access FROM threads WHERE thread_id=?", (thread_id,)).fetchone()
+                if row is None or row[0] >= cutoff:
+                    continue  # deleted or accessed since
+                self.compact_thread(thread_id)
+                # compact_thread goes through put, which marks the thread as accessed
+                self.conn.execute("UPDATE threads SET last_access=? WHERE thread_id=?", (cutoff, thread_id))
+                for key in [k for k in self._digests if k[0] == thread_id]:
+                    del self._digests[key]
+                compacted += 1
+        if compacted:
+            logger.info(f"Compacted {compacted} idle threads")
+        return compacted
+
+    def _run_maintenance(self) -> None:
+        while not self._stop.wait(self.evict_interval):
+            try:
+                self.evict_idle(self.idle_ttl)
+            except Exception:
+                logger.exception("Compacting idle threads failed")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops the background compaction of idle threads."""
+        self._stop.set()
+        if self._maintenance is not None:
+            self._maintenance.join(timeout)
+
+    # Async variants run the sync implementation off the event loop
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.get_running_loop().run_in_executor(None, self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await asyncio.get_running_loop().run_in_executor(None, self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.get_running_loop().run_in_executor(None, self.delete_thread, thread_id)
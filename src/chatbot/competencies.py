@@ -0,0 +1,66 @@
+"""Lookup index over competency_matrix.json.
+
+Built once per version of the matrix file (via DataSourceCache.derived) so the level-specific
+slice of the matrix can be answered locally instead of asking the LLM to filter the whole JSON.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class CompetencyIndex:
+    # level -> competency name -> expectations
+    by_level: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)
+    # levels in the order they appear in the matrix (L1, L2, ...)
+    levels: List[str] = field(default_factory=list)
+
+    def next_level(self, level: str) -> Optional[str]:
+        if level not in self.levels:
+            return None
+        i = self.levels.index(level)
+        return self.levels[i + 1] if i + 1 < len(self.levels) else None
+
+    def for_level(self, level: str) -> Dict[str, List[str]]:
+        return self.by_level.get(level, {})
+
+    def diff_to_next_level(self, level: str) -> Dict[str, List[str]]:
+        """Expectations at the next level that aren't already expected at `level`."""
+        next_level = self.next_level(level)
+        if next_level is None:
+            return {}
+        current = self.for_level(level)
+        diff = {}
+        for competency, expectations in self.for_level(next_level).items():
+            new = [e for e in expectations if e not in current.get(competency, [])]
+            if new:
+                diff[competency] = new
+        return diff
+
+    def describe(self, level: str, include_next: bool = True) -> str:
+        """Compact text slice of the matrix for prompts: the level's expectations and what the next level adds."""
+        lines = [f"Competencies for {level}:"]
+        for competency, expectations in self.for_level(level).items():
+            lines.append(f"{competency}:")
+            lines.extend(f"- {e}" for e in expectations)
+        if not self.for_level(level):
+            lines.append(f"(no competencies found for level {level})")
+
+        next_level = self.next_level(level)
+        if include_next and next_level:
+            lines.append(f"\nWhat changes at {next_level}:")
+            for competency, expectations in self.diff_to_next_level(level).items():
+                lines.append(f"{competency}:")
+                lines.extend(f"- {e}" for e in expectations)
+        return "\n".join(lines)
+
+
+def build_competency_index(matrix: dict) -> CompetencyIndex:
+    index = CompetencyIndex()
+    for competency in matrix.get("competencies", []):
+        for level in competency.get("levels", []):
+            name = level["level"]
+            if name not in index.by_level:
+                index.by_level[name] = {}
+                index.levels.append(name)
+            index.by_level[name][competency["name"]] = list(level.get("expectations", []))
+    return index
@@ -0,0 +1,128 @@
+"""Token-budgeted conversation context for the chatbot node.
+
+The last few turns are sent verbatim. Older turns are folded into a running summary kept in
+State ("summary", "summarized_upto"), which is updated incrementally: each fold only summarizes
+the messages that weren't already covered. Tool payloads from earlier turns are replaced by a stub,
+since the AI reply that followed them already carries what mattered.
+"""
+import logging
+from typing import Callable, List, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+logger = logging.getLogger(__name__)
+
+TOOL_STUB = "[Tool output omitted: it was already used in the reply that followed.]"
+
+summary_prompt = """You maintain a running summary of a coaching conversation between a user and their AI career coach.
+Keep the facts, decisions, focus items and commitments the coach will need later. Be concise.
+
+Current summary:
+{summary}
+
+New messages to fold into the summary:
+{transcript}
+
+Return only the updated summary."""
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Counts tokens with tiktoken when it is available, otherwise estimates ~4 characters per token."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: BaseMessage) -> int:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    tokens = count_tokens(content) + 4
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += count_tokens(str(message.tool_calls))
+    return tokens
+
+
+def turn_starts(messages: List[BaseMessage], start: int = 0) -> List[int]:
+    """Indexes where a turn starts, i.e. each HumanMessage at or after `start`."""
+    return [i for i in range(start, len(messages)) if isinstance(messages[i], HumanMessage)]
+
+
+def _stub_tool_payload(message: BaseMessage) -> BaseMessage:
+    if isinstance(message, ToolMessage) and count_tokens(str(message.content)) > 50:
+        return message.model_copy(update={"content": TOOL_STUB})
+    return message
+
+
+def _transcript(messages: List[BaseMessage]) -> str:
+    lines = []
+    for message in messages:
+        if isinstance(message, ToolMessage):
+            continue
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if content.strip():
+            lines.append(f"{message.type}: {content.strip()}")
+    return "\n".join(lines)
+
+
+class ContextManager:
+    def __init__(self, token_budget: int, keep_turns: int, summarizer: Callable[[str], str]):
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summarizer = summarizer
+
+    def _fold(self, summary: str, messages: List[BaseMessage]) -> str:
+        transcript = _transcript(messages)
+        if not transcript:
+            return summary
+        logger.info(f"Folding {len(messages)} messages into the conversation summary")
+        return self.summarizer(summary_prompt.format(summary=summary or "(empty)", transcript=transcript))
+
+    def build(
+        self,
+        system_prompt: str,
+        messages: List[BaseMessage],
+        summary: str = "",
+        summarized_upto: int = 0,
+    ) -> Tuple[List[BaseMessage], str, int]:
+        """Returns (messages to send, updated summary, updated summarized_upto)."""
+        starts = turn_starts(messages, summarized_upto)
+        if not starts:
+            # No user turn yet (e.g. right after the conversation starter)
+            return [SystemMessage(content=system_prompt)] + messages[summarized_upto:], summary, summarized_upto
+
+        # Everything before the last `keep_turns` turns gets folded
+        cutoff = starts[-self.keep_turns] if len(starts) > self.keep_turns else summarized_upto
+        cut_points = [cutoff] + [s for s in starts if s > cutoff]
+        current_turn = starts[-1]
+
+        def assemble(cut: int, summary_text: str) -> List[BaseMessage]:
+            recent = [m if i >= current_turn else _stub_tool_payload(m) for i, m in enumerate(messages[cut:], start=cut)]
+            prefix = [SystemMessage(content=system_prompt)]
+            if summary_text:
+                prefix.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary_text}"))
+            return prefix + recent
+
+        def tokens(prompt: List[BaseMessage]) -> int:
+            return sum(message_tokens(m) for m in prompt)
+
+        # Drop whole turns (oldest first) until we fit; the current turn is always kept
+        while len(cut_points) > 1 and tokens(assemble(cut_points[0], summary)) > self.token_budget:
+            cut_points.pop(0)
+        cutoff = cut_points[0]
+
+        if cutoff > summarized_upto:
+            summary = self._fold(summary, messages[summarized_upto:cutoff])
+            summarized_upto = cutoff
+
+        prompt = assemble(cutoff, summary)
+        logger.info(f"Context: {len(prompt)} messages, ~{tokens(prompt)} tokens (budget {self.token_budget})")
+        return prompt, summary, summarized_upto
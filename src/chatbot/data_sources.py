@@ -0,0 +1,268 @@
+"""Shared in-process cache for the file-backed data sources (Lattice mocks, Gcal, Jira, Github).
+
+Every loader in tools.py goes through a DataSourceCache so each file is parsed once
+and only re-parsed when its mtime/size changes on disk.
+
+Data is partitioned per user (the Employee's employee_id): each user has a directory with the
+same files as src/mocks, which is itself the fixture partition of its employee. TenantDataSources
+keeps one DataSourceCache per user, created on first access and kept in a bounded LRU, so a
+process can serve many users with bounded memory. Callers pick the user with `use_user`, which
+sets a context variable (copied into graph nodes, tools and fan_out stages); loaders keep calling
+`data_sources.load(...)` and get the current user's partition. A partition is only served to the
+employee its employee_data.json names.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.config import DEFAULT_USER_ID, MAX_RESIDENT_USERS, TENANTS_DIR
+
+logger = logging.getLogger(__name__)
+
+MOCKS_DIR = Path(__file__).parent.parent / "mocks"
+
+# Employee ids come from requests and name directories under the tenants root, so they can't
+# contain path separators or start with a dot
+EMPLOYEE_ID_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,127}")
+
+
+def parse_json(f) -> Any:
+    return json.load(f)
+
+
+def parse_text(f) -> str:
+    return f.read()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    reloads: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "reloads": self.reloads}
+
+
+@dataclass
+class _Entry:
+    # (mtime_ns, size) of the file when it was parsed
+    signature: Tuple[int, int]
+    value: Any
+    # derived values (indexes, analytics...) built from this exact version of the file
+    derived: Dict[str, Any] = field(default_factory=dict)
+
+
+class DataSourceCache:
+    """Loads each source file once and keeps the parsed result in memory.
+
+    Values are shared between callers, so treat them as read-only.
+    """
+
+    def __init__(self, root: Path = MOCKS_DIR):
+        self.root = Path(root)
+        self._entries: Dict[str, _Entry] = {}
+        self._digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._lock = threading.RLock()
+        self.stats = CacheStats()
+        # Mutable per-partition state that outlives file versions (incremental indexes, sync clients)
+        self.state: Dict[str, Any] = {}
+
+    def path(self, name: str) -> Path:
+        return self.root / name
+
+    def exists(self, name: str) -> bool:
+        return self.path(name).is_file()
+
+    def _signature(self, path: Path) -> Tuple[int, int]:
+        st = path.stat()
+        return (st.st_mtime_ns, st.st_size)
+
+    def _entry(self, name: str, parser: Callable) -> _Entry:
+        path = self.path(name)
+        signature = self._signature(path)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry.signature == signature:
+                self.stats.hits += 1
+                return entry
+
+            if entry is None:
+                self.stats.misses += 1
+                logger.debug(f"data source miss: {name}")
+            else:
+                self.stats.reloads += 1
+                logger.info(f"data source changed on disk, reloading: {name}")
+
+            with open(path) as f:
+                value = parser(f)
+            entry = _Entry(signature=signature, value=value)
+            self._entries[name] = entry
+            return entry
+
+    def load(self, name: str, parser: Callable = parse_json) -> Any:
+        """Returns the parsed contents of `name`, re-parsing only if the file changed."""
+        return self._entry(name, parser).value
+
+    def load_text(self, name: str) -> str:
+        return self.load(name, parser=parse_text)
+
+    def derived(self, name: str, key: str, builder: Callable[[Any], Any], parser: Callable = parse_json) -> Any:
+        """Returns `builder(parsed source)`, memoized until the source file changes."""
+        entry = self._entry(name, parser)
+        with self._lock:
+            if key not in entry.derived:
+                entry.derived[key] = builder(entry.value)
+            return entry.derived[key]
+
+    def digest(self, name: str) -> str:
+        """sha256 of the file contents, memoized until the file changes. Stable across machines, unlike `version`."""
+        # Kept apart from the parsed entries, so any file (JSON or not) can be fingerprinted without parsing it
+        signature = self._signature(self.path(name))
+        with self._lock:
+            cached = self._digests.get(name)
+            if cached is None or cached[0] != signature:
+                cached = self._digests[name] = (signature, hashlib.sha256(self.path(name).read_bytes()).hexdigest())
+            return cached[1]
+
+    def version(self, name: str) -> Optional[Tuple[int, int]]:
+        """The (mtime_ns, size) signature of the cached version of `name`, if loaded."""
+        entry = self._entries.get(name)
+        return entry.signature if entry else None
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+
+class UnknownUserError(LookupError):
+    pass
+
+
+_current_user: ContextVar[Optional[str]] = ContextVar("coach_user", default=None)
+
+
+@contextmanager
+def use_user(employee_id: Optional[str]) -> Iterator[None]:
+    """Runs the block with `employee_id`'s data (None keeps the current user)."""
+    token = _current_user.set(employee_id or _current_user.get())
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+class TenantDataSources:
+    """One DataSourceCache partition per user, at most `max_resident` of them in memory.
+
+    Attribute access (load, derived, digest, ...) is forwarded to the current user's partition.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_resident: int = 256, default_user: Optional[str] = None):
+        self.root = Path(root) if root else None
+        self.max_resident = max_resident
+        self._default_user = default_user
+        self._fixtures: Dict[str, Path] = {}
+        self._resident: "OrderedDict[str, DataSourceCache]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def register(self, path: Path, employee_id: Optional[str] = None) -> str:
+        """Serves `employee_id` (by default, the one in its employee_data.json) from the directory `path`."""
+        path = Path(path)
+        if employee_id is None:
+            with open(path / "employee_data.json") as f:
+                employee_id = json.load(f)["employee_id"]
+        with self._lock:
+            self._fixtures[employee_id] = path
+            self._resident.pop(employee_id, None)
+        return employee_id
+
+    @property
+    def default_user(self) -> str:
+        if self._default_user:
+            return self._default_user
+        if self._fixtures:
+            return next(iter(self._fixtures))
+        raise UnknownUserError("No default user configured (set COACH_DEFAULT_USER)")
+
+    def set_default_user(self, employee_id: str) -> None:
+        """Makes `employee_id` the user of every context that didn't pick one (e.g. for the CLI)."""
+        self.user_dir(employee_id)
+        self._default_user = employee_id
+
+    def current_user(self) -> str:
+        return _current_user.get() or self.default_user
+
+    def user_dir(self, employee_id: str) -> Path:
+        if employee_id in self._fixtures:
+            return self._fixtures[employee_id]
+        if not isinstance(employee_id, str) or not EMPLOYEE_ID_RE.fullmatch(employee_id):
+            raise UnknownUserError(f"Invalid user id {employee_id!r}")
+        if self.root is not None:
+            path = self.root / employee_id
+            # Also rules out a partition that is a symlink out of the root
+            if (path / "employee_data.json").is_file() and path.resolve().parent == self.root.resolve():
+                return path
+        raise UnknownUserError(f"No data for user {employee_id}")
+
+    def user_ids(self) -> List[str]:
+        """Every user with a data partition."""
+        ids = list(self._fixtures)
+        if self.root is not None and self.root.is_dir():
+            ids += sorted(p.name for p in self.root.iterdir() if (p / "employee_data.json").is_file() and p.name not in ids)
+        return ids
+
+    def has_user(self, employee_id: str) -> bool:
+        try:
+            self.for_user(employee_id)
+            return True
+        except UnknownUserError:
+            return False
+
+    def for_user(self, employee_id: str) -> DataSourceCache:
+        with self._lock:
+            partition = self._resident.get(employee_id)
+            if partition is not None:
+                self._resident.move_to_end(employee_id)
+                return partition
+        partition = DataSourceCache(self.user_dir(employee_id))
+        # A partition copied or renamed without its contents would otherwise serve another user's data
+        owner = partition.load("employee_data.json").get("employee_id")
+        if owner != employee_id:
+            raise UnknownUserError(f"The data partition of {employee_id} belongs to {owner!r}")
+        with self._lock:
+            # Another thread may have loaded it meanwhile; keep the first one
+            partition = self._resident.setdefault(employee_id, partition)
+            self._resident.move_to_end(employee_id)
+            while len(self._resident) > self.max_resident:
+                evicted, _ = self._resident.popitem(last=False)
+                self.evictions += 1
+                logger.debug(f"Evicted data partition of {evicted}")
+        return partition
+
+    def current(self) -> DataSourceCache:
+        return self.for_user(self.current_user())
+
+    @property
+    def resident(self) -> int:
+        return len(self._resident)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.current(), name)
+
+
+data_sources = TenantDataSources(TENANTS_DIR, max_resident=MAX_RESIDENT_USERS, default_user=DEFAULT_USER_ID)
+# The mocks are the fixture partition of their employee
+data_sources.register(MOCKS_DIR)
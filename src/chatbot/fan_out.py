@@ -0,0 +1,86 @@
+"""Concurrent execution of the independent stages inside composite tools.
+
+Composite tools (zoom_in, zoom_out, create_synthesis_of_week, grow_in_career) load several
+data sources and run sub-analyses that don't depend on each other. fan_out runs them on
+thread pools so the tool waits for the slowest stage instead of the sum of all of them.
+
+Loaders (local, cached) and LLM stages (full round trips, any stage allowed more than
+LOADER_TIMEOUT) run on separate pools, so a burst of slow LLM stages can't queue up the loaders
+of other turns. A stage's timeout counts from when it starts running; time spent queued is
+bounded separately by QUEUE_TIMEOUT.
+"""
+import contextvars
+import logging
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Loaders are local/cached, sub-analyses are full LLM round trips
+LOADER_TIMEOUT = 10.0
+LLM_STAGE_TIMEOUT = 60.0
+# How long a stage may wait for a free worker before it counts as timed out
+QUEUE_TIMEOUT = 30.0
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="fan_out")
+_llm_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="fan_out_llm")
+
+
+def _submit(executor: ThreadPoolExecutor, fn: Callable[[], Any]) -> Tuple[Future, threading.Event, list]:
+    """Submits fn in a copy of the caller's context; returns (future, set once it starts, [start time])."""
+    begun, started_at = threading.Event(), []
+    context = contextvars.copy_context()
+
+    def run():
+        started_at.append(time.monotonic())
+        begun.set()
+        return context.run(fn)
+
+    return executor.submit(run), begun, started_at
+
+
+def fan_out(
+    stages: Dict[str, Callable[[], Any]],
+    timeouts: Optional[Dict[str, float]] = None,
+    defaults: Optional[Dict[str, Any]] = None,
+    default_timeout: float = LOADER_TIMEOUT,
+) -> Dict[str, Any]:
+    """Runs every stage concurrently and returns {stage name: result}.
+
+    A stage that fails or exceeds its timeout resolves to its entry in `defaults`;
+    stages without a default re-raise so required inputs still fail loudly.
+    """
+    timeouts = timeouts or {}
+    defaults = defaults or {}
+    started = time.monotonic()
+
+    # Each stage runs in a copy of the caller's context so callbacks/tracing follow it
+    stage_timeouts = {name: timeouts.get(name, default_timeout) for name in stages}
+    submitted = {
+        name: _submit(_llm_executor if stage_timeouts[name] > LOADER_TIMEOUT else _executor, fn)
+        for name, fn in stages.items()
+    }
+
+    results = {}
+    for name, (future, begun, started_at) in submitted.items():
+        try:
+            if not begun.wait(max(started + QUEUE_TIMEOUT - time.monotonic(), 0)):
+                raise FutureTimeoutError()
+            remaining = started_at[0] + stage_timeouts[name] - time.monotonic()
+            results[name] = future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            future.cancel()
+            if name not in defaults:
+                raise TimeoutError(f"Stage {name} timed out")
+            logger.warning(f"Stage {name} timed out, using default")
+            results[name] = defaults[name]
+        except Exception:
+            if name not in defaults:
+                raise
+            logger.exception(f"Stage {name} failed, using default")
+            results[name] = defaults[name]
+
+    logger.info(f"fan_out of {list(stages)} finished in {time.monotonic() - started:.2f}s")
+    return results
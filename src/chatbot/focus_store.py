@@ -0,0 +1,211 @@
+"""Store of the focus items users commit to (saved from the zoom-in focus list).
+
+Items are kept per user and week (the Monday of the week they were committed in) with a status:
+open, done or dropped. Open items carry over, so zoom_in can follow up on them in later weeks.
+
+Many sessions can save at once without contending on SQLite's write lock:
+- the database runs in WAL mode, so reads never wait on the writer
+- all writes go through a queue to a single writer thread, which applies whatever has queued up
+  (up to `batch_size` writes) in one transaction
+- each write returns a Future, resolved once its transaction commits
+"""
+import hashlib
+import itertools
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("open", "done", "dropped")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS focus_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    week_start TEXT NOT NULL,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'open',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS focus_items_user_week_status ON focus_items (user_id, week_start, status);
+CREATE INDEX IF NOT EXISTS focus_items_user_status ON focus_items (user_id, status, week_start);
+"""
+
+_memory_ids = itertools.count()
+
+
+@dataclass
+class FocusItem:
+    id: int
+    user_id: str
+    week_start: date
+    text: str
+    status: str
+    created_at: float
+    updated_at: float
+
+    def describe(self) -> str:
+        return f"[{self.id}] {self.text} ({self.status}, week of {self.week_start.strftime('%B %d')})"
+
+
+def describe_items(items: List[FocusItem]) -> str:
+    return "\n".join(item.describe() for item in items) or "No focus items."
+
+
+class FocusItemStore:
+    def __init__(self, path: str, batch_size: int = 256):
+        # ":memory:" gets a named shared-cache database, so the writer and readers see the same data
+        if path == ":memory:":
+            path = f"file:focus_items_{next(_memory_ids)}?mode=memory&cache=shared"
+        self.path = path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        # Held open for the store's lifetime (and keeps a shared in-memory database alive)
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._queue: "queue.Queue[Tuple[Callable[[sqlite3.Connection], Any], Future]]" = queue.Queue()
+        self.batches = 0
+        self.writes = 0
+        threading.Thread(target=self._write_loop, name="focus-items-writer", daemon=True).start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, uri=self.path.startswith("file:"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets them read while the writer commits
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # Writes
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._apply(batch)
+
+    def _apply(self, batch: List[Tuple[Callable[[sqlite3.Connection], Any], Future]]) -> None:
+        results = []
+        try:
+            self._writer.execute("BEGIN IMMEDIATE")
+            for write, future in batch:
+                # A failing write only fails its own Future, the rest of the batch still commits
+                self._writer.execute("SAVEPOINT item")
+                try:
+                    results.append((future, write(self._writer), None))
+                    self._writer.execute("RELEASE item")
+                except Exception as e:
+                    self._writer.execute("ROLLBACK TO item")
+                    self._writer.execute("RELEASE item")
+                    results.append((future, None, e))
+            self._writer.execute("COMMIT")
+        except Exception as e:
+            logger.exception("Focus item batch failed")
+            if self._writer.in_transaction:
+                self._writer.execute("ROLLBACK")
+            results = [(future, None, e) for _, future in batch]
+        self.batches += 1
+        self.writes += len(batch)
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _submit(self, write: Callable[[sqlite3.Connection], Any]) -> Future:
+        future: Future = Future()
+        self._queue.put((write, future))
+        return future
+
+    def add(self, user_id: str, week_start: date, texts: Iterable[str]) -> Future:
+        """Queues new open items for the week; the Future resolves to their ids."""
+        texts = [t.strip() for t in texts if t and t.strip()]
+
+        def write(conn: sqlite3.Connection) -> List[int]:
+            now = time.time()
+            ids = []
+            for text in texts:
+                cursor = conn.execute(
+                    "INSERT INTO focus_items (user_id, week_start, text, status, created_at, updated_at) VALUES (?, ?, ?, 'open', ?, ?)",
+                    (user_id, week_start.isoformat(), text, now, now),
+                )
+                ids.append(cursor.lastrowid)
+            return ids
+
+        return self._submit(write)
+
+    def set_status(self, user_id: str, item_id: int, status: str) -> Future:
+        """Queues a status change; the Future resolves to whether the user had that item."""
+        if status not in STATUSES:
+            raise ValueError(f"Unknown focus item status {status!r}, expected one of {STATUSES}")
+
+        def write(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute(
+                "UPDATE focus_items SET status=?, updated_at=? WHERE id=? AND user_id=?",
+                (status, time.time(), item_id, user_id),
+            )
+            return cursor.rowcount > 0
+
+        return self._submit(write)
+
+    def flush(self) -> None:
+        """Blocks until everything queued so far is committed."""
+        self._submit(lambda conn: None).result()
+
+    # Reads
+
+    def query(
+        self,
+        user_id: str,
+        week_start: Optional[date] = None,
+        status: Optional[str] = None,
+        before: Optional[date] = None,
+        limit: int = 100,
+    ) -> List[FocusItem]:
+        """Items of a user, optionally for one week / status / weeks before a date; newest week first."""
+        sql = "SELECT id, user_id, week_start, text, status, created_at, updated_at FROM focus_items WHERE user_id=?"
+        params: list = [user_id]
+        if week_start is not None:
+            sql += " AND week_start=?"
+            params.append(week_start.isoformat())
+        if before is not None:
+            sql += " AND week_start<?"
+            params.append(before.isoformat())
+        if status is not None:
+            sql += " AND status=?"
+            params.append(status)
+        sql += " ORDER BY week_start DESC, id LIMIT ?"
+        params.append(limit)
+        rows = self._reader().execute(sql, params).fetchall()
+        return [FocusItem(r[0], r[1], date.fromisoformat(r[2]), r[3], r[4], r[5], r[6]) for r in rows]
+
+    def open_items(self, user_id: str, limit: int = 100) -> List[FocusItem]:
+        return self.query(user_id, status="open", limit=limit)
+
+    def digest(self, user_id: str, status: Optional[str] = None) -> str:
+        """Changes whenever the user's items (with that status) change, for fingerprinting prompts built on them."""
+        sql = "SELECT id, status, updated_at FROM focus_items WHERE user_id=?"
+        params: list = [user_id]
+        if status is not None:
+            sql += " AND status=?"
+            params.append(status)
+        rows = self._reader().execute(sql + " ORDER BY id", params).fetchall()
+        return hashlib.sha256(repr(rows).encode()).hexdigest()
@@ -0,0 +1,282 @@
+"""Incremental sync of a user's Github pull requests into the local PR store (github_prs_results.json).
+
+Instead of re-running the full search and rewriting the store on every call, GithubPRSync keeps a
+cursor on `updated_at` and only asks for PRs updated since the last sync. Pages are followed through
+the Link header, the first page is requested with ETag/If-Modified-Since so an unchanged result costs
+a 304, and results are merged into the store keyed by `html_url`.
+
+The cursor is saved after every page, so an interrupted sync (rate limit, error) resumes where it
+stopped. Github search returns at most SEARCH_RESULT_CAP results per query, so before a query reaches
+that cap the sync starts a new one from the cursor: a first sync of a long history walks it in
+windows of `updated_at` instead of failing on the page past the cap.
+
+GithubSyncScheduler runs the syncs of every user on a background thread. `base_url` points at the
+Github API by default and can point at a local stub server for testing.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional, Union
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_URL = "https://api.github.com"
+
+# Github search stops at 1000 results per query (asking for a page past it is a 422)
+SEARCH_RESULT_CAP = 1000
+
+PR_FIELDS = ("title", "created_at", "closed_at", "updated_at", "state", "html_url", "body", "comments")
+
+
+class RateLimited(Exception):
+    def __init__(self, reset_at: float):
+        super().__init__(f"Github rate limit exceeded until {reset_at}")
+        self.reset_at = reset_at
+
+
+@dataclass
+class SyncResult:
+    pages: int = 0
+    fetched: int = 0
+    changed: int = 0
+    not_modified: bool = False
+
+
+def _normalize_timestamp(value: Optional[str]) -> Optional[str]:
+    # The store uses str(datetime), e.g. "2024-11-18 20:53:51+00:00", like the original PyGithub dump
+    if value is None:
+        return None
+    return str(datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+def normalize_pr(item: dict) -> dict:
+    pr = {name: item.get(name) for name in PR_FIELDS}
+    for name in ("created_at", "closed_at", "updated_at"):
+        pr[name] = _normalize_timestamp(pr[name])
+    return pr
+
+
+def _write_json_atomic(path: Path, data) -> None:
+    # Readers (DataSourceCache) must never see a half-written file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+class GithubPRSync:
+    def __init__(
+        self,
+        token: str,
+        repo: str,
+        author: str,
+        store_path: Path,
+        state_path: Optional[Path] = None,
+        base_url: str = GITHUB_API_URL,
+        per_page: int = 100,
+        session: Optional[requests.Session] = None,
+    ):
+        self.repo = repo
+        self.author = author
+        self.store_path = Path(store_path)
+        self.state_path = Path(state_path) if state_path else self.store_path.with_suffix(".sync_state.json")
+        self.base_url = base_url.rstrip("/")
+        self.per_page = per_page
+        self.session = session or requests.Session()
+        self.session.headers.update(
+            {
+                "Authorization": f"Bearer {token}",
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+            }
+        )
+        self._lock = threading.Lock()
+
+    # Local state
+
+    def _load_state(self) -> dict:
+        if self.state_path.exists():
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {}
+
+    def _load_store(self) -> Dict[str, dict]:
+        if not self.store_path.exists():
+            return {}
+        with open(self.store_path) as f:
+            return {pr["html_url"]: pr for pr in json.load(f)}
+
+    def _save_store(self, store: Dict[str, dict]) -> None:
+        prs = sorted(store.values(), key=lambda pr: pr["created_at"] or "", reverse=True)
+        _write_json_atomic(self.store_path, prs)
+
+    # Github
+
+    def query(self, cursor: Optional[str]) -> str:
+        q = f"repo:{self.repo} is:pr author:{self.author}"
+        if cursor:
+            # Inclusive, so PRs updated in the same second as the cursor aren't missed; merging is idempotent
+            q += f" updated:>={cursor}"
+        return q
+
+    def _get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> requests.Response:
+        response = self.session.get(url, params=params, headers=headers or {}, timeout=30)
+        if response.status_code in (403, 429) and response.headers.get("X-RateLimit-Remaining") == "0":
+            raise RateLimited(float(response.headers.get("X-RateLimit-Reset", time.time() + 60)))
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    def _save_state(self, cursor: Optional[str], headers: Optional[Mapping[str, str]] = None) -> None:
+        _write_json_atomic(
+            self.state_path,
+            {
+                "cursor": cursor,
+                # The validators belong to the query that produced them; a new cursor means a new query
+                "query": self.query(cursor),
+                "etag": headers.get("ETag") if headers else None,
+                "last_modified": headers.get("Last-Modified") if headers else None,
+                "synced_at": time.time(),
+            },
+        )
+
+    def sync_once(self) -> SyncResult:
+        """Fetches PRs updated since the cursor and merges them into the store."""
+        with self._lock:
+            state = self._load_state()
+            start_cursor = cursor = state.get("cursor")
+            result = SyncResult()
+
+            conditional = {}
+            if state.get("query") == self.query(cursor):
+                if state.get("etag"):
+                    conditional["If-None-Match"] = state["etag"]
+                if state.get("last_modified"):
+                    conditional["If-Modified-Since"] = state["last_modified"]
+
+            store: Optional[Dict[str, dict]] = None
+            first_page_headers: Mapping[str, str] = {}
+            # One query per window of `updated_at`, each stopping short of the search result cap
+            while True:
+                window_cursor = cursor
+                response = self._get(
+                    f"{self.base_url}/search/issues",
+                    params={"q": self.query(cursor), "sort": "updated", "order": "asc", "per_page": self.per_page},
+                    headers=conditional,
+                )
+                if response.status_code == 304:
+                    logger.info("Github PRs not modified since last sync")
+                    result.not_modified = True
+                    return result
+                conditional = {}
+                if not result.pages:
+                    first_page_headers = response.headers
+                    store = self._load_store()
+                seen = 0
+                while True:
+                    result.pages += 1
+                    items = response.json().get("items", [])
+                    result.fetched += len(items)
+                    seen += len(items)
+                    changed = 0
+                    for item in items:
+                        pr = normalize_pr(item)
+                        if store.get(pr["html_url"]) != pr:
+                            store[pr["html_url"]] = pr
+                            changed += 1
+                        if item.get("updated_at") and (cursor is None or item["updated_at"] > cursor):
+                            cursor = item["updated_at"]
+                    if changed:
+                        result.changed += changed
+                        self._save_store(store)
+                    # Progress survives a failure on a later page
+                    self._save_state(cursor)
+
+                    next_url = response.links.get("next", {}).get("url")
+                    if not next_url or seen + self.per_page > SEARCH_RESULT_CAP:
+                        break
+                    response = self._get(next_url)
+
+                if not next_url:
+                    break
+                if cursor == window_cursor:
+                    logger.warning(f"Over {SEARCH_RESULT_CAP} PRs updated at {cursor}, some may be missed")
+                    break
+                logger.info(f"Github search window full, continuing from {cursor}")
+
+            if cursor == start_cursor:
+                # Nothing new: the next sync can ask with the first page's validators
+                self._save_state(cursor, first_page_headers)
+            logger.info(
+                f"Github sync: {result.fetched} PRs fetched over {result.pages} pages, {result.changed} changed, cursor={cursor}"
+            )
+            return result
+
+
+Syncs = Union[Mapping[str, GithubPRSync], Callable[[], Mapping[str, GithubPRSync]]]
+
+
+class GithubSyncScheduler:
+    """Runs sync_once of every user's GithubPRSync every `interval` seconds on a daemon thread.
+
+    `syncs` maps user ids to their sync, or is a callable returning that mapping, called every round
+    so users added since are picked up. Users share the token's rate limit, so a rate limited round
+    stops and the next one waits for the reset.
+    """
+
+    def __init__(self, syncs: Syncs, interval: float):
+        self.syncs = syncs
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_results: Dict[str, SyncResult] = {}
+        self.last_errors: Dict[str, Exception] = {}
+
+    def run_round(self) -> float:
+        """Syncs every user once; returns how long to wait before the next round."""
+        syncs = self.syncs() if callable(self.syncs) else self.syncs
+        for user_id, sync in syncs.items():
+            if self._stop.is_set():
+                break
+            try:
+                self.last_results[user_id] = sync.sync_once()
+                self.last_errors.pop(user_id, None)
+            except RateLimited as e:
+                self.last_errors[user_id] = e
+                wait = max(e.reset_at - time.time(), self.interval)
+                logger.warning(f"Github rate limited, next sync in {wait:.0f}s")
+                return wait
+            except Exception as e:
+                self.last_errors[user_id] = e
+                logger.exception(f"Github sync of {user_id} failed")
+        return self.interval
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                wait = self.run_round()
+            except Exception:
+                logger.exception("Github sync round failed")
+                wait = self.interval
+            self._stop.wait(wait)
+
+    def start(self) -> "GithubSyncScheduler":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="github_sync", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,232 @@
+"""Flow analytics over the user's Jira board, from each ticket's `status_changes` history.
+
+The tickets are indexed once by status, assignee and type, and each ticket's history is parsed
+once into a few day-number columns (created, started, done) plus the days it spent in each
+status. The numbers the coaching tools need are then simple passes over those columns:
+- cycle time (first "In Progress" to "Done") and its percentiles
+- time in status, summed over tickets
+- WIP age of the tickets still in progress
+- story points done per week (kept up to date incrementally, not recomputed)
+
+The tables are updated in place: only tickets whose contents changed are re-parsed and
+re-indexed, so a board of tens of thousands of tickets costs one pass to load and then only
+its changes. Updates and queries hold the tables' lock, since turns of the same user query them
+while another syncs them.
+"""
+import threading
+from array import array
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .pr_analytics import _locked, _percentile
+
+WIP_STATUSES = ("In Progress", "In Review")
+DONE_STATUSES = ("Done", "Closed", "Resolved")
+
+# Day numbers (date.toordinal) in the columns; NONE where the ticket hasn't got there
+NONE = -1
+
+
+def _day(value) -> int:
+    return date.fromisoformat(str(value)[:10]).toordinal() if value else NONE
+
+
+def _week(day: int) -> str:
+    d = date.fromordinal(day)
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def status_history(ticket: dict) -> List[Tuple[int, str]]:
+    """(day, status) changes of a ticket in order; a ticket without history sits in its status since creation."""
+    changes = sorted((_day(c["changed_at"]), c["status"]) for c in ticket.get("status_changes") or [] if c.get("changed_at"))
+    return changes or [(_day(ticket.get("created_at")), ticket.get("status") or "To Do")]
+
+
+def parse_history(ticket: dict) -> Tuple[int, int, int, Dict[str, int], str, int]:
+    """(created, started, done, days per completed status, current status, day it was entered) of a ticket."""
+    created = _day(ticket.get("created_at"))
+    changes = status_history(ticket)
+    started = next((day for day, status in changes if status in WIP_STATUSES), NONE)
+    done = changes[-1][0] if changes[-1][1] in DONE_STATUSES else NONE
+    status_days: Dict[str, int] = {}
+    for (day, status), (next_day, _) in zip(changes, changes[1:]):
+        status_days[status] = status_days.get(status, 0) + max(next_day - day, 0)
+    return created, started, done, status_days, changes[-1][1], changes[-1][0]
+
+
+class JiraAnalytics:
+    def __init__(self, tickets: Iterable[dict] = ()):
+        self._lock = threading.RLock()
+        self.tickets: List[dict] = []
+        self.row_by_id: Dict[str, int] = {}
+        self.by_status: Dict[str, Set[int]] = {}
+        self.by_assignee: Dict[str, Set[int]] = {}
+        self.by_type: Dict[str, Set[int]] = {}
+        self.created = array("l")
+        self.started = array("l")
+        self.done = array("l")
+        self.points = array("d")
+        self.entered = array("l")  # day the ticket entered its current status
+        self.status_days: List[Dict[str, int]] = []
+        # assignee -> Monday -> points of their tickets done that week, maintained as tickets change
+        self.points_by_week: Dict[str, Dict[str, float]] = {}
+        self.update(tickets)
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+    # Updates
+
+    def _index(self, row: int, add: bool) -> None:
+        ticket = self.tickets[row]
+        keys = (
+            (self.by_status, ticket.get("status") or ""),
+            (self.by_assignee, (ticket.get("assigned_to") or "").lower()),
+            (self.by_type, ticket.get("type") or ""),
+        )
+        for index, key in keys:
+            if add:
+                index.setdefault(key, set()).add(row)
+            else:
+                index[key].discard(row)
+        if self.done[row] != NONE:
+            weeks = self.points_by_week.setdefault(keys[1][1], {})
+            week = _week(self.done[row])
+            weeks[week] = weeks.get(week, 0) + (self.points[row] if add else -self.points[row])
+            if not weeks[week]:
+                del weeks[week]
+
+    def update(self, tickets: Iterable[dict]) -> int:
+        """Inserts new tickets and refreshes changed ones (keyed by id). Returns the number of rows touched."""
+        touched = 0
+        with self._lock:
+            for ticket in tickets:
+                row = self.row_by_id.get(ticket["id"])
+                if row is not None and self.tickets[row] == ticket:
+                    continue
+                created, started, done, status_days, _, entered = parse_history(ticket)
+                if row is None:
+                    row = self.row_by_id[ticket["id"]] = len(self.tickets)
+                    self.tickets.append(ticket)
+                    self.status_days.append(status_days)
+                    self.created.append(created)
+                    self.started.append(started)
+                    self.done.append(done)
+                    self.points.append(float(ticket.get("points") or 0))
+                    self.entered.append(entered)
+                else:
+                    self._index(row, add=False)
+                    self.tickets[row] = ticket
+                    self.status_days[row] = status_days
+                    self.created[row], self.started[row], self.done[row], self.entered[row] = created, started, done, entered
+                    self.points[row] = float(ticket.get("points") or 0)
+                self._index(row, add=True)
+                touched += 1
+        return touched
+
+    def sync(self, tickets: List[dict]) -> "JiraAnalytics":
+        """Brings the tables in line with the full ticket list, rebuilding only if tickets were removed."""
+        with self._lock:
+            removed = not set(self.row_by_id) <= {ticket["id"] for ticket in tickets}
+        if removed:
+            return JiraAnalytics(tickets)
+        self.update(tickets)
+        return self
+
+    # Queries
+
+    @_locked
+    def rows(self, status: Optional[Sequence[str]] = None, assignee: Optional[str] = None, type: Optional[str] = None) -> List[int]:
+        """Rows matching every given filter (any of `status`), in board order."""
+        selected: Optional[Set[int]] = None
+        if status is not None:
+            selected = set().union(*(self.by_status.get(s, set()) for s in status))
+        for index, key in ((self.by_assignee, assignee and assignee.lower()), (self.by_type, type)):
+            if key is not None:
+                rows = index.get(key, set())
+                selected = rows if selected is None else selected & rows
+        return sorted(range(len(self.tickets)) if selected is None else selected)
+
+    @_locked
+    def tickets_where(self, status: Optional[Sequence[str]] = None, assignee: Optional[str] = None, type: Optional[str] = None) -> List[dict]:
+        return [self.tickets[r] for r in self.rows(status, assignee, type)]
+
+    @_locked
+    def open_tickets(self, assignee: Optional[str] = None) -> List[dict]:
+        """Tickets not done yet, in progress first."""
+        statuses = sorted(set(self.by_status) - set(DONE_STATUSES), key=lambda s: (s not in WIP_STATUSES, s))
+        return [self.tickets[r] for status in statuses for r in self.rows([status], assignee)]
+
+    @_locked
+    def cycle_times(self, assignee: Optional[str] = None) -> List[Tuple[int, int]]:
+        """(days from first "In Progress" to "Done", row) for every done ticket."""
+        return [
+            (self.done[r] - self.started[r], r)
+            for r in self.rows(DONE_STATUSES, assignee)
+            if self.started[r] != NONE and self.done[r] != NONE
+        ]
+
+    @_locked
+    def cycle_time_percentiles(self, assignee: Optional[str] = None, percentiles: Sequence[float] = (50, 90)) -> Dict[float, Optional[float]]:
+        days = sorted(d for d, _ in self.cycle_times(assignee))
+        return {p: _percentile(days, p) for p in percentiles}
+
+    @_locked
+    def time_in_status(self, today: date, assignee: Optional[str] = None) -> Dict[str, int]:
+        """Days spent in each status, summed over tickets (the current status counts until today, except done)."""
+        today_day = today.toordinal()
+        totals: Dict[str, int] = {}
+        for r in self.rows(assignee=assignee):
+            for status, days in self.status_days[r].items():
+                totals[status] = totals.get(status, 0) + days
+            status = self.tickets[r].get("status") or ""
+            if status not in DONE_STATUSES and self.entered[r] != NONE:
+                totals[status] = totals.get(status, 0) + max(today_day - self.entered[r], 0)
+        return totals
+
+    @_locked
+    def wip_ages(self, today: date, assignee: Optional[str] = None) -> List[Tuple[dict, int]]:
+        """(ticket, days since it was first started) for the tickets in progress, oldest first."""
+        today_day = today.toordinal()
+        ages = [
+            (self.tickets[r], max(today_day - (self.started[r] if self.started[r] != NONE else self.entered[r]), 0))
+            for r in self.rows(WIP_STATUSES, assignee)
+        ]
+        return sorted(ages, key=lambda item: item[1], reverse=True)
+
+    @_locked
+    def weekly_points_throughput(self, assignee: Optional[str] = None) -> Dict[str, float]:
+        """Story points done per week, keyed by the Monday starting the week."""
+        if assignee is not None:
+            return dict(sorted(self.points_by_week.get(assignee.lower(), {}).items()))
+        totals: Dict[str, float] = {}
+        for weeks in self.points_by_week.values():
+            for week, points in weeks.items():
+                totals[week] = totals.get(week, 0) + points
+        return dict(sorted(totals.items()))
+
+    @_locked
+    def describe(self, today: date, assignee: Optional[str] = None, weeks: int = 4) -> str:
+        """Plain numbers for prompts."""
+        who = f" for {assignee}" if assignee else ""
+        done = self.cycle_times(assignee)
+        lines = [f"Jira flow metrics{who} as of {today:%B %d, %Y} (computed from ticket status history):"]
+        by_status: Dict[str, int] = {}
+        for r in self.rows(assignee=assignee):
+            status = self.tickets[r].get("status") or ""
+            by_status[status] = by_status.get(status, 0) + 1
+        lines.append("- tickets by status: " + (", ".join(f"{s} {n}" for s, n in sorted(by_status.items())) or "none"))
+        percentiles = self.cycle_time_percentiles(assignee)
+        if done:
+            lines.append(f"- cycle time (in progress to done) over {len(done)} tickets: median {percentiles[50]:.1f} days, p90 {percentiles[90]:.1f} days")
+        wip = self.wip_ages(today, assignee)
+        if wip:
+            lines.append("- in progress for: " + ", ".join(f"{t['id']} {age}d ({t.get('points') or 0} pts)" for t, age in wip))
+        in_status = self.time_in_status(today, assignee)
+        if in_status:
+            lines.append("- days spent per status, summed over tickets: " + ", ".join(f"{s} {d}" for s, d in sorted(in_status.items(), key=lambda kv: -kv[1])))
+        throughput = self.weekly_points_throughput(assignee)
+        monday = today - timedelta(days=today.weekday())
+        recent = [(monday - timedelta(weeks=w)).isoformat() for w in range(weeks, 0, -1)]
+        lines.append("- points done per week: " + ", ".join(f"week of {w} {throughput.get(w, 0):g}" for w in recent))
+        return "\n".join(lines)
@@ -1,5 +1,52 @@
 # Need this here to avoid circular import
 #
-from langchain_openai import ChatOpenAI
+from langchain_core.language_models import BaseChatModel
 
-llm = ChatOpenAI(temperature=0.3)
\ No newline at end of file
+from src.config import (
+    LLM_CACHE_DB_PATH,
+    LLM_CACHE_MEMORY_SIZE,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    TRACE_FILE,
+    require,
+)
+from .llm_cache import CachedChatModel
+from .tracing import build_tracer, install
+
+# Spans for every node, tool and LLM call (see tracing.py)
+tracer = install(build_tracer(TRACE_FILE))
+
+# Cache TTL per scope, as named by the call sites with cache_scope (see llm_cache.py); scopes not
+# listed use LLM_CACHE_TTL_SECONDS
+LLM_CACHE_TTLS = {
+    # Constant prompt
+    "what_can_coach_do": 7 * 24 * 3600,
+    # Deterministic enough to reuse for as long as their inputs are unchanged
+    "classify_route_with_llm": 24 * 3600,
+    "summarize": 24 * 3600,
+    # Free-form coaching drafts on the user's data; cached for a shorter while
+    "prioritize_week": 15 * 60,
+    "zoom_out": 15 * 60,
+    "grow_in_career": 15 * 60,
+    # Schedule suggestions are regenerated on every ask
+    "rethink_schedule": 0,
+    "adjust_schedule": 0,
+}
+
+
+def build_chat_model() -> BaseChatModel:
+    # langchain_openai is the slowest import on startup, and the key is only needed once we call the model
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(temperature=0.3, api_key=require("OPENAI_API_KEY"))
+
+
+# Built on the first call, see CachedChatModel.llm
+llm = CachedChatModel(
+    build_chat_model,
+    LLM_CACHE_DB_PATH,
+    memory_size=LLM_CACHE_MEMORY_SIZE,
+    default_ttl=LLM_CACHE_TTL_SECONDS,
+    ttls=LLM_CACHE_TTLS,
+    max_concurrent=LLM_MAX_CONCURRENCY,
+)
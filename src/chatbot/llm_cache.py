@@ -0,0 +1,291 @@
+"""Content-addressed response cache in front of the shared chat model.
+
+Responses are keyed on a hash of the model, its parameters, the call kwargs and the messages, so
+an identical request is answered from the cache no matter which user, turn or tool sends it:
+- a small in-memory LRU serves hot entries
+- a SQLite table (zlib-compressed) backs it, so entries survive restarts and are shared between processes
+- entries expire after a TTL chosen per scope, named by the call site with `cache_scope(...)` (it sets
+  `config["metadata"]["llm_cache_scope"]`; calls that don't are in DEFAULT_SCOPE); a TTL of 0
+  disables caching for that scope
+- concurrent identical requests are deduplicated: one call goes to the model, the others wait for it
+- calls that do go to the model take one of `max_concurrent` slots (per process), so turns, speculation,
+  the batch job and background work together never have more than that many outstanding; callers that
+  use the model directly (the chatbot's tool-calling turns) take a slot with `upstream_call()`
+
+Cache hits still go through the callbacks (as a chat model run whose metadata carries the cache
+outcome and scope), so tracing sees every call, served from the cache or not.
+
+Everything other than invoke/ainvoke (bind_tools, stream, ...) is delegated to the wrapped model
+uncached, so the chatbot's tool-calling turns are unaffected.
+
+The wrapped model can be given as a factory, which is only called on first use: the client (and
+its credentials) is never built in processes that don't end up calling the model. Likewise the
+SQLite file is only opened (and created) by the first cache lookup.
+"""
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+from langchain_core.callbacks import CallbackManager
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.runnables import ensure_config
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    message BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_expires_at ON llm_cache (expires_at);
+"""
+
+
+DEFAULT_SCOPE = "default"
+
+
+def cache_scope(scope: str, config: Optional[dict] = None) -> dict:
+    """`config` (default empty) with its calls cached under `scope`, the key of their TTL and stats."""
+    config = dict(config or {})
+    config["metadata"] = {**(config.get("metadata") or {}), "llm_cache_scope": scope}
+    return config
+
+
+@dataclass
+class LLMCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    inflight_joins: int = 0
+    misses: int = 0
+    uncached: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.memory_hits + self.disk_hits + self.inflight_joins
+        return hits / (hits + self.misses) if hits + self.misses else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 3)}
+
+
+class CachedChatModel:
+    def __init__(
+        self,
+        llm: Union[BaseChatModel, Callable[[], BaseChatModel]],
+        path: str,
+        memory_size: int = 512,
+        default_ttl: float = 3600,
+        ttls: Optional[Dict[str, float]] = None,
+        max_concurrent: int = 0,
+    ):
+        self._llm = llm if isinstance(llm, BaseChatModel) else None
+        self._factory = None if isinstance(llm, BaseChatModel) else llm
+        self._llm_lock = threading.Lock()
+        self.memory_size = memory_size
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.stats = LLMCacheStats()
+        self.stats_by_scope: Dict[str, LLMCacheStats] = {}
+        self._memory: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        # Slots for calls to the model; 0 leaves them unbounded
+        self.max_concurrent = max_concurrent
+        self._upstream = threading.BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+        self.upstream_active = 0
+        self.upstream_waiting = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The SQLite tier, opened (and created) on first use. Callers hold _db_lock."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @property
+    def llm(self) -> BaseChatModel:
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    self._llm = self._factory()
+        return self._llm
+
+    def __getattr__(self, name: str) -> Any:
+        if name in ("_llm", "_factory", "_llm_lock", "_conn"):
+            # Not set yet (e.g. while unpickling); don't recurse through self.llm
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    @contextmanager
+    def upstream_call(self) -> Iterator[None]:
+        """Holds a slot for one call to the model, waiting for one if all `max_concurrent` are taken."""
+        if self._upstream is None:
+            yield
+            return
+        with self._lock:
+            self.upstream_waiting += 1
+        try:
+            self._upstream.acquire()
+        finally:
+            with self._lock:
+                self.upstream_waiting -= 1
+        with self._lock:
+            self.upstream_active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.upstream_active -= 1
+            self._upstream.release()
+
+    # Keys and scopes
+
+    def cache_key(self, input: Any, **kwargs) -> str:
+        messages = self.llm._convert_input(input).to_messages()
+        payload = {
+            "model": self.llm._llm_type,
+            "params": self.llm._identifying_params,
+            "kwargs": kwargs,
+            "messages": messages_to_dict(messages),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def _scope(config: Optional[dict]) -> str:
+        return ((config or {}).get("metadata") or {}).get("llm_cache_scope") or DEFAULT_SCOPE
+
+    def _record(self, scope: str, outcome: str) -> None:
+        for stats in (self.stats, self.stats_by_scope.setdefault(scope, LLMCacheStats())):
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+
+    # Tiers
+
+    def _get(self, key: str) -> Tuple[Optional[dict], str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    return entry[1], "memory_hits"
+                del self._memory[key]
+        with self._db_lock:
+            row = self.conn.execute("SELECT expires_at, message FROM llm_cache WHERE key=?", (key,)).fetchone()
+        if row is None or row[0] <= now:
+            return None, "misses"
+        message = json.loads(zlib.decompress(row[1]))
+        self._remember(key, row[0], message)
+        return message, "disk_hits"
+
+    def _remember(self, key: str, expires_at: float, message: dict) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, message)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _put(self, key: str, scope: str, ttl: float, message: dict) -> None:
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, message)
+        with self._db_lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, scope, expires_at, message) VALUES (?, ?, ?, ?)",
+                (key, scope, expires_at, zlib.compress(json.dumps(message).encode())),
+            )
+
+    def evict_expired(self) -> int:
+        """Deletes expired entries from the SQLite tier."""
+        with self._db_lock:
+            return self.conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    # Calls
+
+    @staticmethod
+    def _with_cache_metadata(config: Optional[dict], scope: str, outcome: str) -> dict:
+        config = dict(config or {})
+        config["metadata"] = {**(config.get("metadata") or {}), "llm_cache_scope": scope, "llm_cache": outcome}
+        return config
+
+    def _report_hit(self, input: Any, config: dict, message: BaseMessage) -> None:
+        """Runs the cached answer through the callbacks, as the model would have."""
+        config = ensure_config(config)
+        callback_manager = CallbackManager.configure(
+            config.get("callbacks"),
+            inheritable_tags=config.get("tags"),
+            inheritable_metadata=config.get("metadata"),
+        )
+        run_manager = callback_manager.on_chat_model_start(
+            {"name": self.llm.get_name()}, [self.llm._convert_input(input).to_messages()], name=self.llm.get_name()
+        )[0]
+        run_manager.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+
+    def _invoke(self, input: Any, config: Optional[dict], scope: str, **kwargs) -> BaseMessage:
+        ttl = self.ttls.get(scope, self.default_ttl)
+        if not ttl:
+            self._record(scope, "uncached")
+            with self.upstream_call():
+                return self.llm.invoke(input, self._with_cache_metadata(config, scope, "uncached"), **kwargs)
+
+        key = self.cache_key(input, **kwargs)
+        message, outcome = self._get(key)
+        if message is None:
+            with self._lock:
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    future = self._inflight[key] = Future()
+            if leader:
+                try:
+                    with self.upstream_call():
+                        response = self.llm.invoke(input, self._with_cache_metadata(config, scope, outcome), **kwargs)
+                    message = messages_to_dict([response])[0]
+                    self._put(key, scope, ttl, message)
+                    future.set_result(message)
+                except BaseException as e:
+                    future.set_exception(e)
+                    raise
+                finally:
+                    with self._lock:
+                        self._inflight.pop(key, None)
+            else:
+                outcome = "inflight_joins"
+                message = future.result()
+        self._record(scope, outcome)
+        result = messages_from_dict([message])[0]
+        if outcome != "misses":
+            logger.debug(f"LLM cache hit ({outcome}) for {scope}")
+            self._report_hit(input, self._with_cache_metadata(config, scope, outcome), result)
+        return result
+
+    def invoke(self, input: Any, config: Optional[dict] = None, **kwargs) -> BaseMessage:
+        return self._invoke(input, config, self._scope(config), **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[dict] = None, **kwargs) -> BaseMessage:
+        scope = self._scope(config)
+        # Carry the caller's context (parent run for callbacks) into the executor thread
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, lambda: context.run(self._invoke, input, config, scope, **kwargs)
+        )
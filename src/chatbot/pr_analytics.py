@@ -0,0 +1,150 @@
+"""Columnar analytics over the user's Github PRs.
+
+Timestamps are parsed once per PR into epoch-second columns, so the questions every turn asks
+(most discussed, open PRs, slowest to merge, merge-time percentiles, weekly throughput) are simple
+passes over flat arrays instead of re-parsing and fully sorting the PR dicts on each call.
+The table is updated in place: only PRs whose `updated_at` changed are re-parsed. Updates and
+queries hold the table's lock, since turns of the same user query it while another syncs it.
+"""
+import functools
+import heapq
+import math
+import threading
+from array import array
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, TypeVar
+
+NAN = float("nan")
+
+
+def _epoch(value) -> float:
+    if value is None:
+        return NAN
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def _percentile(sorted_values: Sequence[float], p: float) -> Optional[float]:
+    """Linear-interpolated percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+F = TypeVar("F", bound=Callable)
+
+
+def _locked(method: F) -> F:
+    """Runs a query method with the table's (reentrant) lock held, so it never sees a half-applied update."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+class PRAnalytics:
+    def __init__(self, prs: Iterable[dict] = ()):
+        self._lock = threading.RLock()
+        self.prs: List[dict] = []
+        self.row_by_url: Dict[str, int] = {}
+        self.created = array("d")
+        self.closed = array("d")  # NaN while open
+        self.comments = array("l")
+        self.is_open = array("b")
+        self.updated_at: List[Optional[str]] = []
+        self.update(prs)
+
+    def __len__(self) -> int:
+        return len(self.prs)
+
+    def update(self, prs: Iterable[dict]) -> int:
+        """Inserts new PRs and refreshes changed ones (keyed by html_url). Returns the number of rows touched."""
+        touched = 0
+        with self._lock:
+            for pr in prs:
+                row = self.row_by_url.get(pr["html_url"])
+                if row is not None and self.updated_at[row] == pr.get("updated_at") and self.prs[row] == pr:
+                    continue
+                values = (
+                    _epoch(pr.get("created_at")),
+                    _epoch(pr.get("closed_at")),
+                    int(pr.get("comments") or 0),
+                    1 if pr.get("state") == "open" else 0,
+                )
+                if row is None:
+                    self.row_by_url[pr["html_url"]] = len(self.prs)
+                    self.prs.append(pr)
+                    self.updated_at.append(pr.get("updated_at"))
+                    self.created.append(values[0])
+                    self.closed.append(values[1])
+                    self.comments.append(values[2])
+                    self.is_open.append(values[3])
+                else:
+                    self.prs[row] = pr
+                    self.updated_at[row] = pr.get("updated_at")
+                    self.created[row], self.closed[row], self.comments[row], self.is_open[row] = values
+                touched += 1
+        return touched
+
+    def sync(self, prs: List[dict]) -> "PRAnalytics":
+        """Brings the table in line with the full PR list, rebuilding only if PRs were removed."""
+        with self._lock:
+            removed = not set(self.row_by_url) <= {pr["html_url"] for pr in prs}
+        if removed:
+            return PRAnalytics(prs)
+        self.update(prs)
+        return self
+
+    # Queries
+
+    @_locked
+    def top_by_discussion(self, k: int = 1) -> List[dict]:
+        rows = heapq.nlargest(k, range(len(self.prs)), key=self.comments.__getitem__)
+        return [self.prs[r] for r in rows]
+
+    @_locked
+    def open_prs(self) -> List[dict]:
+        return [self.prs[r] for r, is_open in enumerate(self.is_open) if is_open]
+
+    @_locked
+    def merge_seconds(self) -> List[tuple]:
+        """(seconds from creation to close, row) for every closed PR."""
+        return [
+            (closed - created, row)
+            for row, (created, closed) in enumerate(zip(self.created, self.closed))
+            if not math.isnan(closed) and not math.isnan(created)
+        ]
+
+    @_locked
+    def longest_to_merge(self, k: Optional[int] = None) -> List[dict]:
+        durations = self.merge_seconds()
+        if k is not None:
+            ranked = heapq.nlargest(k, durations, key=itemgetter(0))
+        else:
+            ranked = sorted(durations, key=itemgetter(0), reverse=True)
+        return [self.prs[row] for _, row in ranked]
+
+    @_locked
+    def merge_time_percentiles(self, percentiles: Sequence[float] = (50, 90)) -> Dict[float, Optional[float]]:
+        """Time-to-merge percentiles, in hours."""
+        hours = sorted(seconds / 3600 for seconds, _ in self.merge_seconds())
+        return {p: _percentile(hours, p) for p in percentiles}
+
+    @_locked
+    def weekly_throughput(self) -> Dict[str, int]:
+        """Number of PRs closed per week, keyed by the Monday starting the week."""
+        counts: Dict[str, int] = {}
+        for closed in self.closed:
+            if math.isnan(closed):
+                continue
+            day = datetime.fromtimestamp(closed, tz=timezone.utc).date()
+            week = (day - timedelta(days=day.weekday())).isoformat()
+            counts[week] = counts.get(week, 0) + 1
+        return dict(sorted(counts.items()))
@@ -0,0 +1,179 @@
+"""Compact, token-budgeted data sections for tool prompts.
+
+Tool prompts used to interpolate raw dicts, so the model read Python reprs of every field.
+Sources are now serialized compactly before they go into a prompt:
+- lists of records become TSV tables over the projected fields, with duplicate rows dropped
+- nested dicts become an indented outline without quotes, braces or empty values
+- long text is split into non-blank lines
+
+PromptContext counts the tokens of each section. When the total is over the budget, it trims lines
+from the end of the least important sections first. Sections with priority 0 are never trimmed.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Sequence
+
+from .context import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        value = ", ".join(str(v) for v in value)
+    return " ".join(str(value).split())
+
+
+def tsv(rows: Iterable[dict], fields: Sequence[str]) -> str:
+    """Tab-separated table of `fields`, with a header row and duplicate rows removed."""
+    lines = ["\t".join(fields)]
+    seen = set()
+    for row in rows:
+        line = "\t".join(_cell(row.get(name)) for name in fields)
+        if line not in seen:
+            seen.add(line)
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def outline(value, indent: int = 0) -> str:
+    """Nested dicts/lists as indented `key: value` lines, skipping empty values and repeated list items."""
+    pad = "  " * indent
+    lines: List[str] = []
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if item in (None, "", [], {}):
+                continue
+            if isinstance(item, (dict, list)):
+                lines.append(f"{pad}{key}:")
+                lines.append(outline(item, indent + 1))
+            else:
+                lines.append(f"{pad}{key}: {_cell(item)}")
+    elif isinstance(value, list):
+        seen = []
+        for item in value:
+            if item in seen or item in (None, "", [], {}):
+                continue
+            seen.append(item)
+            if isinstance(item, (dict, list)):
+                nested = outline(item, indent + 1)
+                lines.append(f"{pad}-{nested[len(pad) + 1:]}")
+            else:
+                lines.append(f"{pad}- {_cell(item)}")
+    else:
+        lines.append(f"{pad}{_cell(value)}")
+    return "\n".join(line for line in lines if line)
+
+
+def project(record: dict, fields: Sequence[str]) -> dict:
+    return {name: record[name] for name in fields if record.get(name) not in (None, "", [], {})}
+
+
+@dataclass
+class Section:
+    label: str
+    lines: List[str]
+    priority: int
+    keep: int = 0  # leading lines (e.g. a TSV header) that are never trimmed
+    line_tokens: List[int] = field(default_factory=list)
+    trimmed: int = 0
+
+    def __post_init__(self):
+        self.line_tokens = [count_tokens(line) + 1 for line in self.lines]
+
+    @property
+    def tokens(self) -> int:
+        return count_tokens(self.label) + 2 + sum(self.line_tokens)
+
+    def render(self) -> str:
+        lines = list(self.lines)
+        if self.trimmed:
+            lines.append(f"... ({self.trimmed} more lines trimmed)")
+        if len(lines) == 1 and not self.keep:
+            return f"- {self.label}: {lines[0]}"
+        return f"- {self.label}:\n" + "\n".join(lines)
+
+
+class PromptContext:
+    """Collects the data sections of one prompt and renders them within `budget` tokens."""
+
+    def __init__(self, name: str, budget: int):
+        self.name = name
+        self.budget = budget
+        self.sections: List[Section] = []
+
+    def add(self, label: str, text: str, priority: int = 1) -> "PromptContext":
+        """Adds a text section; higher priority numbers are trimmed first, 0 is never trimmed."""
+        lines = [line.rstrip() for line in str(text).splitlines() if line.strip()]
+        self.sections.append(Section(label, lines or ["none"], priority))
+        return self
+
+    def add_table(self, label: str, rows: Iterable[dict], fields: Sequence[str], priority: int = 1) -> "PromptContext":
+        """Adds a TSV section; rows are trimmed from the end, so pass them most relevant first."""
+        lines = tsv(rows, fields).splitlines()
+        self.sections.append(Section(label, lines, priority, keep=1))
+        return self
+
+    def token_counts(self) -> dict:
+        return {section.label: section.tokens for section in self.sections}
+
+    def _trim(self) -> None:
+        total = sum(section.tokens for section in self.sections)
+        # Least important first; equal priorities trim the later section first
+        for section in sorted(reversed(self.sections), key=lambda s: -s.priority):
+            if total <= self.budget or section.priority == 0:
+                break
+            while total > self.budget and len(section.lines) > section.keep:
+                section.lines.pop()
+                total -= section.line_tokens.pop()
+                section.trimmed += 1
+
+    def render(self) -> str:
+        self._trim()
+        counts = self.token_counts()
+        logger.info(f"{self.name} prompt context: {sum(counts.values())}/{self.budget} tokens {counts}")
+        return "\n".join(section.render() for section in self.sections)
+
+
+# Source projections
+
+CALENDAR_FIELDS = ("day", "start", "end", "summary")
+JIRA_FIELDS = ("id", "status", "type", "points", "assigned_to", "title")
+PR_FIELDS = ("title", "state", "created", "closed", "comments", "url")
+USER_CONTEXT_FIELDS = ("first_name", "last_name", "job_title", "level", "team_name", "manager", "start_date", "projects")
+
+
+def calendar_rows(events) -> List[dict]:
+    """Rows for CalendarEvents."""
+    return [
+        {
+            "day": e.start.strftime("%a %b %d"),
+            "start": e.start.strftime("%H:%M"),
+            "end": e.end.strftime("%H:%M"),
+            "summary": e.summary,
+        }
+        for e in events
+    ]
+
+
+def pr_rows(prs: Iterable[dict], body_chars: int = 0) -> List[dict]:
+    rows = []
+    for pr in prs:
+        row = {
+            "title": pr.get("title"),
+            "state": pr.get("state"),
+            "created": (pr.get("created_at") or "")[:10],
+            "closed": (pr.get("closed_at") or "")[:10],
+            "comments": pr.get("comments"),
+            "url": pr.get("html_url"),
+        }
+        if body_chars:
+            row["body"] = _cell(pr.get("body"))[:body_chars]
+        rows.append(row)
+    return rows
+
+
+def user_context_text(user_context: dict) -> str:
+    return outline(project(user_context, USER_CONTEXT_FIELDS))
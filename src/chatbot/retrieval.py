@@ -0,0 +1,265 @@
+"""Local retrieval over the long reference documents (staff engineer guide, tech spec).
+
+Tools used to paste these documents whole into their prompts. Instead they are chunked once into
+passages of at most ~CHUNK_TOKENS tokens, each titled with the heading it falls under,
+and indexed on disk:
+- a SQLite FTS5 table ranks passages with BM25 (porter-stemmed, titles weighted up)
+- when numpy is installed, small local embeddings (hashed word and bigram features, no model to
+  download) are stored in a memory-mapped float32 array next to it
+A search fuses the BM25 and embedding rankings (reciprocal rank fusion) and returns the top k
+passages, so a prompt carries a few hundred tokens of the relevant parts instead of every document.
+
+Index directories are content-addressed by a fingerprint of their documents: users with identical
+documents share one index, and an index is only rebuilt when its documents change.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .context import count_tokens
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TOKENS = 200
+EMBEDDING_DIM = 256
+# Reciprocal rank fusion constant; higher flattens the difference between ranks
+RRF_K = 60
+
+SCHEMA = """
+CREATE TABLE chunks (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL,
+    tokens INTEGER NOT NULL
+);
+CREATE INDEX chunks_source ON chunks (source);
+CREATE VIRTUAL TABLE chunks_fts USING fts5(title, text, content='chunks', content_rowid='id', tokenize='porter unicode61');
+"""
+
+_WORD = re.compile(r"[a-z0-9]+")
+_HEADING = re.compile(r"^\s*#{1,6}\s+(.*?)\s*#*\s*$")
+
+# Document = list of (title, text) sections
+Document = List[Tuple[str, str]]
+
+
+@dataclass
+class Passage:
+    source: str
+    title: str
+    text: str
+    tokens: int
+    score: float = 0.0
+
+
+def describe_passages(passages: Sequence[Passage]) -> str:
+    return "\n\n".join(f"[{p.source}: {p.title}]\n{p.text}" for p in passages) or "No relevant passages."
+
+
+# Chunking
+
+
+def markdown_sections(text: str, default_title: str) -> Document:
+    """Splits text on markdown headings; text before the first heading goes under `default_title`."""
+    sections: Document = []
+    title, lines = default_title, []
+    for line in text.splitlines():
+        heading = _HEADING.match(line)
+        if heading:
+            if any(l.strip() for l in lines):
+                sections.append((title, "\n".join(lines).strip()))
+            title, lines = heading.group(1) or default_title, []
+        else:
+            lines.append(line)
+    if any(l.strip() for l in lines):
+        sections.append((title, "\n".join(lines).strip()))
+    return sections
+
+
+def _split_long(paragraph: str, max_tokens: int) -> List[str]:
+    """Sentence windows of at most `max_tokens` (a single longer sentence is kept whole)."""
+    pieces, current = [], []
+    for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+        if current and count_tokens(" ".join(current + [sentence])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(sentence)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_sections(sections: Document, max_tokens: int = CHUNK_TOKENS) -> Document:
+    """Packs each section's paragraphs into chunks of at most `max_tokens`, never across sections."""
+    chunks: Document = []
+    for title, text in sections:
+        paragraphs = []
+        for paragraph in (p.strip() for p in re.split(r"\n\s*\n|\n", text)):
+            if paragraph:
+                paragraphs += _split_long(paragraph, max_tokens) if count_tokens(paragraph) > max_tokens else [paragraph]
+        current: List[str] = []
+        for paragraph in paragraphs:
+            if current and count_tokens("\n".join(current + [paragraph])) > max_tokens:
+                chunks.append((title, "\n".join(current)))
+                current = []
+            current.append(paragraph)
+        if current:
+            chunks.append((title, "\n".join(current)))
+    return chunks
+
+
+# Embeddings
+
+
+def _numpy():
+    try:
+        import numpy
+
+        return numpy
+    except ImportError:
+        return None
+
+
+def _features(text: str) -> List[str]:
+    words = _WORD.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def embed(texts: Sequence[str], dim: int = EMBEDDING_DIM):
+    """Signed feature-hashing embeddings of words and bigrams, L2-normalized (rows of a float32 array)."""
+    np = _numpy()
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % dim
+            vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+# Index
+
+
+def fts_query(text: str) -> str:
+    """An FTS5 query matching any of the words of `text` (quoted, so user text can't inject syntax)."""
+    words = dict.fromkeys(w for w in _WORD.findall(text.lower()) if len(w) > 1)
+    return " OR ".join(f'"{w}"' for w in words)
+
+
+class RetrievalIndex:
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.conn = sqlite3.connect(f"file:{self.directory / 'index.sqlite'}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.size = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        self.embeddings = None
+        np = _numpy()
+        embeddings_path = self.directory / "embeddings.f32"
+        if np is not None and embeddings_path.exists() and self.size:
+            self.embeddings = np.memmap(embeddings_path, dtype=np.float32, mode="r", shape=(self.size, EMBEDDING_DIM))
+
+    @classmethod
+    def build(cls, directory: Path, documents: Dict[str, Document], embeddings: bool = True) -> "RetrievalIndex":
+        """Chunks and indexes `documents` ({source: [(title, text)]}) into `directory`, atomically."""
+        directory = Path(directory)
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{directory.name}-", dir=directory.parent))
+        try:
+            rows = [
+                (source, title, text, count_tokens(text))
+                for source, sections in documents.items()
+                for title, text in chunk_sections(sections)
+            ]
+            conn = sqlite3.connect(tmp / "index.sqlite")
+            conn.executescript(SCHEMA)
+            conn.executemany("INSERT INTO chunks (id, source, title, text, tokens) VALUES (?, ?, ?, ?, ?)", [(i + 1, *row) for i, row in enumerate(rows)])
+            conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild')")
+            conn.commit()
+            conn.close()
+            np = _numpy()
+            if embeddings and np is not None and rows:
+                vectors = np.memmap(tmp / "embeddings.f32", dtype=np.float32, mode="w+", shape=(len(rows), EMBEDDING_DIM))
+                vectors[:] = embed([f"{title}\n{text}" for _, title, text, _ in rows])
+                vectors.flush()
+                del vectors
+            (tmp / "meta.json").write_text(json.dumps({"chunks": len(rows), "embedding_dim": EMBEDDING_DIM}))
+            try:
+                os.rename(tmp, directory)
+            except OSError:
+                # Built concurrently by another process; theirs is identical
+                shutil.rmtree(tmp, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        logger.info(f"Built retrieval index {directory.name} with {len(rows)} passages")
+        return cls(directory)
+
+    def _bm25(self, query: str, sources: Optional[Sequence[str]], limit: int) -> List[int]:
+        match = fts_query(query)
+        if not match:
+            return []
+        sql = "SELECT chunks.id FROM chunks_fts JOIN chunks ON chunks.id = chunks_fts.rowid WHERE chunks_fts MATCH ?"
+        params: list = [match]
+        if sources:
+            sql += f" AND chunks.source IN ({','.join('?' * len(sources))})"
+            params += list(sources)
+        # bm25() is lower for better matches; titles count double
+        sql += " ORDER BY bm25(chunks_fts, 2.0, 1.0) LIMIT ?"
+        with self._lock:
+            return [row[0] for row in self.conn.execute(sql, params + [limit])]
+
+    def _dense(self, query: str, sources: Optional[Sequence[str]], limit: int) -> List[int]:
+        if self.embeddings is None:
+            return []
+        np = _numpy()
+        scores = self.embeddings @ embed([query])[0]
+        if sources:
+            with self._lock:
+                allowed = [row[0] - 1 for row in self.conn.execute(
+                    f"SELECT id FROM chunks WHERE source IN ({','.join('?' * len(sources))})", list(sources)
+                )]
+            mask = np.full(self.size, -np.inf, dtype=np.float32)
+            mask[allowed] = 0
+            scores = scores + mask
+        top = np.argsort(-scores)[:limit]
+        return [int(i) + 1 for i in top if np.isfinite(scores[i]) and scores[i] > 0]
+
+    def search(self, query: str, k: int = 4, sources: Optional[Sequence[str]] = None) -> List[Passage]:
+        """The `k` passages (of `sources`, default all) most relevant to `query`."""
+        fused: Dict[int, float] = {}
+        for ranking in (self._bm25(query, sources, k * 4), self._dense(query, sources, k * 4)):
+            for rank, chunk_id in enumerate(ranking):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        top = sorted(fused, key=fused.get, reverse=True)[:k]
+        if not top:
+            return []
+        with self._lock:
+            rows = {
+                row[0]: row[1:]
+                for row in self.conn.execute(f"SELECT id, source, title, text, tokens FROM chunks WHERE id IN ({','.join('?' * len(top))})", top)
+            }
+        return [Passage(*rows[i], score=round(fused[i], 5)) for i in top]
+
+
+_build_lock = threading.Lock()
+
+
+def open_index(root: Path, fingerprint: str, documents: Callable[[], Dict[str, Document]], embeddings: bool = True) -> RetrievalIndex:
+    """The index of `fingerprint` under `root`, building it from `documents()` the first time."""
+    directory = Path(root) / fingerprint
+    if not (directory / "meta.json").exists():
+        with _build_lock:
+            if not (directory / "meta.json").exists():
+                return RetrievalIndex.build(directory, documents(), embeddings)
+    return RetrievalIndex(directory)
@@ -0,0 +1,150 @@
+"""Tiered router used by route_based_on_human_input.
+
+1. keyword: regex rules that pick a single node with high confidence.
+2. bow: bag-of-words cosine similarity against a handful of example utterances per node.
+3. llm: only for messages the local tiers can't decide, cached per normalized message.
+"""
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ("cal_sum", "create_synthesis_of_week", "chatbot")
+DEFAULT_ROUTE = "chatbot"
+
+KEYWORD_RULES = {
+    "chatbot": re.compile(
+        r"\b(zoom(ing)?[ -]?(in|out)|github|pull requests?|prs?|career|grow(th)?|competenc\w*|level|manager"
+        r"|save|focus items?|what can (you|the coach) do|rethink|adjust|reschedule)\b"
+    ),
+    "create_synthesis_of_week": re.compile(r"\b(synth\w*|in[- ]?depth|deep(er)?[- ]dive|week ahead)\b"),
+    "cal_sum": re.compile(r"\b(calendar|run[- ]?down|meetings?|events?|what'?s on my)\b"),
+}
+
+EXAMPLES = {
+    "cal_sum": [
+        "give me a simple run down of my calendar",
+        "what is on my calendar this week",
+        "what meetings do I have",
+        "show me my schedule for this week",
+        "the simple one",
+        "just the calendar please",
+    ],
+    "create_synthesis_of_week": [
+        "give me an in depth synthesis of the week ahead",
+        "synthesize my week",
+        "the more in depth one",
+        "what did I do last week and what should I focus on",
+        "help me situate myself for the week",
+        "the synthesis please",
+    ],
+    "chatbot": [
+        "what level am I",
+        "who is my manager",
+        "zoom in on my focus items",
+        "zoom out and think about my career",
+        "how am I doing on github",
+        "save these items for later",
+        "what can the coach do",
+        "help me grow in my career",
+        "thanks",
+    ],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+STOPWORDS = {"a", "an", "the", "i", "me", "my", "is", "are", "do", "to", "of", "on", "for", "and", "please", "what", "this", "just"}
+
+
+def normalize(message: str) -> str:
+    return " ".join(_TOKEN_RE.findall(message.lower()))
+
+
+def _vector(text: str) -> Counter:
+    return Counter(token for token in normalize(text).split() if token not in STOPWORDS)
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    dot = sum(count * b.get(token, 0) for token, count in a.items())
+    if not dot:
+        return 0.0
+    norm_a = math.sqrt(sum(v * v for v in a.values()))
+    norm_b = math.sqrt(sum(v * v for v in b.values()))
+    return dot / (norm_a * norm_b)
+
+
+@dataclass
+class RouteDecision:
+    route: str
+    tier: str  # "empty", "keyword", "bow", "llm" or "llm_cache"
+    score: float = 1.0
+
+
+class Router:
+    def __init__(
+        self,
+        llm_classifier: Optional[Callable[[str], str]] = None,
+        min_score: float = 0.35,
+        min_margin: float = 0.1,
+        cache_size: int = 1024,
+    ):
+        self.llm_classifier = llm_classifier
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.cache_size = cache_size
+        self._centroids = {route: sum((_vector(e) for e in examples), Counter()) for route, examples in EXAMPLES.items()}
+        self._llm_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.tier_counts: Dict[str, int] = Counter()
+
+    def _keyword(self, normalized: str) -> Optional[str]:
+        matches = [route for route, pattern in KEYWORD_RULES.items() if pattern.search(normalized)]
+        # More than one rule firing means the message is ambiguous, let the next tier decide
+        return matches[0] if len(matches) == 1 else None
+
+    def scores(self, normalized: str) -> List[tuple]:
+        vector = _vector(normalized)
+        ranked = [(_cosine(vector, centroid), route) for route, centroid in self._centroids.items()]
+        return sorted(ranked, reverse=True)
+
+    def _llm(self, normalized: str, message: str) -> RouteDecision:
+        with self._lock:
+            if normalized in self._llm_cache:
+                self._llm_cache.move_to_end(normalized)
+                return RouteDecision(self._llm_cache[normalized], "llm_cache")
+
+        route = (self.llm_classifier(message) if self.llm_classifier else DEFAULT_ROUTE).strip().strip('"').lower()
+        if route not in ROUTES:
+            logger.info(f"Not one of the chosen routes ({route})...defaulting to {DEFAULT_ROUTE}")
+            route = DEFAULT_ROUTE
+
+        with self._lock:
+            self._llm_cache[normalized] = route
+            if len(self._llm_cache) > self.cache_size:
+                self._llm_cache.popitem(last=False)
+        return RouteDecision(route, "llm")
+
+    def route(self, message: str) -> RouteDecision:
+        normalized = normalize(message)
+
+        route = self._keyword(normalized)
+        if not normalized:
+            # e.g. the graph's first run, before the user has said anything
+            decision = RouteDecision(DEFAULT_ROUTE, "empty")
+        elif route:
+            decision = RouteDecision(route, "keyword")
+        else:
+            (best, best_route), (second, _) = self.scores(normalized)[:2]
+            if best >= self.min_score and best - second >= self.min_margin:
+                decision = RouteDecision(best_route, "bow", round(best, 3))
+            else:
+                decision = self._llm(normalized, message)
+
+        self.tier_counts[decision.tier] += 1
+        logger.info(f"Routing decision: {decision.route} (tier={decision.tier}, score={decision.score})")
+        logger.debug(f"Routed message: {message}")
+        return decision
@@ -0,0 +1,182 @@
+"""Speculative execution of the nodes a conversation is likely to go to next.
+
+The conversation starter always offers the calendar rundown or the weekly synthesis, and both used
+to be computed only once the user answered. While the user reads and types, the Speculator runs
+them in the background, per thread:
+- when the turn is routed to a speculated node, the node takes its result, waiting for it if it is
+  still running, instead of computing it again
+- the thread's other speculations are discarded: cancelled if they haven't started, otherwise left
+  to finish with their result dropped (threads can't be interrupted; their LLM calls still warm
+  the response cache)
+- at most `max_inflight` speculations run at once across all threads; past that budget new ones
+  are skipped rather than queued, so speculation never delays real turns
+- unused results expire after `ttl` seconds, as the data they were computed from may have changed
+
+Hit-rate metrics (overall and per node) are reported at /healthz.
+"""
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpeculationStats:
+    started: int = 0
+    # A routed node took the speculated result
+    hits: int = 0
+    # A routed node that can be speculated found nothing usable (not started, expired or failed)
+    misses: int = 0
+    # Started but never used
+    discarded: int = 0
+    # Not started, over budget
+    skipped: int = 0
+    failed: int = 0
+    # Work that was already done when results were taken, i.e. latency hidden from the user
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of the speculations started whose result was used."""
+        return self.hits / self.started if self.started else 0.0
+
+    @property
+    def coverage(self) -> float:
+        """Share of the speculatable node runs served from a speculation."""
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "saved_seconds": round(self.saved_seconds, 3),
+            "hit_rate": round(self.hit_rate, 3),
+            "coverage": round(self.coverage, 3),
+        }
+
+
+@dataclass
+class _Speculation:
+    future: Future
+    started: float
+    finished: Optional[float] = None
+
+
+class Speculator:
+    def __init__(self, max_inflight: int = 4, ttl: float = 600):
+        self.max_inflight = max_inflight
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max(max_inflight, 1), thread_name_prefix="speculate")
+        # thread id -> node -> speculation
+        self._threads: Dict[str, Dict[str, _Speculation]] = {}
+        self._inflight = 0
+        self._lock = threading.Lock()
+        # Separate from _lock, which is held while expired speculations are discarded
+        self._stats_lock = threading.Lock()
+        self.stats = SpeculationStats()
+        self.stats_by_node: Dict[str, SpeculationStats] = {}
+
+    def _record(self, node: str, outcome: str, amount: float = 1) -> None:
+        with self._stats_lock:
+            for stats in (self.stats, self.stats_by_node.setdefault(node, SpeculationStats())):
+                setattr(stats, outcome, getattr(stats, outcome) + amount)
+
+    def _discard(self, speculations: Iterable[Tuple[str, _Speculation]]) -> None:
+        for node, speculation in speculations:
+            speculation.future.cancel()
+            self._record(node, "discarded")
+
+    def _expire(self, now: float) -> List[Tuple[str, _Speculation]]:
+        """Removes the expired speculations and returns them, to be discarded once the lock is released.
+
+        Called with the lock held. Cancelling a queued future runs its done callback synchronously,
+        and that callback takes the lock, so nothing may be cancelled here.
+        """
+        expired: List[Tuple[str, _Speculation]] = []
+        for thread_id in list(self._threads):
+            speculations = self._threads[thread_id]
+            for node in [node for node, s in speculations.items() if s.started + self.ttl < now]:
+                expired.append((node, speculations.pop(node)))
+            if not speculations:
+                del self._threads[thread_id]
+        return expired
+
+    def _done(self, speculation: _Speculation, future: Future) -> None:
+        speculation.finished = time.monotonic()
+        with self._lock:
+            self._inflight -= 1
+
+    def start(self, thread_id: Optional[str], node: str, fn: Callable[[], Any]) -> bool:
+        """Starts computing `fn()` as `node`'s result for the thread, budget permitting. Returns whether it runs."""
+        if thread_id is None or self.max_inflight <= 0:
+            return False
+        now = time.monotonic()
+        speculation = None
+        with self._lock:
+            expired = self._expire(now)
+            running = node in self._threads.get(thread_id, {})
+            if not running and self._inflight < self.max_inflight:
+                self._inflight += 1
+                self._record(node, "started")
+                # Runs in a context of its own, not the caller's: the caller's run (and its streaming
+                # callbacks) is over by the time this finishes. `fn` picks its user itself
+                context = contextvars.Context()
+                speculation = _Speculation(self._executor.submit(context.run, fn), now)
+                self._threads.setdefault(thread_id, {})[node] = speculation
+        self._discard(expired)
+        if speculation is not None:
+            speculation.future.add_done_callback(lambda future: self._done(speculation, future))
+            return True
+        if not running:
+            self._record(node, "skipped")
+            logger.debug(f"Speculation budget exhausted, not starting {node}")
+        return running
+
+    def take(self, thread_id: Optional[str], node: str) -> Tuple[bool, Any]:
+        """(True, result) if the thread has a usable speculation of `node`, else (False, None).
+
+        Either way the thread's other speculations are discarded: the conversation went elsewhere.
+        """
+        if thread_id is None:
+            return False, None
+        now = time.monotonic()
+        with self._lock:
+            expired = self._expire(now)
+            speculations = self._threads.pop(thread_id, {})
+        speculation = speculations.pop(node, None)
+        self._discard(expired + list(speculations.items()))
+        if speculation is None:
+            self._record(node, "misses")
+            return False, None
+        try:
+            result = speculation.future.result()
+        except Exception:
+            logger.warning(f"Speculative {node} failed, computing it now", exc_info=True)
+            self._record(node, "failed")
+            self._record(node, "misses")
+            return False, None
+        self._record(node, "hits")
+        self._record(node, "saved_seconds", min(speculation.finished or now, now) - speculation.started)
+        logger.info(f"Serving {node} from speculation")
+        return True, result
+
+    def discard(self, thread_id: Optional[str]) -> None:
+        """Drops every speculation of the thread."""
+        with self._lock:
+            speculations = self._threads.pop(thread_id, {})
+        self._discard(speculations.items())
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def as_dict(self) -> dict:
+        return {
+            **self.stats.as_dict(),
+            "inflight": self._inflight,
+            "by_node": {node: stats.as_dict() for node, stats in self.stats_by_node.items()},
+        }
@@ -1,6 +1,5 @@
 from typing import Annotated, TypedDict
 
-from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 
 
@@ -11,5 +10,8 @@ class State(TypedDict):
     messages: Annotated[list, add_messages]
     starter_done: bool
     tool_processed: bool
-
-graph_builder = StateGraph(State)
+    # Rolling summary of the turns that no longer fit in the context window (see context.py)
+    summary: str
+    summarized_upto: int
+    # The user whose data the thread is about (see data_sources.py)
+    employee_id: str
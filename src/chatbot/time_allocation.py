@@ -0,0 +1,143 @@
+"""Deterministic time-allocation engine.
+
+Computes how a week's minutes split across categories instead of asking the LLM to estimate
+percentages from raw JSON:
+- calendar events are classified by rules over their summary (and attendees, when present)
+- focus-work blocks are split between feature work and tech debt in proportion to the days the
+  user's Jira tickets of each kind spent in progress or in review that week (from `status_changes`)
+- PR timestamps give the review turnaround for PRs closed that week
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from statistics import median
+from typing import Dict, List, Optional, Tuple
+
+from .calendar_index import CalendarEvent, CalendarIndex
+from .jira_analytics import NONE, WIP_STATUSES, status_history
+from .pr_analytics import PRAnalytics
+
+CATEGORIES = ("feature work", "tech debt", "code reviews", "meetings", "admin", "pto", "breaks")
+
+# First matching rule wins; "focus" is split into feature work / tech debt using Jira
+CALENDAR_RULES: List[Tuple[str, "re.Pattern"]] = [
+    ("pto", re.compile(r"\b(pto|ooo|out of office|vacation|holiday|sick)\b", re.I)),
+    ("breaks", re.compile(r"\b(lunch|break|coffee)\b", re.I)),
+    ("code reviews", re.compile(r"\b(code review|pr review|review (prs?|pull requests?))\b", re.I)),
+    ("admin", re.compile(r"\b(admin|emails?|expenses?|hiring|interviews?|onboarding|performance review)\b", re.I)),
+    ("meetings", re.compile(r"\b(meeting|sync|1:1|standup|stand-up|retro|planning|workblock|all[- ]hands|demo)\b", re.I)),
+    ("focus", re.compile(r"\b(focus|feature|build|implement|coding|deep work)\b", re.I)),
+]
+
+TECH_DEBT_RE = re.compile(r"tech[- ]debt|refactor|cleanup|upgrade|outdated", re.I)
+
+
+def classify_event(event: CalendarEvent) -> str:
+    for category, pattern in CALENDAR_RULES:
+        if pattern.search(event.summary):
+            return category
+    # Unlabelled events with other people are meetings, solo ones are focus time
+    attendees = event.raw.get("attendees") or []
+    return "meetings" if len(attendees) > 1 else "focus"
+
+
+def is_tech_debt(ticket: dict) -> bool:
+    return ticket.get("type", "").lower() in ("tech debt", "bug") or bool(TECH_DEBT_RE.search(ticket.get("title", "")))
+
+
+def in_progress_days(ticket: dict, start: date, end: date, today: date) -> int:
+    """Days in [start, end) during which the ticket was being worked on (a WIP status)."""
+    changes = [(date.fromordinal(day), status) for day, status in status_history(ticket) if day != NONE]
+    days = 0
+    for i, (changed_at, status) in enumerate(changes):
+        if status not in WIP_STATUSES:
+            continue
+        until = changes[i + 1][0] if i + 1 < len(changes) else max(today, changed_at + timedelta(days=1))
+        overlap = (min(until, end) - max(changed_at, start)).days
+        days += max(overlap, 0)
+    return days
+
+
+@dataclass
+class TimeAllocation:
+    week_start: date
+    minutes: Dict[str, float] = field(default_factory=dict)
+    # ticket id -> (category, days in progress this week)
+    jira_work: Dict[str, Tuple[str, int]] = field(default_factory=dict)
+    prs_closed: int = 0
+    median_review_hours: Optional[float] = None
+
+    @property
+    def total_minutes(self) -> float:
+        return sum(self.minutes.values())
+
+    def percentages(self) -> Dict[str, float]:
+        total = self.total_minutes
+        return {c: round(100 * m / total, 1) for c, m in self.minutes.items()} if total else {}
+
+    def describe(self) -> str:
+        """Plain numbers for prompts."""
+        lines = [f"Time allocation for the week of {self.week_start.strftime('%B %d, %Y')} (computed from calendar, Jira and Github):"]
+        percentages = self.percentages()
+        for category in CATEGORIES:
+            if self.minutes.get(category):
+                lines.append(f"- {category}: {self.minutes[category] / 60:.1f}h ({percentages[category]}%)")
+        if not self.total_minutes:
+            lines.append("- no calendar events this week")
+        if self.jira_work:
+            work = ", ".join(f"{tid} ({cat}, {days}d)" for tid, (cat, days) in self.jira_work.items())
+            lines.append(f"- Jira tickets in progress: {work}")
+        lines.append(f"- PRs closed: {self.prs_closed}")
+        if self.median_review_hours is not None:
+            lines.append(f"- median PR open-to-close time: {self.median_review_hours:.1f}h")
+        return "\n".join(lines)
+
+
+def compute_time_allocation(
+    week_start: date,
+    calendar: CalendarIndex,
+    jira: List[dict],
+    prs: PRAnalytics,
+    assignee: str,
+    today: date,
+) -> TimeAllocation:
+    week_end = week_start + timedelta(days=7)
+    allocation = TimeAllocation(week_start=week_start)
+
+    focus_minutes = 0.0
+    for event in calendar.week(week_start):
+        category = classify_event(event)
+        if category == "focus":
+            focus_minutes += event.minutes
+        else:
+            allocation.minutes[category] = allocation.minutes.get(category, 0) + event.minutes
+
+    feature_days = debt_days = 0
+    for ticket in jira:
+        if (ticket.get("assigned_to") or "").lower() != assignee.lower():
+            continue
+        days = in_progress_days(ticket, week_start, week_end, today)
+        if not days:
+            continue
+        category = "tech debt" if is_tech_debt(ticket) else "feature work"
+        allocation.jira_work[ticket["id"]] = (category, days)
+        if category == "tech debt":
+            debt_days += days
+        else:
+            feature_days += days
+
+    if focus_minutes:
+        # Without Jira activity all focus time counts as feature work
+        debt_share = debt_days / (feature_days + debt_days) if debt_days else 0.0
+        allocation.minutes["feature work"] = allocation.minutes.get("feature work", 0) + focus_minutes * (1 - debt_share)
+        if debt_share:
+            allocation.minutes["tech debt"] = allocation.minutes.get("tech debt", 0) + focus_minutes * debt_share
+
+    start_ts = datetime.combine(week_start, datetime.min.time(), tzinfo=calendar.tz).timestamp()
+    end_ts = datetime.combine(week_end, datetime.min.time(), tzinfo=calendar.tz).timestamp()
+    review_hours = [
+        seconds / 3600 for seconds, row in prs.merge_seconds() if start_ts <= prs.closed[row] < end_ts
+    ]
+    allocation.prs_closed = len(review_hours)
+    allocation.median_review_hours = median(review_hours) if review_hours else None
+    return allocation
@@ -1,74 +1,282 @@
-from datetime import datetime, timedelta
-from dateutil.parser import parse as parse_datetime
-from typing import Literal, List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, Literal, List, Optional
 from langchain_core.messages import AIMessage, ToolMessage
 from langchain_core.tools import tool
+import contextvars
+import hashlib
 import json
 from pathlib import Path
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
-from langgraph.prebuilt import ToolNode
 
 from src.mocks.types import Employee
 from .llm import llm
-from github import Github
-from github import Auth
-from src.config import GITHUB_ACCESS_TOKEN
+from .llm_cache import cache_scope
+from .data_sources import UnknownUserError, data_sources, use_user
+from .fan_out import fan_out, LLM_STAGE_TIMEOUT
+from .competencies import CompetencyIndex, build_competency_index
+from .pr_analytics import PRAnalytics
+from .jira_analytics import DONE_STATUSES, JiraAnalytics
+from .calendar_index import CalendarIndex, format_event, format_slot
+from .time_allocation import TimeAllocation, compute_time_allocation
+from .prompt_context import (
+    CALENDAR_FIELDS,
+    JIRA_FIELDS,
+    PR_FIELDS,
+    PromptContext,
+    calendar_rows,
+    outline,
+    pr_rows,
+    user_context_text,
+)
+from .briefings import BriefingStore
+from .focus_store import FocusItemStore, describe_items
+from .retrieval import RetrievalIndex, describe_passages, markdown_sections, open_index
+from .update_rollups import UpdateRollups, WeekRollup, total_rollup
+from src.config import (
+    GITHUB_API_URL,
+    GITHUB_AUTHOR,
+    GITHUB_REPO,
+    GITHUB_SYNC_INTERVAL_SECONDS,
+    GITHUB_SYNC_STATE_DIR,
+    PROMPT_TOKEN_BUDGET,
+    BRIEFINGS_DB_PATH,
+    FOCUS_DB_PATH,
+    RETRIEVAL_DIR,
+    RETRIEVAL_EMBEDDINGS,
+    RETRIEVAL_TOP_K,
+    UPDATE_ROLLUP_WEEKS,
+    UPDATE_SUMMARY_WORKERS,
+    require,
+)
+
+if TYPE_CHECKING:
+    # requests (pulled in by github_sync) is only imported once the sync is used
+    from .github_sync import GithubPRSync, GithubSyncScheduler
+
+
+# Tool output kinds: "raw" data still needs the chatbot's formatting pass,
+# "prose" is already user-ready and is delivered as-is
+OUTPUT_KIND_RAW = "raw"
+OUTPUT_KIND_PROSE = "prose"
+
+def user_ready(t):
+    """Marks a tool whose output is polished prose that can go straight to the user."""
+    t.metadata = {**(t.metadata or {}), "output_kind": OUTPUT_KIND_PROSE}
+    return t
+
+def tool_output_kind(t) -> str:
+    return (getattr(t, "metadata", None) or {}).get("output_kind", OUTPUT_KIND_RAW)
 
 
 # Lattice Data (User Context, Goals, Feedback, Reviews)
 def get_user_context() -> Employee:
     """Use this to get the user's context."""
-    json_path = Path(__file__).parent.parent / "mocks" / "employee_data.json"
-    with open(json_path) as f:
-        return json.load(f)
+    return data_sources.load("employee_data.json")
     
 def get_competency_matrix() -> dict:
     """Use this to get the user's competency matrix."""
-    json_path = Path(__file__).parent.parent / "mocks" / "competency_matrix.json"
-    with open(json_path) as f:
-        return json.load(f)
+    return data_sources.load("competency_matrix.json")
+
+def get_competency_index() -> CompetencyIndex:
+    """Use this to get the level -> competency -> expectations index of the competency matrix."""
+    return data_sources.derived("competency_matrix.json", "competency_index", build_competency_index)
     
 def get_user_goals() -> dict:
     """Use this to get the user's goals."""
-    json_path = Path(__file__).parent.parent / "mocks" / "user_goals.json"
-    with open(json_path) as f:
-        return json.load(f)
+    return data_sources.load("user_goals.json")
     
 def get_user_updates() -> dict:
     """Use this to get the user's updates."""
-    json_path = Path(__file__).parent.parent / "mocks" / "user_updates.json"
-    with open(json_path) as f:
-        return json.load(f)
+    return data_sources.load("user_updates.json")
     
-# RAG mocking
 def get_tech_spec_data() -> dict:
     """Use this to get the tech spec data."""
-    json_path = Path(__file__).parent.parent / "mocks" / "tech_spec.json"
-    with open(json_path) as f:
-        return json.load(f)
+    return data_sources.load("tech_spec.json")
     
 def get_staff_eng_guide() -> str:
     """Use this to get the staff engineer guide."""
-    json_path = Path(__file__).parent.parent / "mocks" / "staff_eng.py"
-    with open(json_path) as f:
-        return f.read()
+    return data_sources.load_text("staff_eng.py")
+
+# Retrieval over the long documents: prompts get the top passages, not whole documents (see retrieval.py)
+
+# Bump when chunking changes so indexes get rebuilt
+RETRIEVAL_VERSION = "2"
+# Weekly updates are rolled up per week instead (see get_update_history)
+RETRIEVAL_SOURCES = ("staff_eng.py", "tech_spec.json")
+
+def retrieval_documents() -> dict:
+    guide = get_staff_eng_guide()
+    # staff_eng.py wraps the guide in a python string
+    guide = guide.split('"""')[1] if guide.count('"""') >= 2 else guide
+    return {
+        "staff_eng_guide": markdown_sections(guide, "Staff engineer guide"),
+        "tech_spec": markdown_sections(get_tech_spec_data()["content"], "Tech spec"),
+    }
+
+def get_retrieval_index() -> RetrievalIndex:
+    """The current user's index, shared with every user whose documents are identical."""
+    parts = [RETRIEVAL_VERSION] + [f"{name}:{data_sources.digest(name)}" for name in RETRIEVAL_SOURCES]
+    fingerprint = hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+    cached = data_sources.state.get("retrieval_index")
+    if cached is None or cached[0] != fingerprint:
+        cached = (fingerprint, open_index(RETRIEVAL_DIR, fingerprint, retrieval_documents, RETRIEVAL_EMBEDDINGS))
+        data_sources.state["retrieval_index"] = cached
+    return cached[1]
+
+def retrieve(query: str, source: str, k: int = RETRIEVAL_TOP_K) -> str:
+    """The top `k` passages of `source` (staff_eng_guide or tech_spec) for `query`."""
+    return describe_passages(get_retrieval_index().search(query, k, [source]))
+
+# Weekly updates: closed weeks as rollups with a cached summary, the current week raw (see update_rollups.py)
+
+# Bump when the week summary prompt changes so cached summaries get regenerated
+UPDATE_SUMMARY_VERSION = "1"
+
+def _sync_update_rollups(updates: dict) -> UpdateRollups:
+    # Called once per version of the user's updates; only changed weeks are rolled up again
+    state = data_sources.state
+    state["update_rollups"] = state.get("update_rollups", UpdateRollups()).sync(updates["weeklyUpdates"], get_today())
+    return state["update_rollups"]
+
+def get_update_rollups() -> UpdateRollups:
+    """Use this to get the per-week rollups of the user's weekly updates."""
+    rollups = data_sources.derived("user_updates.json", "update_rollups", _sync_update_rollups)
+    today = get_today()
+    if rollups.today != today:
+        # The current week moves on when the day does; the rollups remember their day rather than
+        # being cached per day, which would keep one entry per day the process has been up
+        rollups.sync(data_sources.load("user_updates.json")["weeklyUpdates"], today)
+    return rollups
+
+def _update_summary_key(rollup: WeekRollup) -> tuple:
+    """(briefing store kind, fingerprint) of a week's summary."""
+    return f"update_week:{rollup.week_start.isoformat()}", f"{UPDATE_SUMMARY_VERSION}:{rollup.digest}"
+
+def summarize_update_week(rollup: WeekRollup, week: dict) -> str:
+    """Two or three sentences on a closed week, generated once per version of the week and kept in the briefing store."""
+    user_id = get_user_context()["employee_id"]
+    kind, fingerprint = _update_summary_key(rollup)
+    summary = get_briefing_store().get(user_id, kind, fingerprint)
+    if summary is None:
+        prompt = f"""Here is the weekly update the user wrote for the week of {rollup.week_start:%B %d, %Y}:
+{outline({k: v for k, v in week.items() if k != "weekOf"})}
+
+    Summarize the week in two or three sentences: what they shipped, what they reviewed, the themes
+    of their work and any challenges they mentioned. Refer to the user as "they". Only use facts from the update.
+    """
+        summary = llm.invoke(prompt, config=cache_scope("summarize_update_week")).content.strip()
+        get_briefing_store().put(user_id, kind, fingerprint, summary)
+    return summary
+
+def summarize_update_weeks(max_weeks: int = UPDATE_ROLLUP_WEEKS) -> int:
+    """Generates the missing summaries of the last `max_weeks` closed weeks (run by src.batch). Returns how many were generated."""
+    rollups = get_update_rollups()
+    user_id = get_user_context()["employee_id"]
+    generated = 0
+    for rollup in rollups.closed()[:max_weeks]:
+        if rollup.summary is None and not get_briefing_store().has(user_id, *_update_summary_key(rollup)):
+            generated += 1
+        rollup.summary = summarize_update_week(rollup, rollups.week(rollup.week_start))
+    return generated
+
+# Week summaries missing at turn time are generated in the background on a few workers of their own,
+# not on the fan_out pool: a cold history is up to UPDATE_ROLLUP_WEEKS LLM calls, which would hold up
+# other turns' loaders. The turn itself shows counts only for those weeks
+_summary_executor = ThreadPoolExecutor(max_workers=max(UPDATE_SUMMARY_WORKERS, 1), thread_name_prefix="update_summary")
+_summaries_pending: set = set()
+_summaries_lock = threading.Lock()
+
+def _summarize_in_background(user_id: str, rollup: WeekRollup, week: dict, key: tuple) -> None:
+    try:
+        with use_user(user_id):
+            rollup.summary = summarize_update_week(rollup, week)
+    except Exception:
+        logger.warning(f"Failed to summarize the week of {rollup.week_start} for {user_id}", exc_info=True)
+    finally:
+        with _summaries_lock:
+            _summaries_pending.discard(key)
+
+def schedule_update_summaries(rollups: UpdateRollups, weeks: List[WeekRollup]) -> None:
+    """Queues the summaries of `weeks` that aren't being generated already."""
+    user_id = get_user_context()["employee_id"]
+    for rollup in weeks:
+        key = (user_id, *_update_summary_key(rollup))
+        with _summaries_lock:
+            if key in _summaries_pending:
+                continue
+            _summaries_pending.add(key)
+        # A context of its own: the turn (and its streaming callbacks) may be over before this runs
+        _summary_executor.submit(contextvars.Context().run, _summarize_in_background, user_id, rollup, rollups.week(rollup.week_start), key)
+
+def get_update_history(max_weeks: int = UPDATE_ROLLUP_WEEKS) -> tuple:
+    """The user's updates as (this week's raw entries, rollups of the closed weeks before it).
+
+    The last `max_weeks` closed weeks are listed with their counts, themes and summary, older ones
+    are summed into one line, so the text stays bounded however long the history gets.
+    """
+    rollups = get_update_rollups()
+    closed = rollups.closed()
+    recent, earlier = closed[:max_weeks], closed[max_weeks:]
+    # Summaries come from the briefing store (filled by src.batch or an earlier turn); the ones not
+    # generated yet are queued in the background and their weeks show counts only this time
+    user_id = get_user_context()["employee_id"]
+    missing = []
+    for rollup in recent:
+        if rollup.summary is None:
+            rollup.summary = get_briefing_store().get(user_id, *_update_summary_key(rollup))
+        if rollup.summary is None:
+            missing.append(rollup)
+    if missing and UPDATE_SUMMARY_WORKERS > 0:
+        schedule_update_summaries(rollups, missing)
+
+    current = rollups.current_week()
+    current_text = outline({k: v for k, v in current.items() if k != "weekOf"}) if current else "No update written yet this week."
+    history = "\n".join([r.describe() for r in recent] + ([total_rollup(earlier)] if earlier else []))
+    return (current_text, history or "No earlier updates.")
+
+def add_update_history(context: PromptContext, history: tuple, priority: int = 1) -> PromptContext:
+    """Adds the get_update_history result: this week's update raw, earlier weeks as rollups."""
+    current, rollups = history
+    return (
+        context.add("User's update this week", current, priority)
+        .add("Earlier weekly updates, rolled up per week (counts, themes, summary)", rollups, priority + 1)
+    )
 
 # Integrations (Gcal, Github, Jira)
 def get_jira_data() -> dict:
     """Use this to get the user's Jira data."""
-    json_path = Path(__file__).parent.parent / "mocks" / "jira.json"
-    with open(json_path) as f:
-        return json.load(f)
+    return data_sources.load("jira.json")
+
+def _sync_jira_analytics(tickets: List[dict]) -> JiraAnalytics:
+    # Called once per version of the user's board; only new/changed tickets get re-parsed and re-indexed
+    state = data_sources.state
+    state["jira_analytics"] = state.get("jira_analytics", JiraAnalytics()).sync(tickets)
+    return state["jira_analytics"]
+
+def get_jira_analytics() -> JiraAnalytics:
+    """Use this to get the indexed Jira board with flow metrics from the tickets' status history (see jira_analytics.py)."""
+    return data_sources.derived("jira.json", "jira_analytics", _sync_jira_analytics)
+
+def jira_board_rows(analytics: JiraAnalytics) -> List[dict]:
+    """Every ticket, work still to do first (in progress before to do), so done tickets are trimmed first."""
+    return analytics.open_tickets() + analytics.tickets_where(status=DONE_STATUSES)
+
+@tool
+def get_jira_metrics(assignee: Optional[str] = None) -> str:
+    """Use this for questions about Jira tickets and delivery pace: cycle time, how long tickets have been in progress,
+    time spent per status and story points done per week. Defaults to the user's own tickets; pass a teammate's name for theirs."""
+    assignee = assignee or get_user_context()["first_name"]
+    return get_jira_analytics().describe(get_today(), assignee)
     
 # this is simulating a cache so that we dont have to hit the github api every time
 def get_github_prs_cache() -> List[dict]:
     """Use this to get the user's github pull requests."""
-    json_path = Path(__file__).parent.parent / "mocks" / "github_prs_results.json"
-    with open(json_path) as f:
-        return json.load(f)
+    return data_sources.load("github_prs_results.json")
 
 @tool
 def get_user_first_name() -> str:
@@ -79,7 +287,7 @@ def get_user_first_name() -> str:
 @tool
 def get_user_first_name_tool() -> AIMessage:
     """Use this to get the user's first name."""
-    logger.info("get_user_first_name_tool called")
+    logger.debug("get_user_first_name_tool called")
     user_context = get_user_context()
     return AIMessage(content=user_context["first_name"])
 
@@ -87,10 +295,59 @@ def get_user_first_name_tool() -> AIMessage:
 # Integration TOOLS (Gcal, Github, Jira)
 def get_gcal_events() -> dict: 
     """Use this to get Google Calendar events."""
-    json_path = Path(__file__).parent.parent / "mocks" / "gcal.json"
-    logger.info("get_gcal_events invoked")
-    with open(json_path) as f:
-        return json.load(f)
+    logger.debug("get_gcal_events invoked")
+    return data_sources.load("gcal.json")
+
+def get_calendar_index() -> CalendarIndex:
+    """Use this to get the sorted interval index over the Google Calendar events."""
+    return data_sources.derived("gcal.json", "calendar_index", lambda gcal: CalendarIndex(gcal["events"]))
+
+def get_tenant_settings() -> dict:
+    """Optional per-user settings (tenant.json in the user's data partition): today, github_author."""
+    if not data_sources.exists("tenant.json"):
+        return {}
+    return data_sources.load("tenant.json")
+
+def degraded_loader_defaults(*names: str) -> dict:
+    """fan_out defaults for loaders a tool can do without: an empty value, so a slow or failed
+    source degrades the answer instead of failing the tool (the user context stays required)."""
+    empty = {
+        "calendar": lambda: CalendarIndex([]),
+        "jira": JiraAnalytics,
+        "user_goals": dict,
+        "competency_index": CompetencyIndex,
+        "focus_items": list,
+        "github_analysis": lambda: None,
+    }
+    return {name: empty[name]() for name in names}
+
+def get_today() -> date:
+    # Fixture data is anchored to a fixed day (the mocks to the week of November 18, 2024)
+    today = get_tenant_settings().get("today")
+    return date.fromisoformat(today) if today else date.today()
+
+def get_schedule_context(min_minutes: int = 120) -> str:
+    """This week's events and free blocks, computed locally for scheduling prompts."""
+    calendar = get_calendar_index()
+    today = get_today()
+    monday = today - timedelta(days=today.weekday())
+    events = "\n".join(f"- {format_event(e)}" for e in calendar.week(monday))
+    free = "\n".join(f"- {format_slot(slot)}" for slot in calendar.free_slots(today, days=7 - today.weekday(), min_minutes=min_minutes))
+    return f"""This week's events:
+{events or "- none"}
+Free blocks of at least {min_minutes // 60} hours from today on:
+{free or "- none"}"""
+
+def get_time_allocation(week_start: date) -> TimeAllocation:
+    """Minutes per category (feature work, tech debt, code reviews, meetings, ...) for the week starting on `week_start`."""
+    return compute_time_allocation(
+        week_start,
+        calendar=get_calendar_index(),
+        jira=get_jira_analytics().tickets_where(assignee=get_user_context()["first_name"]),
+        prs=get_pr_analytics(),
+        assignee=get_user_context()["first_name"],
+        today=get_today(),
+    )
 
 @tool
 def get_user_context_string() -> str:
@@ -100,19 +357,12 @@ def get_user_context_string() -> str:
 
 
 @tool
-def get_competency_matrix_for_level() -> dict:
+def get_competency_matrix_for_level() -> str:
     """Use this to get the competency matrix related to the user's level."""
     user_context = get_user_context()
     level = user_context["level"]
-    logger.info(f"level: {level}")
-    """Use this to get the user's competency matrix for a given level."""
-    competency_json = get_competency_matrix()
-    competency_prompt = f"""Given this JSON representing the competency matrix: {competency_json},
-    return the competencies for the level {level}. Return this in a string format."""
-    relevant_competencies = llm.invoke(competency_prompt)
-    logger.info(f"Relevant competencies: {relevant_competencies}")
-    logger.info(f"Type of relevant_competencies: {type(relevant_competencies)}")
-    return relevant_competencies
+    logger.debug(f"level: {level}")
+    return get_competency_index().describe(level)
 
 # General Purpose Utilities
 @tool
@@ -125,7 +375,8 @@ def get_day_of_week() -> str:
     """
     # if date is None:
     #     print("No date provided, using current datetime")
-    date = datetime.now()
+    # The user's today, which fixture data pins to a fixed day
+    date = get_today()
 
     return f"""Today is {date.strftime("%A")}."""
 
@@ -136,57 +387,122 @@ def get_day_of_week_tool() -> AIMessage:
     return AIMessage(content=f"Today is {date.strftime('%A')}")
 
 
-# ACTION (write) stubs
+# Focus items (see focus_store.py)
+
+_focus_store = None
+
+def get_focus_store() -> FocusItemStore:
+    global _focus_store
+    if _focus_store is None:
+        _focus_store = FocusItemStore(FOCUS_DB_PATH)
+    return _focus_store
+
+def get_week_start(weeks_back: int = 0) -> date:
+    today = get_today()
+    return today - timedelta(days=today.weekday() + 7 * weeks_back)
+
+@user_ready
+@tool
+def save_focus_items(items: List[str]) -> str:
+    """Saves the focus items the user commits to this week, for follow-up. Pass each item as a short sentence."""
+    user_id = get_user_context()["employee_id"]
+    if not items:
+        return "Which focus items would you like me to save? List them and I will keep track of them for you."
+    # Waits for the commit so the confirmation is true
+    ids = get_focus_store().add(user_id, get_week_start(), items).result()
+    saved = "\n".join(f"- {item.strip()}" for item in items if item and item.strip())
+    logger.debug(f"Saved focus items {ids} for {user_id}")
+    return f"Awesome! I saved those for you:\n{saved}\n\nI will check back in with you tomorrow to see how you are doing on these items."
 
-# TODO: Implement a sqlite3 db to store these items?
-# and then another tool to query the db for focus items
 @tool
-def save_focus_items() -> str:
-    """Saves the user's focus items for follow-up."""
-    # Mock saving to a file/database
-    return f"Awesome! I saved those for you. I will check back in with you tomorrow to see how you are doing on these items."
+def get_focus_items(
+    week: Literal["this_week", "last_week", "all"] = "last_week",
+    status: Optional[Literal["open", "done", "dropped"]] = None,
+) -> str:
+    """Use this to look up the focus items the user saved, e.g. "what did I commit to last week?". Each item shows its id and status."""
+    user_id = get_user_context()["employee_id"]
+    week_start = {"this_week": get_week_start(), "last_week": get_week_start(1), "all": None}[week]
+    return describe_items(get_focus_store().query(user_id, week_start=week_start, status=status))
+
+@tool
+def update_focus_item(item_id: int, status: Literal["open", "done", "dropped"]) -> str:
+    """Use this to mark a saved focus item (by the id shown by get_focus_items) as done, dropped or open again."""
+    user_id = get_user_context()["employee_id"]
+    if not get_focus_store().set_status(user_id, item_id, status).result():
+        return f"No focus item {item_id} found."
+    return f"Marked focus item {item_id} as {status}."
 
 # Analysis zoom-in
+@user_ready
 @tool
-def create_synthesis_of_week() -> AIMessage:
+def create_synthesis_of_week() -> str:
     """Use this to create a synthesis of the week by synthesizing the calendar, github, and lattice data."""
+    return serve_briefing("weekly_synthesis")
+
+def synthesize_week() -> str:
+    """Generates the weekly synthesis (served precomputed by create_synthesis_of_week when possible)."""
 
     # gcal_data = "just whatever"
-    gcal_data = get_gcal_events()["events"]
-    jira_data = get_jira_data()
-    tech_spec_data = get_tech_spec_data()["content"]
-    open_prs = get_github_analysis_raw()
+    today = get_today()
+    last_monday = today - timedelta(days=today.weekday() + 7)
+    inputs = fan_out(
+        {
+            "calendar": get_calendar_index,
+            "jira": get_jira_analytics,
+            "tech_spec_data": lambda: retrieve("tech lead ownership priorities milestones timeline launch", "tech_spec"),
+            "user_context": get_user_context,
+            "open_prs": get_github_analysis_raw,
+            "time_allocation": lambda: get_time_allocation(last_monday).describe(),
+        },
+        timeouts={"open_prs": LLM_STAGE_TIMEOUT},
+        defaults={
+            **degraded_loader_defaults("calendar", "jira"),
+            "tech_spec_data": "Tech spec unavailable.",
+            "open_prs": "Github analysis unavailable.",
+            "time_allocation": "Time allocation unavailable.",
+        },
+    )
+    calendar = inputs["calendar"]
+    context = (
+        PromptContext("create_synthesis_of_week", PROMPT_TOKEN_BUDGET)
+        .add("Time allocation", inputs["time_allocation"], priority=0)
+        .add("Jira flow metrics", inputs["jira"].describe(today, inputs["user_context"]["first_name"]))
+        .add_table("Calendar data", calendar_rows(calendar.week(last_monday) + calendar.week(today - timedelta(days=today.weekday()))), CALENDAR_FIELDS)
+        .add_table("Jira data", jira_board_rows(inputs["jira"]), JIRA_FIELDS, priority=2)
+        .add("Github analysis", inputs["open_prs"], priority=2)
+        .add("Tech spec passages", inputs["tech_spec_data"], priority=3)
+    )
     
         # - Github pull requests: {github_pull_requests}
     
+    this_monday = today - timedelta(days=today.weekday())
     synthesis_prompt = f"""Given the following data:
-    - Calendar data: {gcal_data}
-    - Jira data: {jira_data}
-    - Tech spec data: {tech_spec_data}
-    - Github analysis: {open_prs}
+{context.render()}
 
-    You can assume the date today is November 18, 2024, so last week would begin on November 11, 2024
-    while this week would begin on November 18, 2024.
+    You can assume the date today is {today:%B %d, %Y}, so last week would begin on {last_monday:%B %d, %Y}
+    while this week would begin on {this_monday:%B %d, %Y}.
     
     First, will want to help the user situate themselves, so provide a brief recap of what they did last week. You will do this by filtering through
-    the calendar data, the github pull requests and the jira data to find events and tasks that happened last week. This recap should be in one short paragraph. Based on this data,
-    provide percentage estimates of how much of their time was spent on categories like "feature work", "tech debt", "code reviews", "meetings", "admin", and "pto".
+    the calendar data, the github pull requests and the jira data to find events and tasks that happened last week. This recap should be in one short paragraph.
+    Then share how their time was split across categories using exactly the time allocation numbers above. Do not estimate or change these numbers.
+    Likewise, use the Jira flow metrics as given for how many points they finished and how long their tickets took.
     
-    Second, provide key insights about what their highest priority items are in their job right now: for example, if you read the tech spec and see that the tech lead is listed as "waverly",
+    Second, provide key insights about what their highest priority items are in their job right now: for example, if you read the tech spec and see that the tech lead is listed as "{inputs["user_context"]["first_name"].lower()}",
     and that is also the name pulled from the user context, then you can infer that the user is the tech lead and they need to focus on shipping the product.
     
     Then, in a new paragraph,  ask if the user would like to zoom in and help them think through their focus items for the week, 
     or zoom out and think big picture about their role and career growth.
      """
      
-    synthesis = llm.invoke(synthesis_prompt)
+    synthesis = llm.invoke(synthesis_prompt, config=cache_scope("synthesize_week"))
     synthesis_text = synthesis.content.strip()
     # logger.info(f"synthesis: {synthesis_text}")
     # return synthesis_text
-    return AIMessage(content=synthesis_text)
+    return synthesis_text
 
+@user_ready
 @tool
-def get_calendar_summary(week: Literal["last_week", "this_week"]) -> AIMessage:
+def get_calendar_summary(week: Literal["last_week", "this_week"]) -> str:
     """
     Analyzes calendar events and returns a summary for the specified week.
 
@@ -197,43 +513,31 @@ def get_calendar_summary(week: Literal["last_week", "this_week"]) -> AIMessage:
         str: Summary of events for the specified week.
     """
 
-    events = get_gcal_events()["events"]
-    today = datetime(2024, 11, 18).date()
+    calendar = get_calendar_index()
+    today = get_today()
 
     if week.lower() == "last_week":
         start_of_week = today - timedelta(days=today.weekday() + 7)  # Last Monday
     elif week.lower() == "this_week":
         start_of_week = today - timedelta(days=today.weekday())  # This Monday
     else:
-        return AIMessage(content="Invalid week selection.") 
+        return "Invalid week selection."
 
-    end_of_week = start_of_week + timedelta(days=6)  # Sunday of the specified week@tool
-
-
-    end_of_week = start_of_week + timedelta(days=6)  # Sunday of the specified week
-    # Filter events within the specified week
-    filtered_events = [
-        event
-        for event in events
-        if start_of_week
-        <= datetime.fromisoformat(event["start"]["dateTime"]).date()
-        <= end_of_week
-    ]
-    
-    analysis_of_events = llm.invoke(f"Provide a breakdown of percentage time spent on each event: {filtered_events}")
-    string_of_analysis = f"In addition, here is a breakdown of how you spent your time last week: {analysis_of_events.content.strip()}"
+    week_label = "last week" if week.lower() == "last_week" else "this week"
+    filtered_events = calendar.week(start_of_week)
     if not filtered_events:
-        return f"No events found for {'last week' if week == 'last' else 'this week'}."
+        return f"No events found for {week_label}."
+
+    # Computed locally from the calendar, Jira and Github, no LLM estimate
+    allocation = get_time_allocation(start_of_week)
+    breakdown = ", ".join(
+        f"{category} {percent}%" for category, percent in sorted(allocation.percentages().items(), key=lambda kv: kv[1], reverse=True)
+    )
+    string_of_analysis = f"In addition, here is a breakdown of how you spent your time {week_label}: {breakdown}."
 
-    summary = f"Here's your {'last weeks' if week == 'last' else 'this week'} schedule:"
+    summary = f"Here's your {week_label} schedule:\n"
     for event in filtered_events:
-        start_info = event.get("start", {})
-        start_dt = parse_datetime(start_info["dateTime"])
-        end_info = event.get("end", {})
-        end_dt = parse_datetime(end_info["dateTime"])
-        date_str = start_dt.strftime("%B %d, %Y")
-        time_str = start_dt.strftime("%I:%M %p") + " - " + end_dt.strftime("%I:%M %p")
-        summary += f"- {date_str} at {time_str}: {event['summary']}\n"
+        summary += f"- {format_event(event)}\n"
   
     return_value = f"""
     {summary}
@@ -241,42 +545,48 @@ def get_calendar_summary(week: Literal["last_week", "this_week"]) -> AIMessage:
     {string_of_analysis}
     """
   
-    return AIMessage(content=return_value)
+    return return_value
 
 
+@user_ready
 @tool
-def rethink_schedule() -> AIMessage:
+def rethink_schedule() -> str:
     """Use this to help the user adjust their schedule."""
     
-    gcal_data = get_gcal_events()["events"]
+    schedule_context = get_schedule_context()
     schedule_prompt = f"""Listen to the user input and extract their priority.
-    Then, look at their calendar data ({gcal_data}) and suggest a time that works for them to complete the task.
+    Then, look at their calendar data ({schedule_context}) and suggest a time that works for them to complete the task.
     Offer a range of times, and ask if any work arounds are possible.
     """
-    schedule = llm.invoke(schedule_prompt)
+    schedule = llm.invoke(schedule_prompt, config=cache_scope("rethink_schedule"))
     schedule_text = schedule.content.strip()
-    return AIMessage(content=schedule_text)
+    return schedule_text
 
+@user_ready
 @tool
-def adjust_schedule(state) -> AIMessage:
+def adjust_schedule(state) -> str:
     """Use this to help the user adjust their schedule."""
-    gcal_data = get_gcal_events()["events"]
+    today = get_today()
+    gcal_data = [e.raw for e in get_calendar_index().week(today - timedelta(days=today.weekday()))]
+    schedule_context = get_schedule_context()
 
     adjust_prompt = f"""based on the previous conversation ({state["messages"]}), please help the user adjust their schedule.
     get their current schedule, and then rewrite the gcal json to reflect the changes as discussed.
     
-    Here is the current schedule: {gcal_data}
+    Here is the current schedule for this week: {gcal_data}
+    {schedule_context}
     
     When you are done, say "Here is the updated schedule:" and then output the updated gcal json.
     """
-    adjust = llm.invoke(adjust_prompt)
+    adjust = llm.invoke(adjust_prompt, config=cache_scope("adjust_schedule"))
     adjust_text = adjust.content.strip()
-    return AIMessage(content=adjust_text)
+    return adjust_text
 
+@user_ready
 @tool
-def what_can_coach_do() -> AIMessage:
+def what_can_coach_do() -> str:
     """Suggests actions the Coach can help with."""
-    logger.info("what_can_coach_do invoked")
+    logger.debug("what_can_coach_do invoked")
     # Mock action suggestions
     template = """You are a friendly AI coach who is here to help you through thick and thin.
     Based on this list of tools, provide a bulleted list with a summary and ask the user how they would like to proceed.
@@ -287,35 +597,57 @@ def what_can_coach_do() -> AIMessage:
     - rethink_schedule: Helps the user adjust their schedule.
     - adjust_schedule: Helps the user adjust their schedule.
     - grow_in_career: Helps the user think big picture about their career growth.
+    - save_focus_items / get_focus_items: Saves the focus items the user commits to and follows up on them later.
     """
     
-    what_can_coach_do = llm.invoke(template)
+    what_can_coach_do = llm.invoke(template, config=cache_scope("what_can_coach_do"))
     
     what_can_coach_do_text = what_can_coach_do.content.strip()
-    logger.info(f"what_can_coach_do_text: {what_can_coach_do_text}")
+    logger.debug(f"what_can_coach_do_text: {what_can_coach_do_text}")
 
-    return AIMessage(content=what_can_coach_do_text)
+    return what_can_coach_do_text
 
+@user_ready
 @tool
-def zoom_out() -> AIMessage:
+def zoom_out() -> str:
     """Use this to zoom out and help the user think big picture about their career growth."""
-    logger.info("zoom_out invoked")
-    user_updates = get_user_updates()
-    user_context = get_user_context()
-    user_goals = get_user_goals()
-    competency_matrix = get_competency_matrix()
-    tech_spec_data = get_tech_spec_data()["content"]
-    # staff_eng_guide = get_staff_eng_guide()
-    # staff_eng_guide_summary = llm.invoke(f"Provide a summary of the staff engineer guide: {staff_eng_guide}")
-    most_discussion, open_prs, prs_that_took_longest_to_merge = quick_access_github_analysis()
+    logger.debug("zoom_out invoked")
+    # Not a fan_out stage: it only reads the rollups and stored summaries, and queues missing
+    # summaries on _summary_executor without waiting for them
+    update_history = get_update_history()
+    inputs = fan_out(
+        {
+            "user_context": get_user_context,
+            "user_goals": get_user_goals,
+            "competency_index": get_competency_index,
+            "github_analysis": quick_access_github_analysis,
+        },
+        defaults=degraded_loader_defaults("user_goals", "competency_index", "github_analysis"),
+    )
+    user_context = inputs["user_context"]
+    competencies = inputs["competency_index"].describe(user_context["level"])
+    goals = outline(inputs["user_goals"])
+    # Only the passages about the user's goals and role, not the whole documents
+    passages = fan_out(
+        {
+            "tech_spec": lambda: retrieve(f"{goals}\nmilestones timeline", "tech_spec"),
+            "staff_eng_guide": lambda: retrieve(f"{user_context['job_title']} responsibilities strategy technical direction mentoring", "staff_eng_guide"),
+        },
+        defaults={"tech_spec": "Tech spec unavailable.", "staff_eng_guide": "Staff engineer guide unavailable."},
+    )
+    context = (
+        PromptContext("zoom_out", PROMPT_TOKEN_BUDGET)
+        .add("User context", user_context_text(user_context), priority=0)
+        .add("User goals", goals)
+        .add("Competencies for the user's level and the next one", competencies)
+        .add("Tech spec passages", passages["tech_spec"], priority=3)
+        .add("Staff engineer guide passages", passages["staff_eng_guide"], priority=3)
+    )
+    add_update_history(context, update_history)
+    add_github_activity(context, inputs["github_analysis"], priority=2)
     
     template = f"""You have access to the following user data:
-    - User updates: {user_updates}
-    - User context: {user_context}
-    - User goals: {user_goals}
-    - Tech spec data: {tech_spec_data}
-    - Competency matrix: {competency_matrix}
-    - Recent github activity analysis: {most_discussion}, {open_prs}, {prs_that_took_longest_to_merge}
+{context.render()}
     
     Use this data to think big picture about how the user is working on and how they are working
     towards their goals. Extract the user's level from their context and use that to compare 
@@ -324,35 +656,63 @@ def zoom_out() -> AIMessage:
     In a new paragraph, ask the user if they want to delve further into their career growth, or zoom in on their focus items for the week.
     """
     
-    response = llm.invoke(template)
+    response = llm.invoke(template, config=cache_scope("zoom_out"))
     response_text = response.content.strip()
     
-    return AIMessage(content=response_text)
+    return response_text
 
+@user_ready
 @tool
-def zoom_in() -> AIMessage:
+def zoom_in() -> str:
     """Use this to help the user zoom-in and understand what they can
     do this week to have the most impact. Makes a list of actionable items to complete over the next week and prioritize them."""
-
-
-    gcal_data = get_gcal_events()["events"]
-    jira_data = get_jira_data()
-    tech_spec_data = get_tech_spec_data()["content"]
-    user_goals = get_user_goals()
-    user_context = get_user_context()
-    open_prs = get_github_analysis_raw()
-    
-    jira_data_in_progress = [ticket for ticket in jira_data if ticket["status"] == "In Progress"]
-    jira_data_to_do = [ticket for ticket in jira_data if ticket["status"] == "To Do"]
+    return serve_briefing("zoom_in")
+
+def prioritize_week() -> str:
+    """Generates the zoom-in focus list (served precomputed by zoom_in when possible)."""
+
+    inputs = fan_out(
+        {
+            "calendar": get_calendar_index,
+            "jira": get_jira_analytics,
+            "user_goals": get_user_goals,
+            "user_context": get_user_context,
+            "open_prs": get_github_analysis_raw,
+            "focus_items": lambda: get_focus_store().open_items(get_user_context()["employee_id"]),
+        },
+        timeouts={"open_prs": LLM_STAGE_TIMEOUT},
+        defaults={
+            **degraded_loader_defaults("calendar", "jira", "user_goals", "focus_items"),
+            "open_prs": "Github analysis unavailable.",
+        },
+    )
+    # The spec passages about the milestones and the open tickets
+    jira = inputs["jira"]
+    open_tickets = " ".join(t["title"] for t in jira.open_tickets())
+    tech_spec = retrieve(f"timeline milestones deadlines this week {open_tickets}", "tech_spec")
+    # This week's events first, then earlier ones newest first: tables are trimmed from the end,
+    # so a tight budget drops old history rather than the week being planned
+    calendar = inputs["calendar"]
+    today = get_today()
+    this_monday = today - timedelta(days=today.weekday())
+    this_week = calendar.week(this_monday)
+    earlier = [e for e in reversed(calendar.events) if e.start.date() < this_monday]
+    later = [e for e in calendar.events if e.start.date() >= this_monday + timedelta(days=7)]
+
+    # One Jira table with a status column instead of all / in progress / to do copies
+    context = (
+        PromptContext("zoom_in", PROMPT_TOKEN_BUDGET)
+        .add("User context", user_context_text(inputs["user_context"]), priority=0)
+        .add("Open focus items the user committed to earlier", describe_items(inputs["focus_items"]), priority=0)
+        .add("Jira flow metrics", jira.describe(today, inputs["user_context"]["first_name"]))
+        .add_table("Jira data, in progress and to do first", jira_board_rows(jira), JIRA_FIELDS)
+        .add_table("Calendar data, this week first, then earlier weeks newest first, then later weeks", calendar_rows(this_week + earlier + later), CALENDAR_FIELDS)
+        .add("User goals", outline(inputs["user_goals"]), priority=2)
+        .add("Open PRs", inputs["open_prs"], priority=2)
+        .add("Tech spec passages", tech_spec, priority=3)
+    )
     prioritize_prompt = f"""Given the following data:
-    - Calendar data: {gcal_data}
-    - Jira data: {jira_data}
-    - Tech spec data: {tech_spec_data}
-    - User goals: {user_goals}
-    - User context: {user_context}
-    - Open PRs: {open_prs}
-    - Jira data in progress: {jira_data_in_progress}
-    - Jira data to do: {jira_data_to_do}
+{context.render()}
     
     Based on this data, please provide a list of 7 highly specific actionable items 
     that the user can complete over the next week.
@@ -362,6 +722,10 @@ def zoom_in() -> AIMessage:
     Address the technical tasks that need to be accomplished as well as the project management 
     and admin tasks related to their role.
     Tie each item to specific calendar events or jira tickets when possible.
+    Use the Jira flow metrics: call out tickets that have been in progress for longer than the median cycle time,
+    and keep the week's tickets close to the points the user usually finishes per week.
+    Start by following up on the open focus items the user committed to earlier: carry over the ones
+    that still matter and ask whether the others are done.
     
     Some examples of actionable items:
     - Ask the user about their open PRs and github and ask what needs to be done to get them merged.
@@ -376,48 +740,65 @@ def zoom_in() -> AIMessage:
 
     """
      
-    synthesis = llm.invoke(prioritize_prompt)
+    synthesis = llm.invoke(prioritize_prompt, config=cache_scope("prioritize_week"))
     synthesis_text = synthesis.content.strip()
     # logger.info(f"synthesis: {synthesis_text}")
     # return synthesis_text
-    return AIMessage(content=synthesis_text)
+    return synthesis_text
+
+def _sync_pr_analytics(prs: List[dict]) -> PRAnalytics:
+    # Called once per version of the user's PR store; only new/changed PRs get re-parsed
+    state = data_sources.state
+    state["pr_analytics"] = state.get("pr_analytics", PRAnalytics()).sync(prs)
+    return state["pr_analytics"]
+
+def get_pr_analytics() -> PRAnalytics:
+    """Use this to get the columnar analytics table over the user's github pull requests."""
+    return data_sources.derived("github_prs_results.json", "pr_analytics", _sync_pr_analytics)
 
 def quick_access_github_analysis() -> tuple:
     """Use this to get a quick access list of github pull requests that the user has reviewed."""
-    github_prs = get_github_prs_cache()    
-    most_discussion = sorted(github_prs, key=lambda x: x["comments"], reverse=True)[0]
-    open_prs = [pr for pr in github_prs if pr["state"] == "open"]
-    
-    # Parse the datetime strings before comparing
-    def get_time_to_merge(pr):
-        if pr["closed_at"] is None or pr["created_at"] is None:
-            return 0
-        closed_at = parse_datetime(pr["closed_at"])
-        created_at = parse_datetime(pr["created_at"])
-        return (closed_at - created_at).total_seconds()
-    
-    prs_that_took_longest_to_merge = sorted(
-        [pr for pr in github_prs if pr["closed_at"] is not None], 
-        key=get_time_to_merge,
-        reverse=True
-    )
+    analytics = get_pr_analytics()
+    most_discussion = analytics.top_by_discussion(1)[0]
+    open_prs = analytics.open_prs()
+    prs_that_took_longest_to_merge = analytics.longest_to_merge()
     
     return (most_discussion, open_prs, prs_that_took_longest_to_merge)
 
+def add_github_activity(context: PromptContext, analysis: Optional[tuple], priority: int = 1) -> PromptContext:
+    """Adds the quick_access_github_analysis result as one deduplicated PR table."""
+    if analysis is None:
+        return context.add("Github activity", "Github activity unavailable.", priority)
+    most_discussion, open_prs, prs_that_took_longest_to_merge = analysis
+    context.add("Most discussed PR", f"{most_discussion['title']} ({most_discussion['comments']} comments)", priority)
+    return context.add_table(
+        "Open PRs, then closed PRs by time to merge", pr_rows(open_prs + prs_that_took_longest_to_merge), PR_FIELDS, priority
+    )
+
+@user_ready
 @tool
-def comprehensive_github_analysis() -> AIMessage:
+def comprehensive_github_analysis() -> str:
     """Use this to get a comprehensive analysis of the user's github activity and analyze it."""
     github_prs = get_github_prs_cache()   
-    template = f"""Given the following github pull requests: {github_prs}, provide a
+    context = PromptContext("comprehensive_github_analysis", PROMPT_TOKEN_BUDGET).add_table(
+        "Github pull requests", pr_rows(github_prs, body_chars=300), PR_FIELDS + ("body",)
+    )
+    template = f"""Given the following github pull requests:
+{context.render()}
+    provide a
     comprehensive analysis of the user's github activity. What do most of their PRs relate to?
     How long do they take to merge their PRs? Add any other relevant insights you can find."""
     
-    response = llm.invoke(template)
+    response = llm.invoke(template, config=cache_scope("comprehensive_github_analysis"))
     response_text = response.content.strip()
-    return AIMessage(content=response_text)
+    return response_text
 
 def get_github_analysis_raw() -> str:
     """Use this to get a list of github pull requests that the user has reviewed."""
+    return serve_briefing("github_health")
+
+def github_health_check() -> str:
+    """Generates the Github health check (served precomputed by get_github_analysis_raw when possible)."""
     res = quick_access_github_analysis()
     # logger.info(f"res: {res}")
     # logger.info(f"most_discussion: {most_discussion}")
@@ -428,8 +809,10 @@ def get_github_analysis_raw() -> str:
     # - Open PRs: {open_prs}
     # - PRs that took longest to merge: {prs_that_took_longest_to_merge}
     
-    template = """Analyze the following github pull requests:
-    {res}
+    user_context = get_user_context()
+    context = add_github_activity(PromptContext("github_analysis", PROMPT_TOKEN_BUDGET), res)
+    template = f"""Analyze the following github pull requests:
+{context.render()}
     
     And provide a health check of how the user is doing on github. Does it seem like they are contributing to the codebase?
     Are they responsive to feedback? Are they merging their PRs in a timely manner? Are there any areas where they could improve?
@@ -438,63 +821,56 @@ def get_github_analysis_raw() -> str:
     In general, what do most of their PRs relate to? Are they mostly feature work, or mostly admin tasks?
 
     Return a list of 3 actionable items that the user can complete to improve their github contributions
-    based on the competency matrix for L4s Software engineers above
+    based on the competency matrix for {user_context["level"]} {user_context["job_title"]}s
     """
     
-    analysis = llm.invoke(template)
+    analysis = llm.invoke(template, config=cache_scope("github_health_check"))
     analysis_text = analysis.content.strip()
     return analysis_text
 
 
 
+@user_ready
 @tool
-def get_github_analysis() -> AIMessage:
+def get_github_analysis() -> str:
     """Use this to get a list of github pull requests that the user has reviewed."""
-    res = quick_access_github_analysis()
-    logger.info(f"res: {res}")
-    # logger.info(f"most_discussion: {most_discussion}")
-    # logger.info(f"open_prs: {open_prs}")
-    # logger.info(f"prs_that_took_longest_to_merge: {prs_that_took_longest_to_merge}")    
-    
-    #     - Most discussion: {most_discussion}
-    # - Open PRs: {open_prs}
-    # - PRs that took longest to merge: {prs_that_took_longest_to_merge}
-    
-    template = """Analyze the following github pull requests:
-    {res}
-    
-    And provide a health check of how the user is doing on github. Does it seem like they are contributing to the codebase?
-    Are they responsive to feedback? Are they merging their PRs in a timely manner? Are there any areas where they could improve?
-    Are their PRs generating discussion? Do they have a good ratio of PRs merged to PRs reviewed?
-
-    In general, what do most of their PRs relate to? Are they mostly feature work, or mostly admin tasks?
-
-    Return a list of 3 actionable items that the user can complete to improve their github contributions
-    based on the competency matrix for L4s Software engineers above
-    """
-    
-    analysis = llm.invoke(template)
-    analysis_text = analysis.content.strip()
-    return AIMessage(content=analysis_text)
+    return get_github_analysis_raw()
 
 
 # Analysis zoom-out
+@user_ready
 @tool
-def grow_in_career() -> AIMessage:
+def grow_in_career() -> str:
     """Use this to help the user grow in their career."""
-    user_updates = get_user_updates()
-    user_context = get_user_context()
-    user_goals = get_user_goals()
-    competency_matrix = get_competency_matrix()
-    staff_eng_guide = get_staff_eng_guide()
+    update_history = get_update_history()
+    inputs = fan_out(
+        {
+            "user_context": get_user_context,
+            "user_goals": get_user_goals,
+            "competency_index": get_competency_index,
+        },
+        defaults=degraded_loader_defaults("user_goals", "competency_index"),
+    )
+    user_context = inputs["user_context"]
+    competencies = inputs["competency_index"].describe(user_context["level"])
+    goals = outline(inputs["user_goals"])
+    staff_eng_guide = retrieve(
+        f"main responsibilities of a {user_context['job_title']}: strategy, technical direction, cross-functional collaboration, mentoring, sponsorship",
+        "staff_eng_guide",
+        k=RETRIEVAL_TOP_K + 2,
+    )
+    context = (
+        PromptContext("grow_in_career", PROMPT_TOKEN_BUDGET)
+        .add("User context", user_context_text(user_context), priority=0)
+        .add("User goals", goals)
+        .add("Competencies for the user's level and the next one", competencies)
+        .add("Staff engineer guide passages", staff_eng_guide, priority=3)
+    )
+    add_update_history(context, update_history)
     grow_prompt = f"""You have access to the following user data:
-    - User updates: {user_updates}
-    - User context: {user_context}
-    - User goals: {user_goals}
-    - Competency matrix: {competency_matrix}
-    - Staff engineer guide: {staff_eng_guide}
+{context.render()}
     
-    For an L4 engineer, you can look at the staff engineer guide to see what are the main responsibilities of a Staff engineer.
+    For an {user_context["level"]} engineer, you can look at the staff engineer guide to see what are the main responsibilities of a Staff engineer.
     Then, use that to do an analysis of how the user is currently doing in comparison. Give specific examples of how they are doing well and how they can improve.
     and constructively challenge them with specific examples of how they can grow in their career, like:
     - It doesnt seem like you spend a lot of time on cross-functional collaboration.
@@ -507,19 +883,69 @@ def grow_in_career() -> AIMessage:
     """
     
 
-    grow = llm.invoke(grow_prompt)
+    grow = llm.invoke(grow_prompt, config=cache_scope("grow_in_career"))
     grow_text = grow.content.strip()
     # logger.info(f"synthesis: {synthesis_text}")
     # return synthesis_text
-    return AIMessage(content=grow_text)
+    return grow_text
+
+
+
+# Precomputed briefings (see src/batch.py and briefings.py)
 
+# Bump when a briefing prompt changes so stored briefings stop matching
+BRIEFING_VERSION = "4"
+
+# Pseudo data source for the user's open focus items, which live in the focus store
+FOCUS_ITEMS_SOURCE = "focus_items:open"
+
+def source_digest(name: str) -> str:
+    if name == FOCUS_ITEMS_SOURCE:
+        return get_focus_store().digest(get_user_context()["employee_id"], status="open")
+    return data_sources.digest(name)
+
+# kind -> (data sources the briefing is generated from, generator)
+BRIEFINGS = {
+    "github_health": (("github_prs_results.json", "employee_data.json"), github_health_check),
+    "weekly_synthesis": (
+        ("gcal.json", "jira.json", "tech_spec.json", "github_prs_results.json", "employee_data.json"),
+        synthesize_week,
+    ),
+    "zoom_in": (
+        ("gcal.json", "jira.json", "tech_spec.json", "user_goals.json", "employee_data.json", "github_prs_results.json", FOCUS_ITEMS_SOURCE),
+        prioritize_week,
+    ),
+}
+
+_briefing_store = None
+
+def get_briefing_store() -> BriefingStore:
+    global _briefing_store
+    if _briefing_store is None:
+        _briefing_store = BriefingStore(BRIEFINGS_DB_PATH)
+    return _briefing_store
+
+def briefing_fingerprint(kind: str) -> str:
+    """Fingerprint of everything the briefing is generated from: its data sources, today's date and the prompt version."""
+    sources, _ = BRIEFINGS[kind]
+    parts = [kind, BRIEFING_VERSION, get_today().isoformat()] + [f"{name}:{source_digest(name)}" for name in sources]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+def serve_briefing(kind: str) -> str:
+    """Returns the precomputed briefing if its input data is unchanged, otherwise generates it now."""
+    user_id = get_user_context()["employee_id"]
+    stored = get_briefing_store().get(user_id, kind, briefing_fingerprint(kind))
+    if stored is not None:
+        logger.info(f"Serving precomputed {kind} briefing for {user_id}")
+        return stored
+    return BRIEFINGS[kind][1]()
 
 
 # Actual third  party integrations (invoked only once and cached for demo)
 @tool
 def get_github_pull_requests() -> List[dict]:
     """Gets recent github pull requests (PRs) for the authenticated user."""
-    logger.info("get_github_pull_requests invoked")
+    logger.debug("get_github_pull_requests invoked")
     # In Python, the results look like:
     #
     # [
@@ -533,33 +959,61 @@ def get_github_pull_requests() -> List[dict]:
     # ]
     
     # https://docs.github.com/en/rest/search/search?apiVersion=2022-11-28
-
-    auth = Auth.Token(GITHUB_ACCESS_TOKEN)
-    github_client = Github(auth=auth)
-
-    results = github_client.search_issues(query="repo:latticehr/lattice is:pr author:waverly")
-    results_list = [{
-        "title": r.title,
-        "created_at": r.created_at,
-        "closed_at": r.closed_at,
-        "updated_at": r.updated_at,
-        "state": r.state,
-        "html_url": r.html_url,
-        "body": r.body,
-        "comments": r.comments,
-        # There's a lot of text in "body" (the PR description), so omitting for now,
-        # but there's probably great signal in here for the LLM to build context.
-        # "body": r.body,
-    } for r in results[:30]] # <-- The per_page arg isn't working, so faking a limit here.
-
-    
-    # Write results to mock data file
-    json_path = Path(__file__).parent.parent / "mocks" / "github_prs_results.json"
-    with open(json_path, "w") as f:
-        json.dump(results_list, f, indent=2, default=str)
-
-    github_client.close()
-
-    return results_list
+    #
+    # Normally the store is kept fresh by the background GithubSyncScheduler (see start_github_sync),
+    # this runs one incremental sync on demand and returns the merged store.
+    get_github_sync().sync_once()
+    return get_github_prs_cache()
+
+
+_github_sync_scheduler = None
+# user id -> their PR sync; kept here rather than in the data partition so an evicted partition
+# doesn't get a second sync racing the scheduler's on the same store
+_github_syncs: Dict[str, "GithubPRSync"] = {}
+_github_syncs_lock = threading.Lock()
+
+def get_github_sync() -> "GithubPRSync":
+    """The current user's PR sync, writing to their partition's PR store."""
+    user_id = data_sources.current_user()
+    with _github_syncs_lock:
+        if user_id not in _github_syncs:
+            from .github_sync import GithubPRSync
+
+            author = get_tenant_settings().get("github_author") or GITHUB_AUTHOR
+            if not author:
+                raise ValueError(f"No github_author in tenant.json for user {user_id} (or GITHUB_AUTHOR)")
+            _github_syncs[user_id] = GithubPRSync(
+                token=require("GITHUB_ACCESS_TOKEN"),
+                repo=GITHUB_REPO,
+                author=author,
+                store_path=data_sources.path("github_prs_results.json"),
+                state_path=Path(GITHUB_SYNC_STATE_DIR) / f"{user_id}.json",
+                base_url=GITHUB_API_URL,
+            )
+        return _github_syncs[user_id]
+
+def github_syncs() -> Dict[str, "GithubPRSync"]:
+    """The PR sync of every user with a data partition and a Github author."""
+    syncs = {}
+    for user_id in data_sources.user_ids():
+        with use_user(user_id):
+            try:
+                syncs[user_id] = get_github_sync()
+            except ValueError as e:
+                logger.debug(f"Not syncing Github PRs of {user_id}: {e}")
+            except UnknownUserError as e:
+                logger.warning(f"Not syncing Github PRs of {user_id}: {e}")
+    return syncs
+
+def start_github_sync() -> Optional["GithubSyncScheduler"]:
+    """Starts the background PR sync of every user if COACH_GITHUB_SYNC_INTERVAL_SECONDS is set."""
+    global _github_sync_scheduler
+    if not GITHUB_SYNC_INTERVAL_SECONDS:
+        return None
+    if _github_sync_scheduler is None:
+        from .github_sync import GithubSyncScheduler
+
+        _github_sync_scheduler = GithubSyncScheduler(github_syncs, GITHUB_SYNC_INTERVAL_SECONDS)
+    return _github_sync_scheduler.start()
 
 # my PR review comments
\ No newline at end of file
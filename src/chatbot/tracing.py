@@ -0,0 +1,248 @@
+"""Spans for graph nodes, tools and LLM calls, exported as JSONL and Prometheus metrics.
+
+The Tracer is a LangChain callback handler registered through a configure hook, so it sees every
+run without call sites passing it in: graph nodes, tools, and every chat model call including
+cache hits (CachedChatModel reports those through the callbacks too). Each finished span records:
+- its duration
+- prompt and completion tokens, for LLM calls
+- the LLM cache outcome and scope
+- input and output payload sizes
+- errors
+
+Spans are aggregated in memory for `render_prometheus()` (served at /metrics) and, when
+COACH_TRACE_FILE is set, appended to that file as JSON lines.
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from .context import count_tokens, message_tokens
+from .llm_cache import DEFAULT_SCOPE
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    kind: str  # node | tool | llm
+    name: str
+    start: float
+    duration: float = 0.0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+
+class JsonlExporter:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(asdict(span), default=str)
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class Metrics:
+    """Per (kind, name) aggregates of finished spans, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[Tuple[str, str], List[float]] = {}  # bucket counts, then sum
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.payload_bytes: Dict[Tuple[str, str, str], int] = {}
+        self.tokens: Dict[Tuple[str, str], int] = {}
+        self.llm_calls: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, span: Span) -> None:
+        key = (span.kind, span.name)
+        with self._lock:
+            histogram = self.durations.setdefault(key, [0] * (len(DURATION_BUCKETS) + 2))
+            histogram[bisect_left(DURATION_BUCKETS, span.duration)] += 1
+            histogram[-1] += span.duration
+            if span.attrs.get("error"):
+                self.errors[key] = self.errors.get(key, 0) + 1
+            for direction in ("in", "out"):
+                if f"bytes_{direction}" in span.attrs:
+                    bytes_key = (span.kind, span.name, direction)
+                    self.payload_bytes[bytes_key] = self.payload_bytes.get(bytes_key, 0) + span.attrs[f"bytes_{direction}"]
+            if span.kind == "llm":
+                for kind in ("prompt", "completion"):
+                    token_key = (span.name, kind)
+                    self.tokens[token_key] = self.tokens.get(token_key, 0) + span.attrs.get(f"{kind}_tokens", 0)
+                call_key = (span.name, span.attrs.get("cache") or "none")
+                self.llm_calls[call_key] = self.llm_calls.get(call_key, 0) + 1
+
+    def render(self) -> str:
+        lines = [
+            "# HELP coach_span_duration_seconds Duration of graph nodes, tools and LLM calls.",
+            "# TYPE coach_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (kind, name), histogram in sorted(self.durations.items()):
+                labels = f'kind="{kind}",name="{name}"'
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS + ("+Inf",), histogram[:-1]):
+                    cumulative += count
+                    lines.append(f'coach_span_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"coach_span_duration_seconds_sum{{{labels}}} {histogram[-1]:.6f}")
+                lines.append(f"coach_span_duration_seconds_count{{{labels}}} {cumulative}")
+            lines += ["# HELP coach_span_errors_total Spans that raised.", "# TYPE coach_span_errors_total counter"]
+            lines += [f'coach_span_errors_total{{kind="{k}",name="{n}"}} {v}' for (k, n), v in sorted(self.errors.items())]
+            lines += ["# HELP coach_span_payload_bytes_total Input/output payload sizes.", "# TYPE coach_span_payload_bytes_total counter"]
+            lines += [
+                f'coach_span_payload_bytes_total{{kind="{k}",name="{n}",direction="{d}"}} {v}'
+                for (k, n, d), v in sorted(self.payload_bytes.items())
+            ]
+            lines += ["# HELP coach_llm_tokens_total LLM prompt/completion tokens.", "# TYPE coach_llm_tokens_total counter"]
+            lines += [f'coach_llm_tokens_total{{name="{n}",type="{t}"}} {v}' for (n, t), v in sorted(self.tokens.items())]
+            lines += ["# HELP coach_llm_calls_total LLM calls by cache outcome.", "# TYPE coach_llm_calls_total counter"]
+            lines += [f'coach_llm_calls_total{{name="{n}",cache="{c}"}} {v}' for (n, c), v in sorted(self.llm_calls.items())]
+        return "\n".join(lines) + "\n"
+
+
+def _size(value: Any) -> int:
+    return len(value if isinstance(value, str) else str(value))
+
+
+class Tracer(BaseCallbackHandler):
+    # Keep start/end ordering when the graph runs async
+    run_inline = True
+
+    def __init__(self, exporters: Optional[list] = None):
+        self.exporters = exporters or []
+        self.metrics = Metrics()
+        self._lock = threading.Lock()
+        # run_id -> (span if the run is traced, parent run_id, trace_id); runs are dropped when they end
+        self._runs: Dict[UUID, Tuple[Optional[Span], Optional[UUID], str]] = {}
+
+    def _parent_span(self, parent_run_id: Optional[UUID]) -> Tuple[Optional[Span], str]:
+        """The closest traced ancestor and the trace id, walking up untraced runs."""
+        trace_id = str(parent_run_id) if parent_run_id else ""
+        run_id = parent_run_id
+        while run_id in self._runs:
+            span, parent, trace_id = self._runs[run_id]
+            if span is not None:
+                return span, trace_id
+            run_id = parent
+        return None, trace_id
+
+    def _start(self, kind: Optional[str], name: str, run_id: UUID, parent_run_id: Optional[UUID], **attrs) -> None:
+        with self._lock:
+            parent, trace_id = self._parent_span(parent_run_id)
+            trace_id = trace_id or str(run_id)
+            span = None
+            if kind is not None:
+                span = Span(trace_id, str(run_id), parent.span_id if parent else None, kind, name, time.time(), attrs=attrs)
+            self._runs[run_id] = (span, parent_run_id, trace_id)
+
+    def _end(self, run_id: UUID, **attrs) -> None:
+        with self._lock:
+            span, _, _ = self._runs.pop(run_id, (None, None, ""))
+        if span is None:
+            return
+        span.duration = time.time() - span.start
+        span.attrs.update(attrs)
+        self.metrics.observe(span)
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    def _owner_name(self, parent_run_id: Optional[UUID]) -> str:
+        with self._lock:
+            parent, _ = self._parent_span(parent_run_id)
+        return parent.name if parent else "(none)"
+
+    # Nodes (and the untraced chains between them)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or ""
+        # A node's own run is named after the node; everything else inside it inherits the metadata
+        kind = "node" if metadata and metadata.get("langgraph_node") == name else None
+        self._start(kind, name, run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=repr(error))
+
+    # Tools
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "")
+        self._start("tool", name, run_id, parent_run_id, bytes_in=_size(input_str))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, bytes_out=_size(getattr(output, "content", output)))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=repr(error))
+
+    # LLM calls
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        prompt = messages[0]
+        # Named after the call's cache scope when the call site set one, else the enclosing tool/node
+        scope = metadata.get("llm_cache_scope")
+        name = scope if scope and scope != DEFAULT_SCOPE else self._owner_name(parent_run_id)
+        self._start(
+            "llm",
+            name,
+            run_id,
+            parent_run_id,
+            prompt_tokens=sum(message_tokens(m) for m in prompt),
+            bytes_in=sum(_size(m.content) for m in prompt),
+            cache=metadata.get("llm_cache"),
+        )
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        message = getattr(response.generations[0][0], "message", None) if response.generations else None
+        text = response.generations[0][0].text if response.generations else ""
+        usage = getattr(message, "usage_metadata", None) or {}
+        self._end(
+            run_id,
+            completion_tokens=usage.get("output_tokens") or count_tokens(text),
+            bytes_out=len(text),
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=repr(error))
+
+    def render_prometheus(self) -> str:
+        return self.metrics.render()
+
+
+def build_tracer(trace_file: Optional[str] = None) -> Tracer:
+    return Tracer([JsonlExporter(trace_file)] if trace_file else [])
+
+
+_tracer_var: Optional[ContextVar] = None
+_installed: Optional[Tracer] = None
+_install_lock = threading.Lock()
+
+
+def install(tracer: Tracer) -> Tracer:
+    """Adds `tracer` to every callback manager LangChain configures, in every thread.
+
+    The configure hook can only be registered once per process, so only the first tracer is
+    installed; later calls return it rather than a tracer that would never see a run.
+    """
+    global _tracer_var, _installed
+    with _install_lock:
+        if _installed is None:
+            # The default (not a set value) is what makes it visible in threads that never copied a context
+            _tracer_var = ContextVar("coach_tracer", default=tracer)
+            register_configure_hook(_tracer_var, inheritable=True)
+            _installed = tracer
+        return _installed
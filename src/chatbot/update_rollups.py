@@ -0,0 +1,185 @@
+"""Per-week rollups of the user's weekly updates (user_updates.json).
+
+Tools used to hand every daily update ever written to the LLM, so prompts grew with the user's
+history. Instead each week is rolled up once into counts (entries, PR reviews, spec reviews,
+links) and themes, computed by rules over its daily entries:
+- closed weeks (before the current one) are represented by their rollup and a short LLM summary,
+  which is generated once per version of the week and cached (see tools.get_update_history)
+- only the current week is kept raw, since it is still being written
+
+Rollups are updated in place: a week is only recomputed when its content changes, which in
+practice is the current week as new daily entries come in.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PR_REVIEW_RE = re.compile(r"\breview(?:ed|ing|s)?\b[^.:]*\b(?:PRs?|pull requests?)\b", re.I)
+SPEC_REVIEW_RE = re.compile(r"\breview(?:ed|ing|s)?\b[^.:]*\b(?:specs?|docs?|designs?|RFCs?)\b", re.I)
+LINK_RE = re.compile(r"https?://[^\s)>\]]+")
+
+# Every matching theme counts; entries matching none are "other"
+THEME_RULES: List[Tuple[str, "re.Pattern"]] = [
+    ("code reviews", PR_REVIEW_RE),
+    ("spec and doc reviews", SPEC_REVIEW_RE),
+    ("shipping code", re.compile(r"\b(opened|merged?|prepared|deployed|released|shipped|PRs?)\b|/pull/", re.I)),
+    ("building", re.compile(r"\b(implement\w*|integrat\w*|prototyp\w*|built|building|refactor\w*|worked on|started work)\b", re.I)),
+    ("designs and proposals", re.compile(r"\b(wrote|writing|drafted|propos\w*|scope|designs?|documentation|pre-work)\b", re.I)),
+    ("risks and tech debt", re.compile(r"\b(tech(nical)? debt|risks?|blockers?|bottlenecks?|reliability)\b", re.I)),
+    ("collaboration", re.compile(r"\b(collaborat\w*|discuss\w*|sync|meetings?|presented|stakeholders|teammates)\b", re.I)),
+    ("planning and strategy", re.compile(r"\b(plan\w*|strategy|roadmap|brainstorm\w*|offsite|onsite|next steps)\b", re.I)),
+    ("people and mentoring", re.compile(r"\b(1:1|mentor\w*|evaluation|coaching|interview\w*|hiring|onboard\w*)\b", re.I)),
+    ("quality and testing", re.compile(r"\b(QA|quality|tests?|testing|evals?)\b", re.I)),
+]
+
+
+def week_start_of(week_of: str, today: date) -> date:
+    """The Monday of a `weekOf` label such as "October 28 - November 1", whose year is implied by today."""
+    label = week_of.split("-")[0].strip()
+    start = datetime.strptime(f"{label} {today.year}", "%B %d %Y").date()
+    if start > today + timedelta(days=6):
+        start = datetime.strptime(f"{label} {today.year - 1}", "%B %d %Y").date()
+    return start - timedelta(days=start.weekday())
+
+
+def week_digest(week: dict) -> str:
+    return hashlib.sha256(json.dumps(week, sort_keys=True).encode()).hexdigest()
+
+
+def daily_entries(week: dict) -> List[str]:
+    return [entry for entries in (week.get("dailyUpdates") or {}).values() for entry in entries or [] if entry]
+
+
+@dataclass
+class WeekRollup:
+    week_start: date
+    week_of: str
+    digest: str
+    days: int
+    entries: int
+    pr_reviews: int
+    spec_reviews: int
+    links: int
+    themes: Dict[str, int]
+    feeling: Optional[str] = None
+    # LLM summary of the week, filled in once generated (kept for as long as the week is unchanged)
+    summary: Optional[str] = None
+
+    def counts(self) -> str:
+        themes = ", ".join(f"{name} {count}" for name, count in self.themes.items()) or "none"
+        return (
+            f"{self.entries} entries over {self.days} days; {self.pr_reviews} PR reviews, "
+            f"{self.spec_reviews} spec reviews, {self.links} links; themes: {themes}"
+        )
+
+    def describe(self) -> str:
+        text = f"Week of {self.week_start:%B %d}: {self.counts()}"
+        if self.feeling:
+            text += f"; feeling: {self.feeling}"
+        if self.summary:
+            text += f"\n  Summary: {self.summary}"
+        return text
+
+
+def rollup_week(week_start: date, week: dict, digest: Optional[str] = None) -> WeekRollup:
+    entries = daily_entries(week)
+    themes: Dict[str, int] = {}
+    for entry in entries:
+        matched = [name for name, pattern in THEME_RULES if pattern.search(entry)] or ["other"]
+        for name in matched:
+            themes[name] = themes.get(name, 0) + 1
+    feeling = week.get("feeling")
+    return WeekRollup(
+        week_start=week_start,
+        week_of=week.get("weekOf", ""),
+        digest=digest or week_digest(week),
+        days=sum(1 for day in (week.get("dailyUpdates") or {}).values() if day),
+        entries=len(entries),
+        pr_reviews=sum(1 for entry in entries if PR_REVIEW_RE.search(entry)),
+        spec_reviews=sum(1 for entry in entries if SPEC_REVIEW_RE.search(entry)),
+        links=sum(len(LINK_RE.findall(entry)) for entry in entries),
+        themes=dict(sorted(themes.items(), key=lambda kv: kv[1], reverse=True)),
+        feeling=None if not feeling or feeling == "No answer given" else feeling,
+    )
+
+
+def total_rollup(rollups: Iterable[WeekRollup]) -> str:
+    """One line of counts summed over several weeks, for the weeks too old to list one by one."""
+    rollups = list(rollups)
+    if not rollups:
+        return ""
+    themes: Dict[str, int] = {}
+    for rollup in rollups:
+        for name, count in rollup.themes.items():
+            themes[name] = themes.get(name, 0) + count
+    total = WeekRollup(
+        week_start=rollups[-1].week_start,
+        week_of="",
+        digest="",
+        days=sum(r.days for r in rollups),
+        entries=sum(r.entries for r in rollups),
+        pr_reviews=sum(r.pr_reviews for r in rollups),
+        spec_reviews=sum(r.spec_reviews for r in rollups),
+        links=sum(r.links for r in rollups),
+        themes=dict(sorted(themes.items(), key=lambda kv: kv[1], reverse=True)),
+    )
+    return f"{len(rollups)} earlier weeks from {rollups[-1].week_start:%B %d, %Y}: {total.counts()}"
+
+
+class UpdateRollups:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rollups: Dict[date, WeekRollup] = {}
+        self.weeks: Dict[date, dict] = {}
+        self.current_week_start: Optional[date] = None
+        # Day of the last sync: the current week moves on when the day does
+        self.today: Optional[date] = None
+        # Weeks rolled up since creation, to check that unchanged weeks are not recomputed
+        self.recomputed = 0
+
+    def sync(self, weekly_updates: List[dict], today: date) -> "UpdateRollups":
+        """Brings the rollups in line with the full list of weekly updates, recomputing only changed weeks."""
+        with self._lock:
+            seen = set()
+            for week in weekly_updates:
+                try:
+                    start = week_start_of(week["weekOf"], today)
+                except (KeyError, ValueError):
+                    logger.warning(f"Skipping weekly update with unparseable weekOf: {week.get('weekOf')!r}")
+                    continue
+                seen.add(start)
+                digest = week_digest(week)
+                rollup = self.rollups.get(start)
+                if rollup is None or rollup.digest != digest:
+                    self.rollups[start] = rollup_week(start, week, digest)
+                    self.recomputed += 1
+                self.weeks[start] = week
+            for start in set(self.rollups) - seen:
+                del self.rollups[start]
+                del self.weeks[start]
+            self.current_week_start = today - timedelta(days=today.weekday())
+            self.today = today
+        return self
+
+    def current_week(self) -> Optional[dict]:
+        """The raw update of the current week, if the user has started writing it."""
+        with self._lock:
+            return self.weeks.get(self.current_week_start)
+
+    def closed(self) -> List[WeekRollup]:
+        """Rollups of the weeks before the current one, newest first."""
+        with self._lock:
+            closed = [r for start, r in self.rollups.items() if start < self.current_week_start]
+        return sorted(closed, key=lambda r: r.week_start, reverse=True)
+
+    def week(self, week_start: date) -> dict:
+        """The raw update of the week starting on `week_start`."""
+        with self._lock:
+            return self.weeks[week_start]
@@ -3,14 +3,86 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
+# Credentials are resolved when a client first needs them, not at import,
+# so the CLI, batch job and benchmarks start without keys they don't use
+CREDENTIALS = {
+    "OPENAI_API_KEY": "OPENAI_API_KEY not found in environment variables",
+    "TAVILY_API_KEY": "TAVILY_API_KEY not found in environment variables",
+    "GITHUB_ACCESS_TOKEN": "GITHUB_ACCESS_TOKEN not found in environment variables, create one: https://bit.ly/4fF95ZU",
+}
 
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
-if not TAVILY_API_KEY:
-    raise ValueError("TAVILY_API_KEY not found in environment variables")
 
-GITHUB_ACCESS_TOKEN = os.getenv("GITHUB_ACCESS_TOKEN")
-if not GITHUB_ACCESS_TOKEN:
-    raise ValueError("GITHUB_ACCESS_TOKEN not found in environment variables, create one: https://bit.ly/4fF95ZU")
\ No newline at end of file
+def require(name: str) -> str:
+    value = os.getenv(name)
+    if not value:
+        raise ValueError(CREDENTIALS[name])
+    return value
+
+
+def __getattr__(name: str):
+    # Keeps `config.OPENAI_API_KEY` & co. working, raising only when actually read
+    if name in CREDENTIALS:
+        return require(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Per-user data partitions: TENANTS_DIR/<employee_id>/ holds the same files as src/mocks, which
+# serve their own employee (see src/chatbot/data_sources.py)
+TENANTS_DIR = os.getenv("COACH_TENANTS_DIR")
+# The user for the CLI, the batch job and sessions that don't name one; defaults to the mocks' employee
+DEFAULT_USER_ID = os.getenv("COACH_DEFAULT_USER")
+MAX_RESIDENT_USERS = int(os.getenv("COACH_MAX_RESIDENT_USERS", "256"))
+
+# Github PR sync (see src/chatbot/github_sync.py); 0 disables the background sync
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_REPO = os.getenv("GITHUB_REPO", "latticehr/lattice")
+# Fallback for users whose tenant.json doesn't set github_author
+GITHUB_AUTHOR = os.getenv("GITHUB_AUTHOR")
+GITHUB_SYNC_INTERVAL_SECONDS = float(os.getenv("COACH_GITHUB_SYNC_INTERVAL_SECONDS", "0"))
+# Sync cursors and validators, one file per user; runtime state, kept out of the data partitions
+GITHUB_SYNC_STATE_DIR = os.getenv("COACH_GITHUB_SYNC_STATE_DIR", ".github_sync")
+
+# Conversation context sent to the chatbot LLM (see src/chatbot/context.py)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("COACH_CONTEXT_TOKEN_BUDGET", "6000"))
+CONTEXT_KEEP_TURNS = int(os.getenv("COACH_CONTEXT_KEEP_TURNS", "4"))
+
+# Conversation checkpoints (see src/chatbot/checkpointer.py)
+CHECKPOINT_DB_PATH = os.getenv("COACH_CHECKPOINT_DB", "checkpoints.sqlite")
+CHECKPOINT_IDLE_TTL_SECONDS = float(os.getenv("COACH_CHECKPOINT_IDLE_TTL_SECONDS", str(7 * 24 * 3600)))
+# How often the background thread looks for idle threads to compact
+CHECKPOINT_EVICT_INTERVAL_SECONDS = float(os.getenv("COACH_CHECKPOINT_EVICT_INTERVAL_SECONDS", "3600"))
+
+# Data sections of tool prompts (see src/chatbot/prompt_context.py)
+PROMPT_TOKEN_BUDGET = int(os.getenv("COACH_PROMPT_TOKEN_BUDGET", "6000"))
+
+# LLM response cache (see src/chatbot/llm_cache.py)
+LLM_CACHE_DB_PATH = os.getenv("COACH_LLM_CACHE_DB", "llm_cache.sqlite")
+LLM_CACHE_MEMORY_SIZE = int(os.getenv("COACH_LLM_CACHE_MEMORY_SIZE", "512"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("COACH_LLM_CACHE_TTL_SECONDS", "3600"))
+# Calls to the model outstanding at once per process, from turns and background work alike (0: unbounded)
+LLM_MAX_CONCURRENCY = int(os.getenv("COACH_LLM_MAX_CONCURRENCY", "32"))
+
+# Precomputed briefings written by `python -m src.batch` (see src/chatbot/briefings.py)
+BRIEFINGS_DB_PATH = os.getenv("COACH_BRIEFINGS_DB", "briefings.sqlite")
+
+# On-disk retrieval indexes over the guide, tech spec and updates (see src/chatbot/retrieval.py);
+# embeddings are used when numpy is installed unless COACH_RETRIEVAL_EMBEDDINGS=0
+RETRIEVAL_DIR = os.getenv("COACH_RETRIEVAL_DIR", ".retrieval")
+RETRIEVAL_TOP_K = int(os.getenv("COACH_RETRIEVAL_TOP_K", "4"))
+RETRIEVAL_EMBEDDINGS = os.getenv("COACH_RETRIEVAL_EMBEDDINGS", "1") != "0"
+
+# Weekly updates in tool prompts: the last N closed weeks are listed as rollups with a summary,
+# older ones summed into one line (see src/chatbot/update_rollups.py)
+UPDATE_ROLLUP_WEEKS = int(os.getenv("COACH_UPDATE_ROLLUP_WEEKS", "12"))
+# Workers generating missing week summaries in the background during turns, 0 leaves them to src.batch
+UPDATE_SUMMARY_WORKERS = int(os.getenv("COACH_UPDATE_SUMMARY_WORKERS", "2"))
+
+# Speculative prefetch of the conversation starter's options (see src/chatbot/speculation.py);
+# at most this many run at once across all sessions, 0 disables it
+SPECULATION_MAX_INFLIGHT = int(os.getenv("COACH_SPECULATION_MAX_INFLIGHT", "4"))
+SPECULATION_TTL_SECONDS = float(os.getenv("COACH_SPECULATION_TTL_SECONDS", "600"))
+
+# Focus items users commit to (see src/chatbot/focus_store.py)
+FOCUS_DB_PATH = os.getenv("COACH_FOCUS_DB", "focus_items.sqlite")
+
+# Spans for nodes, tools and LLM calls are appended here as JSON lines when set (see src/chatbot/tracing.py)
+TRACE_FILE = os.getenv("COACH_TRACE_FILE")
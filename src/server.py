@@ -0,0 +1,284 @@
+"""Async HTTP/SSE service exposing the coaching graph.
+
+Every thread_id is a coaching session whose history lives in the graph's checkpointer.
+Turns are bounded by a TurnLimiter: once the running and queued turns are full,
+new requests get a 429 with Retry-After instead of piling up. Outstanding LLM calls are
+bounded separately, by the model (COACH_LLM_MAX_CONCURRENCY, see llm_cache.py), since
+speculation and the background Github sync call it outside of any turn.
+
+Run with `python -m src.server` (or `make serve`).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import BaseModel
+
+from src.chatbot.chatbot import get_graph, speculator
+from src.chatbot.data_sources import data_sources, use_user
+from src.chatbot.llm import llm, tracer
+from src.chatbot.tools import start_github_sync
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_ACTIVE_TURNS = int(os.getenv("COACH_MAX_ACTIVE_TURNS", "32"))
+MAX_QUEUED_TURNS = int(os.getenv("COACH_MAX_QUEUED_TURNS", "64"))
+RETRY_AFTER_SECONDS = int(os.getenv("COACH_RETRY_AFTER_SECONDS", "5"))
+SESSION_IDLE_SECONDS = int(os.getenv("COACH_SESSION_IDLE_SECONDS", "3600"))
+
+# Node whose LLM tokens are the user-facing answer
+FINAL_NODE = "chatbot"
+
+
+class TurnLimiter:
+    """Caps concurrently running turns, with a bounded wait queue."""
+
+    def __init__(self, max_active: int, max_queued: int):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self._semaphore = asyncio.Semaphore(max_active)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return self.active + self.waiting
+
+    async def __aenter__(self):
+        if len(self) >= self.max_active + self.max_queued:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="The coach is busy, please retry shortly.",
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.active -= 1
+        self._semaphore.release()
+
+
+@dataclass
+class Session:
+    thread_id: str
+    employee_id: str
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_seen: float = field(default_factory=time.monotonic)
+
+    @property
+    def config(self) -> dict:
+        return {"configurable": {"thread_id": self.thread_id}}
+
+
+class TurnStreamingResponse(StreamingResponse):
+    """A StreamingResponse that releases its turn's lock and limiter slot once it is over.
+
+    The body generator's own `finally` doesn't run if the client is gone before the body starts
+    (and Starlette skips background tasks on a disconnect), so the release happens here, however
+    the response ended. Closing the body first stops a turn that was cut off mid-stream.
+    """
+
+    def __init__(self, content: AsyncIterator[str], release: Callable[[], Awaitable[None]], **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                await self.body_iterator.aclose()
+            finally:
+                await self._release()
+
+
+class MessageRequest(BaseModel):
+    content: str
+
+
+class ThreadRequest(BaseModel):
+    # Default: COACH_DEFAULT_USER (the mocks' employee)
+    employee_id: Optional[str] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    scheduler = start_github_sync()
+    # Compile before the first request rather than during it
+    get_graph()
+    try:
+        yield
+    finally:
+        if scheduler is not None:
+            # Off the event loop: a sync round may be mid-request
+            await asyncio.to_thread(scheduler.stop, 5)
+
+
+app = FastAPI(title="Agentic Coach", lifespan=lifespan)
+limiter = TurnLimiter(MAX_ACTIVE_TURNS, MAX_QUEUED_TURNS)
+sessions: Dict[str, Session] = {}
+
+
+def _evict_idle_sessions() -> None:
+    cutoff = time.monotonic() - SESSION_IDLE_SECONDS
+    for thread_id in [t for t, s in sessions.items() if s.last_seen < cutoff and not s.lock.locked()]:
+        # History stays in the checkpointer, only the in-process handle goes away
+        del sessions[thread_id]
+
+
+async def _get_session(thread_id: str) -> Session:
+    session = sessions.get(thread_id)
+    if session is None:
+        snapshot = await get_graph().aget_state({"configurable": {"thread_id": thread_id}})
+        if not snapshot.values:
+            raise HTTPException(status_code=404, detail=f"Unknown thread {thread_id}")
+        employee_id = snapshot.values.get("employee_id") or data_sources.default_user
+        session = sessions.setdefault(thread_id, Session(thread_id, employee_id))
+    session.last_seen = time.monotonic()
+    return session
+
+
+async def _last_ai_message(session: Session) -> str:
+    snapshot = await get_graph().aget_state(session.config)
+    for message in reversed(snapshot.values.get("messages", [])):
+        if isinstance(message, AIMessage):
+            return message.content
+    return ""
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_events(graph_input, session: Session) -> AsyncIterator[str]:
+    started = time.monotonic()
+    # Graph nodes and tools run in copies of this context, so they load this user's data
+    with use_user(session.employee_id):
+        async for mode, chunk in get_graph().astream(graph_input, session.config, stream_mode=["debug", "messages"]):
+            if mode == "messages":
+                message_chunk, metadata = chunk
+                if metadata.get("langgraph_node") == FINAL_NODE and message_chunk.content:
+                    yield _sse("token", {"content": message_chunk.content})
+            elif chunk["type"] == "task":
+                yield _sse("node", {"name": chunk["payload"]["name"], "status": "started"})
+            elif chunk["type"] == "task_result":
+                yield _sse(
+                    "node",
+                    {
+                        "name": chunk["payload"]["name"],
+                        "status": "failed" if chunk["payload"]["error"] else "finished",
+                        "elapsed": round(time.monotonic() - started, 3),
+                    },
+                )
+    yield _sse("message", {"thread_id": session.thread_id, "content": await _last_ai_message(session)})
+
+
+async def _run_turn(graph_input, session: Session) -> str:
+    if session.lock.locked():
+        raise HTTPException(status_code=409, detail="A turn is already in progress for this thread")
+    async with session.lock, limiter:
+        with use_user(session.employee_id):
+            await get_graph().ainvoke(graph_input, session.config)
+        return await _last_ai_message(session)
+
+
+@app.get("/healthz")
+async def healthz():
+    return {
+        "status": "ok",
+        "sessions": len(sessions),
+        "active_turns": limiter.active,
+        "queued_turns": limiter.waiting,
+        "rejected_turns": limiter.rejected,
+        "llm_cache": llm.stats.as_dict(),
+        "llm_calls": {"active": llm.upstream_active, "waiting": llm.upstream_waiting, "max": llm.max_concurrent},
+        "resident_users": data_sources.resident,
+        "speculation": speculator.as_dict(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Node, tool and LLM span metrics in the Prometheus text format."""
+    return tracer.render_prometheus()
+
+
+@app.post("/threads")
+async def create_thread(request: Optional[ThreadRequest] = None):
+    """Starts a new coaching session for a user and returns the conversation starter."""
+    _evict_idle_sessions()
+    employee_id = (request and request.employee_id) or data_sources.default_user
+    if not data_sources.has_user(employee_id):
+        raise HTTPException(status_code=404, detail=f"Unknown user {employee_id}")
+    session = Session(str(uuid.uuid4()), employee_id)
+    sessions[session.thread_id] = session
+    content = await _run_turn({"messages": [], "starter_done": False, "tool_processed": False}, session)
+    return {"thread_id": session.thread_id, "content": content}
+
+
+@app.post("/threads/{thread_id}/messages")
+async def post_message(thread_id: str, request: MessageRequest):
+    """Runs one turn and returns the full reply."""
+    session = await _get_session(thread_id)
+    content = await _run_turn({"messages": [HumanMessage(content=request.content)]}, session)
+    return {"thread_id": thread_id, "content": content}
+
+
+@app.post("/threads/{thread_id}/stream")
+async def stream_message(thread_id: str, request: MessageRequest):
+    """Runs one turn, streaming node progress and tokens as Server-Sent Events."""
+    session = await _get_session(thread_id)
+    if session.lock.locked():
+        raise HTTPException(status_code=409, detail="A turn is already in progress for this thread")
+
+    # Take the slot before responding so overload is reported as a 429, not mid-stream
+    await session.lock.acquire()
+    try:
+        await limiter.__aenter__()
+    except BaseException:
+        session.lock.release()
+        raise
+
+    released = False
+
+    async def release():
+        nonlocal released
+        if not released:
+            released = True
+            await limiter.__aexit__(None, None, None)
+            session.lock.release()
+
+    async def events():
+        try:
+            async for event in _stream_events({"messages": [HumanMessage(content=request.content)]}, session):
+                yield event
+        except Exception:
+            logger.exception("Error while streaming turn for thread %s", thread_id)
+            yield _sse("error", {"detail": "Something went wrong while generating the response."})
+        finally:
+            await release()
+
+    return TurnStreamingResponse(events(), release, media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", "8000")))
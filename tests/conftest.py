@@ -0,0 +1,16 @@
+import os
+import tempfile
+
+# Keep the stores the modules open at import out of the working tree, and let them import without real keys
+_runtime = tempfile.mkdtemp(prefix="coach-tests-")
+for name, value in {
+    "COACH_CHECKPOINT_DB": os.path.join(_runtime, "checkpoints.sqlite"),
+    "COACH_LLM_CACHE_DB": os.path.join(_runtime, "llm_cache.sqlite"),
+    "COACH_BRIEFINGS_DB": os.path.join(_runtime, "briefings.sqlite"),
+    "COACH_FOCUS_DB": os.path.join(_runtime, "focus_items.sqlite"),
+    "COACH_RETRIEVAL_DIR": os.path.join(_runtime, "retrieval"),
+    "OPENAI_API_KEY": "test",
+    "TAVILY_API_KEY": "test",
+    "GITHUB_ACCESS_TOKEN": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,161 @@
+import sys
+import threading
+from datetime import date
+
+from src.chatbot.jira_analytics import JiraAnalytics
+from src.chatbot.pr_analytics import PRAnalytics
+from src.chatbot.time_allocation import in_progress_days
+from src.chatbot.update_rollups import UpdateRollups
+
+
+def ticket(i, status="Done", assignee="Ada", version=0):
+    changes = [{"status": "In Progress", "changed_at": "2024-11-04"}]
+    if status == "Done":
+        changes.append({"status": "Done", "changed_at": f"2024-11-{6 + i % 3:02d}"})
+    return {
+        "id": f"T-{i}",
+        "title": f"Ticket {i} v{version}",
+        "status": status,
+        "assigned_to": assignee,
+        "type": "Task",
+        "points": 2,
+        "created_at": "2024-11-01",
+        "status_changes": changes,
+    }
+
+
+def pr(i, state="closed", version=0):
+    return {
+        "html_url": f"https://github.com/o/r/pull/{i}",
+        "title": f"PR {i}",
+        "state": state,
+        "comments": i % 7,
+        "created_at": "2024-11-01T10:00:00Z",
+        "closed_at": None if state == "open" else f"2024-11-0{2 + i % 5}T10:00:00Z",
+        "updated_at": f"v{version}",
+    }
+
+
+def test_jira_sync_only_touches_changed_tickets():
+    tickets = [ticket(i) for i in range(10)]
+    analytics = JiraAnalytics(tickets)
+    assert analytics.update(tickets) == 0
+    tickets[3] = ticket(3, status="In Progress")
+    assert analytics.update(tickets) == 1
+    assert [t["id"] for t in analytics.open_tickets()] == ["T-3"]
+    assert sum(analytics.weekly_points_throughput("ada").values()) == 18
+    # Removing a ticket rebuilds
+    assert analytics.sync(tickets[:5]) is not analytics
+
+
+def test_pr_sync_only_touches_changed_prs():
+    prs = [pr(i) for i in range(10)]
+    analytics = PRAnalytics(prs)
+    assert analytics.update(prs) == 0
+    prs[2] = pr(2, state="open", version=1)
+    assert analytics.update(prs) == 1
+    assert [p["title"] for p in analytics.open_prs()] == ["PR 2"]
+
+
+def hammer(update, query, rounds=100):
+    """Runs `query` on several threads while `update` mutates the table, and returns their errors."""
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                query()
+            except Exception as error:  # noqa: BLE001 - any error means a torn read
+                errors.append(error)
+                return
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    # Switch threads as often as possible so a read lands in the middle of an update
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    for thread in readers:
+        thread.start()
+    try:
+        for i in range(rounds):
+            update(i)
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+        sys.setswitchinterval(interval)
+    return errors
+
+
+def test_jira_queries_are_safe_during_updates():
+    analytics = JiraAnalytics([ticket(i) for i in range(200)])
+
+    def update(round):
+        # Moves tickets between statuses and assignees, so the index sets change size
+        status = "In Progress" if round % 2 else "Done"
+        analytics.update([ticket(i, status=status, assignee=f"dev{round % 3}", version=round) for i in range(0, 200, 2)])
+        analytics.update([ticket(1000 + 50 * round + i) for i in range(50)])
+
+    errors = hammer(update, lambda: analytics.describe(date(2024, 11, 22)) and analytics.rows(["Done", "In Progress"]))
+    assert errors == []
+
+
+def test_pr_queries_are_safe_during_updates():
+    analytics = PRAnalytics([pr(i) for i in range(200)])
+
+    def update(round):
+        analytics.update([pr(i, state="open" if round % 2 else "closed", version=round) for i in range(0, 200, 2)])
+        analytics.update([pr(1000 + 50 * round + i) for i in range(50)])
+
+    errors = hammer(update, lambda: (analytics.open_prs(), analytics.longest_to_merge(5), analytics.merge_time_percentiles(), analytics.weekly_throughput()))
+    assert errors == []
+
+
+def assert_waits_for_update(analytics, query):
+    """`query` must not run while an update holds the table's lock."""
+    done = threading.Event()
+    with analytics._lock:
+        thread = threading.Thread(target=lambda: (query(), done.set()))
+        thread.start()
+        assert not done.wait(0.1)
+    thread.join(5)
+    assert done.is_set()
+
+
+def test_jira_queries_wait_for_updates():
+    analytics = JiraAnalytics([ticket(i) for i in range(10)])
+    for query in (analytics.open_tickets, analytics.cycle_times, lambda: analytics.describe(date(2024, 11, 22)), analytics.weekly_points_throughput):
+        assert_waits_for_update(analytics, query)
+
+
+def test_pr_queries_wait_for_updates():
+    analytics = PRAnalytics([pr(i) for i in range(10)])
+    for query in (analytics.open_prs, analytics.longest_to_merge, analytics.merge_time_percentiles, analytics.weekly_throughput):
+        assert_waits_for_update(analytics, query)
+
+
+def test_update_rollup_queries_wait_for_updates():
+    weeks = [{"weekOf": "November 4 - November 8", "dailyUpdates": {"Monday": ["Reviewed PRs"]}}]
+    rollups = UpdateRollups().sync(weeks, date(2024, 11, 20))
+    for query in (rollups.current_week, rollups.closed, lambda: rollups.week(date(2024, 11, 4))):
+        assert_waits_for_update(rollups, query)
+
+
+def test_in_progress_days_follows_jira_wip_statuses():
+    ticket = {
+        "id": "T-1",
+        "status": "Done",
+        "status_changes": [
+            {"status": "In Progress", "changed_at": "2024-11-04"},
+            {"status": "In Review", "changed_at": "2024-11-06"},
+            {"status": "Done", "changed_at": "2024-11-08"},
+            {"status": "Blocked"},  # no timestamp: ignored, as in the Jira analytics
+        ],
+    }
+    week = (date(2024, 11, 4), date(2024, 11, 11))
+    assert in_progress_days(ticket, *week, today=date(2024, 11, 12)) == 4
+    assert in_progress_days(ticket, date(2024, 11, 7), week[1], today=date(2024, 11, 12)) == 1
+    # Without history a ticket has been in its status since creation
+    untracked = {"id": "T-2", "status": "In Progress", "created_at": "2024-11-07"}
+    assert in_progress_days(untracked, *week, today=date(2024, 11, 9)) == 2
+    assert in_progress_days({"id": "T-3", "status": "In Progress"}, *week, today=date(2024, 11, 9)) == 0
@@ -0,0 +1,81 @@
+from datetime import date, datetime, timedelta, timezone
+
+from src.chatbot.calendar_index import CalendarIndex
+
+PST = timezone(timedelta(hours=-8))
+
+
+def event(day: int, start: str, end: str, summary: str, end_day: int = None) -> dict:
+    return {
+        "summary": summary,
+        "start": {"dateTime": f"2024-11-{day:02d}T{start}:00-08:00"},
+        "end": {"dateTime": f"2024-11-{end_day or day:02d}T{end}:00-08:00"},
+    }
+
+
+def at(day: int, hour: int, minute: int = 0) -> datetime:
+    return datetime(2024, 11, day, hour, minute, tzinfo=PST)
+
+
+# Monday November 18 to Sunday November 24, listed out of order
+EVENTS = [
+    event(19, "10:00", "11:00", "Standup"),
+    event(18, "12:00", "13:00", "Design review"),
+    event(18, "09:00", "10:30", "Planning"),
+    event(20, "22:00", "02:00", "Overnight migration", end_day=21),
+    event(23, "10:00", "12:00", "Weekend hack"),
+    event(25, "09:00", "10:00", "Next week"),
+    {"summary": "Offsite", "start": {"date": "2024-11-22"}, "end": {"date": "2024-11-23"}},
+]
+
+
+def test_events_are_sorted_and_localized():
+    index = CalendarIndex(EVENTS)
+    assert len(index) == 7
+    assert index.starts == sorted(index.starts)
+    # All-day events take the calendar's timezone
+    offsite = next(e for e in index.events if e.summary == "Offsite")
+    assert offsite.start == at(22, 0) and offsite.minutes == 24 * 60
+
+
+def test_range_queries():
+    index = CalendarIndex(EVENTS)
+    assert [e.summary for e in index.day(date(2024, 11, 18))] == ["Planning", "Design review"]
+    assert [e.summary for e in index.week(date(2024, 11, 18))] == [
+        "Planning",
+        "Design review",
+        "Standup",
+        "Overnight migration",
+        "Offsite",
+        "Weekend hack",
+    ]
+    # [start, end): an event starting at the end of the range is not in it
+    assert [e.summary for e in index.starting_between(at(18, 9), at(18, 12))] == ["Planning"]
+    # Overlap includes events that started before the range
+    assert [e.summary for e in index.overlapping(at(21, 1), at(21, 9))] == ["Overnight migration"]
+    assert index.overlapping(at(21, 2), at(21, 9)) == []
+    assert index.day(date(2024, 12, 1)) == []
+
+
+def test_free_slots_skip_busy_time_and_weekends():
+    index = CalendarIndex(EVENTS)
+    slots = index.free_slots(date(2024, 11, 18), days=7, min_minutes=120)
+    assert slots == [
+        (at(18, 13), at(18, 18)),
+        (at(19, 11), at(19, 18)),
+        (at(20, 9), at(20, 18)),
+        (at(21, 9), at(21, 18)),
+    ]
+    # Shorter gaps show up with a lower minimum; the all-day offsite leaves Friday without any
+    short = index.free_slots(date(2024, 11, 18), days=5, min_minutes=60)
+    assert (at(18, 10, 30), at(18, 12)) in short
+    assert not [slot for slot in short if slot[0].day == 22]
+    # An event carried over from the day before takes the start of the day
+    assert index.free_slots(date(2024, 11, 21), days=1, workday=(0, 9)) == [(at(21, 2), at(21, 9))]
+
+
+def test_minutes_by_summary():
+    index = CalendarIndex(EVENTS)
+    totals = CalendarIndex.minutes_by(index.day(date(2024, 11, 18)))
+    assert totals == {"Planning": 90, "Design review": 60}
+    assert CalendarIndex.minutes_by(index.week(date(2024, 11, 18)), key=lambda e: "all") == {"all": 90 + 60 + 60 + 240 + 1440 + 120}
@@ -0,0 +1,161 @@
+import threading
+import time
+from typing import Annotated, List
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from typing_extensions import TypedDict
+
+from src.chatbot import checkpointer as checkpointer_module
+from src.chatbot.checkpointer import SqliteCheckpointer
+
+
+class State(TypedDict):
+    messages: Annotated[List[BaseMessage], add_messages]
+
+
+def echo(state: State) -> dict:
+    return {"messages": [AIMessage(content=f"echo {state['messages'][-1].content}")]}
+
+
+def build_graph(saver: SqliteCheckpointer):
+    graph = StateGraph(State)
+    graph.add_node("echo", echo)
+    graph.add_edge(START, "echo")
+    graph.add_edge("echo", END)
+    return graph.compile(checkpointer=saver)
+
+
+def config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def run_turns(graph, thread_id: str, turns: int) -> None:
+    for i in range(turns):
+        graph.invoke({"messages": [HumanMessage(content=f"{thread_id} {i}")]}, config(thread_id))
+
+
+def contents(graph, thread_id: str) -> List[str]:
+    return [m.content for m in graph.get_state(config(thread_id)).values["messages"]]
+
+
+def expected(thread_id: str, turns: int) -> List[str]:
+    return [text for i in range(turns) for text in (f"{thread_id} {i}", f"echo {thread_id} {i}")]
+
+
+def message_blobs(saver: SqliteCheckpointer, thread_id: str) -> list:
+    return saver.conn.execute(
+        "SELECT base_version, depth FROM blobs WHERE thread_id=? AND channel='messages' AND type != 'empty' ORDER BY version",
+        (thread_id,),
+    ).fetchall()
+
+
+def test_history_round_trips_through_a_new_checkpointer(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    run_turns(build_graph(SqliteCheckpointer(path)), "t", 5)
+    graph = build_graph(SqliteCheckpointer(path))
+    assert contents(graph, "t") == expected("t", 5)
+    # The digests are rebuilt from disk, so the next turn is still stored as a delta
+    run_turns(graph, "t", 1)
+    assert contents(graph, "t")[-1] == "echo t 0"
+    assert message_blobs(graph.checkpointer, "t")[-1][0] is not None
+
+
+def test_message_history_is_stored_as_deltas(tmp_path):
+    saver = SqliteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    run_turns(build_graph(saver), "t", 3)
+    blobs = message_blobs(saver, "t")
+    assert blobs[0] == (None, 0)
+    assert all(base is not None for base, _ in blobs[1:])
+    assert [depth for _, depth in blobs] == list(range(len(blobs)))
+
+
+def test_delta_chains_are_cut_by_a_full_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpointer_module, "MAX_DELTA_CHAIN", 3)
+    saver = SqliteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    graph = build_graph(saver)
+    run_turns(graph, "t", 6)
+    depths = [depth for _, depth in message_blobs(saver, "t")]
+    assert max(depths) == 3
+    assert depths.count(0) > 1
+    assert contents(graph, "t") == expected("t", 6)
+
+
+def test_evict_idle_compacts_history_to_the_latest_checkpoint(tmp_path):
+    saver = SqliteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    graph = build_graph(saver)
+    run_turns(graph, "idle", 4)
+    assert len(list(saver.list(config("idle")))) > 1
+    assert saver.evict_idle(ttl=-1) == 1
+    assert len(list(saver.list(config("idle")))) == 1
+    assert contents(graph, "idle") == expected("idle", 4)
+    # The compacted thread carries on from its latest state
+    run_turns(graph, "idle", 1)
+    assert contents(graph, "idle")[-2:] == ["idle 0", "echo idle 0"]
+    # Already compacted threads are left alone
+    assert saver.evict_idle(ttl=3600) == 0
+
+
+def test_delete_thread_removes_its_history(tmp_path):
+    saver = SqliteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    graph = build_graph(saver)
+    run_turns(graph, "gone", 2)
+    run_turns(graph, "kept", 2)
+    saver.delete_thread("gone")
+    assert saver.get_tuple(config("gone")) is None
+    assert contents(graph, "kept") == expected("kept", 2)
+
+
+def test_concurrent_threads_keep_their_own_history(tmp_path):
+    # Every thread is idle to the background compaction, which keeps running alongside the turns
+    saver = SqliteCheckpointer(str(tmp_path / "checkpoints.sqlite"), idle_ttl=0, evict_interval=0.001)
+    graph = build_graph(saver)
+    errors = []
+
+    def session(thread_id):
+        try:
+            run_turns(graph, thread_id, 6)
+        except Exception as error:  # noqa: BLE001 - reported by the assertion below
+            errors.append(error)
+
+    threads = [threading.Thread(target=session, args=(f"t{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+    saver.stop(5)
+    assert errors == []
+    for i in range(8):
+        assert contents(graph, f"t{i}") == expected(f"t{i}", 6)
+
+
+def test_list_does_not_hold_the_lock_while_the_caller_iterates(tmp_path):
+    saver = SqliteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    graph = build_graph(saver)
+    run_turns(graph, "listed", 2)
+    run_turns(graph, "other", 1)
+    checkpoints = saver.list(config("listed"), limit=2)
+    assert next(checkpoints) is not None
+    # Another thread can write while the iterator is suspended mid-way
+    writer = threading.Thread(target=run_turns, args=(graph, "other", 1))
+    writer.start()
+    writer.join(5)
+    assert not writer.is_alive()
+    assert len(list(checkpoints)) == 1
+    assert contents(graph, "other") == expected("other", 1) * 2
+
+
+def test_idle_threads_are_compacted_in_the_background(tmp_path):
+    saver = SqliteCheckpointer(str(tmp_path / "checkpoints.sqlite"), idle_ttl=3600, evict_interval=0.01)
+    graph = build_graph(saver)
+    run_turns(graph, "idle", 3)
+    # Writing checkpoints never compacts; the maintenance thread does once the thread is idle
+    assert len(list(saver.list(config("idle")))) > 1
+    saver.idle_ttl = -1
+    deadline = time.monotonic() + 5
+    while len(list(saver.list(config("idle")))) > 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    saver.stop(5)
+    assert len(list(saver.list(config("idle")))) == 1
+    assert contents(graph, "idle") == expected("idle", 3)
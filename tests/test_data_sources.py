@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from src.chatbot.data_sources import TenantDataSources, UnknownUserError
+
+
+def make_user(directory, employee_id):
+    directory.mkdir(parents=True)
+    (directory / "employee_data.json").write_text(json.dumps({"employee_id": employee_id}))
+
+
+def test_user_dir_serves_users_under_the_root(tmp_path):
+    make_user(tmp_path / "tenants" / "E002", "E002")
+    sources = TenantDataSources(tmp_path / "tenants")
+    assert sources.user_dir("E002") == tmp_path / "tenants" / "E002"
+    assert sources.user_ids() == ["E002"]
+
+
+@pytest.mark.parametrize("employee_id", ["../other", "..", "E002/../../other", "/tmp/other", ".hidden", "", "E 2"])
+def test_user_dir_rejects_ids_outside_the_root(tmp_path, employee_id):
+    make_user(tmp_path / "other", "other")
+    make_user(tmp_path / "tenants" / ".hidden", "hidden")
+    sources = TenantDataSources(tmp_path / "tenants")
+    with pytest.raises(UnknownUserError):
+        sources.user_dir(employee_id)
+    assert not sources.has_user(employee_id)
+
+
+def test_user_dir_rejects_symlinks_out_of_the_root(tmp_path):
+    make_user(tmp_path / "other", "other")
+    (tmp_path / "tenants").mkdir()
+    (tmp_path / "tenants" / "E003").symlink_to(tmp_path / "other")
+    sources = TenantDataSources(tmp_path / "tenants")
+    assert not sources.has_user("E003")
+
+
+def test_partition_must_belong_to_its_user(tmp_path):
+    make_user(tmp_path / "tenants" / "E002", "E002")
+    # E004 is a copy of E002's partition
+    make_user(tmp_path / "tenants" / "E004", "E002")
+    sources = TenantDataSources(tmp_path / "tenants")
+    assert sources.for_user("E002").load("employee_data.json")["employee_id"] == "E002"
+    with pytest.raises(UnknownUserError, match="belongs to 'E002'"):
+        sources.for_user("E004")
+    assert not sources.has_user("E004")
+    assert sources.resident == 1
@@ -0,0 +1,70 @@
+import contextvars
+import threading
+import time
+
+import pytest
+
+from src.chatbot import fan_out as fan_out_module
+from src.chatbot.fan_out import LLM_STAGE_TIMEOUT, fan_out
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def test_stages_run_concurrently_in_the_callers_context():
+    request_id.set("r1")
+    started = time.monotonic()
+    results = fan_out({name: (lambda: (time.sleep(0.2), request_id.get())[1]) for name in "abcd"})
+    assert results == {name: "r1" for name in "abcd"}
+    assert time.monotonic() - started < 0.6
+
+
+def test_failed_or_slow_stages_use_their_default():
+    def fail():
+        raise RuntimeError("down")
+
+    results = fan_out(
+        {"failed": fail, "slow": lambda: time.sleep(1), "fine": lambda: 1},
+        timeouts={"slow": 0.1},
+        defaults={"failed": "none", "slow": "late"},
+    )
+    assert results == {"failed": "none", "slow": "late", "fine": 1}
+
+
+def test_stages_without_a_default_fail_loudly():
+    with pytest.raises(TimeoutError):
+        fan_out({"slow": lambda: time.sleep(1)}, timeouts={"slow": 0.1})
+
+
+def test_timeout_counts_from_when_the_stage_starts():
+    release = threading.Event()
+    busy = [fan_out_module._executor.submit(release.wait, 5) for _ in range(fan_out_module._executor._max_workers)]
+    try:
+        threading.Timer(0.3, release.set).start()
+        # Queued behind the busy workers for longer than its timeout, but quick once it runs
+        assert fan_out({"loader": lambda: "loaded"}, default_timeout=0.2) == {"loader": "loaded"}
+    finally:
+        release.set()
+        for future in busy:
+            future.result()
+
+
+def test_llm_stages_do_not_hold_up_loaders():
+    release = threading.Event()
+    turns = [
+        threading.Thread(
+            target=fan_out,
+            args=({f"llm{i}": (lambda: release.wait(5)) for i in range(8)},),
+            kwargs={"timeouts": {f"llm{i}": LLM_STAGE_TIMEOUT for i in range(8)}},
+        )
+        for _ in range(4)
+    ]
+    for turn in turns:
+        turn.start()
+    try:
+        time.sleep(0.1)
+        # The LLM pool is full; a loader still gets a worker right away
+        assert fan_out({"loader": lambda: "loaded"}, default_timeout=0.5) == {"loader": "loaded"}
+    finally:
+        release.set()
+        for turn in turns:
+            turn.join(10)
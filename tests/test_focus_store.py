@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+from datetime import date
+
+import pytest
+
+from src.chatbot.focus_store import FocusItemStore
+
+MONDAY = date(2024, 11, 18)
+
+
+@pytest.fixture(params=["file", "memory"])
+def store(request, tmp_path):
+    return FocusItemStore(str(tmp_path / "focus_items.sqlite") if request.param == "file" else ":memory:")
+
+
+def test_items_round_trip(store):
+    ids = store.add("E001", MONDAY, ["Review the spec", "  ", "Ship the PR"]).result()
+    assert len(ids) == 2
+    assert [item.text for item in store.open_items("E001")] == ["Review the spec", "Ship the PR"]
+    assert store.set_status("E001", ids[0], "done").result()
+    # Another user's item is left alone
+    assert not store.set_status("E002", ids[1], "done").result()
+    assert [item.text for item in store.open_items("E001")] == ["Ship the PR"]
+    assert store.query("E001", status="done")[0].week_start == MONDAY
+
+
+def test_unknown_status_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.set_status("E001", 1, "archived")
+
+
+def test_digest_changes_with_the_items(store):
+    before = store.digest("E001", "open")
+    store.add("E001", MONDAY, ["Plan the week"]).result()
+    assert store.digest("E001", "open") != before
+    assert store.digest("E002", "open") == store.digest("E003", "open")
+
+
+def test_a_failing_write_only_fails_its_own_future(store):
+    def fail(conn: sqlite3.Connection):
+        raise RuntimeError("bad write")
+
+    good = store.add("E001", MONDAY, ["Kept"])
+    bad = store._submit(fail)
+    store.flush()
+    assert len(good.result()) == 1
+    with pytest.raises(RuntimeError):
+        bad.result()
+    assert [item.text for item in store.open_items("E001")] == ["Kept"]
+
+
+def test_concurrent_writers_all_commit(store):
+    errors = []
+
+    def session(user):
+        try:
+            for i in range(20):
+                store.add(user, MONDAY, [f"{user} item {i}"])
+            store.flush()
+        except Exception as error:  # noqa: BLE001 - reported by the assertion below
+            errors.append(error)
+
+    threads = [threading.Thread(target=session, args=(f"E{i:03d}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    assert errors == []
+    for i in range(8):
+        assert len(store.open_items(f"E{i:03d}")) == 20
+
+
+def test_writes_queued_behind_a_busy_writer_commit_in_one_batch(store):
+    started, release = threading.Event(), threading.Event()
+    store._submit(lambda conn: (started.set(), release.wait(5)))
+    assert started.wait(5)
+    futures = [store.add("E001", MONDAY, [f"item {i}"]) for i in range(50)]
+    batches = store.batches
+    release.set()
+    for future in futures:
+        future.result(5)
+    # The busy writer's own batch, then one for everything that queued behind it
+    assert store.batches == batches + 2
+    assert len(store.open_items("E001")) == 50
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import pytest
+
+from src.chatbot.github_sync import SEARCH_RESULT_CAP, GithubPRSync, GithubSyncScheduler, RateLimited
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_pr(i: int, updated_seconds: int) -> dict:
+    stamp = (BASE + timedelta(seconds=updated_seconds)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {
+        "title": f"PR {i}",
+        "created_at": "2024-01-01T00:00:00Z",
+        "closed_at": None,
+        "updated_at": stamp,
+        "state": "open",
+        "html_url": f"https://github.com/o/r/pull/{i}",
+        "body": "",
+        "comments": 0,
+    }
+
+
+class StubGithub:
+    """A local stand-in for Github's /search/issues: `updated:>=` filter, pages with Link headers,
+    ETags, the 1000 result cap and a switchable rate limit."""
+
+    def __init__(self):
+        self.prs = {}
+        self.requests = []
+        self.rate_limited_until = None
+        self.fail_on_page = None
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.handle(self)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def add(self, i: int, updated_seconds: int) -> None:
+        self.prs[i] = make_pr(i, updated_seconds)
+
+    def handle(self, handler: BaseHTTPRequestHandler) -> None:
+        url = urlparse(handler.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        page, per_page = int(params.get("page", 1)), int(params["per_page"])
+        self.requests.append({"q": params["q"], "page": page, "if_none_match": handler.headers.get("If-None-Match")})
+        if self.rate_limited_until is not None:
+            return self.send(handler, 403, {"message": "rate limited"}, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(self.rate_limited_until)})
+        if self.fail_on_page == page:
+            return self.send(handler, 500, {"message": "boom"})
+        if (page - 1) * per_page >= SEARCH_RESULT_CAP:
+            return self.send(handler, 422, {"message": "Only the first 1000 search results are available"})
+        since = next((term.split(">=", 1)[1] for term in params["q"].split() if term.startswith("updated:>=")), "")
+        matching = sorted((pr for pr in self.prs.values() if pr["updated_at"] >= since), key=lambda pr: pr["updated_at"])
+        items = matching[(page - 1) * per_page : page * per_page]
+        body = {"total_count": len(matching), "items": items}
+        etag = '"' + hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+        if page == 1 and handler.headers.get("If-None-Match") == etag:
+            return self.send(handler, 304, None, {"ETag": etag})
+        headers = {"ETag": etag}
+        # Like Github, keeps offering a next page past the cap
+        if page * per_page < len(matching):
+            headers["Link"] = f'<{self.url}{url.path}?{urlencode({**params, "page": page + 1})}>; rel="next"'
+        self.send(handler, 200, body, headers)
+
+    @staticmethod
+    def send(handler, status, body, headers=None):
+        handler.send_response(status)
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        data = json.dumps(body).encode() if body is not None else b""
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+@pytest.fixture
+def stub():
+    server = StubGithub()
+    yield server
+    server.server.shutdown()
+
+
+def make_sync(stub, tmp_path, per_page=100) -> GithubPRSync:
+    return GithubPRSync(
+        token="test",
+        repo="o/r",
+        author="ada",
+        store_path=tmp_path / "github_prs_results.json",
+        state_path=tmp_path / "state" / "E001.json",
+        base_url=stub.url,
+        per_page=per_page,
+    )
+
+
+def stored(tmp_path) -> list:
+    return json.loads((tmp_path / "github_prs_results.json").read_text())
+
+
+def cursor(tmp_path) -> str:
+    return json.loads((tmp_path / "state" / "E001.json").read_text())["cursor"]
+
+
+def test_first_sync_follows_pages_and_advances_the_cursor(stub, tmp_path):
+    for i in range(250):
+        stub.add(i, i)
+    result = make_sync(stub, tmp_path).sync_once()
+    assert (result.pages, result.fetched, result.changed) == (3, 250, 250)
+    assert len(stored(tmp_path)) == 250
+    assert cursor(tmp_path) == make_pr(249, 249)["updated_at"]
+
+
+def test_unchanged_results_cost_a_304(stub, tmp_path):
+    for i in range(10):
+        stub.add(i, i)
+    sync = make_sync(stub, tmp_path)
+    sync.sync_once()
+    # The cursor moved, so the first resync is a new query; the one after can be conditional
+    assert not sync.sync_once().not_modified
+    assert sync.sync_once().not_modified
+    assert stub.requests[-1]["if_none_match"]
+
+
+def test_only_prs_updated_since_the_cursor_are_fetched(stub, tmp_path):
+    for i in range(50):
+        stub.add(i, i)
+    sync = make_sync(stub, tmp_path)
+    sync.sync_once()
+    stub.add(3, 1000)
+    result = sync.sync_once()
+    # The PR at the (inclusive) cursor and the updated one
+    assert result.fetched == 2
+    assert result.changed == 1
+    assert cursor(tmp_path) == make_pr(3, 1000)["updated_at"]
+    updated = {pr["html_url"]: pr["updated_at"] for pr in stored(tmp_path)}
+    assert updated["https://github.com/o/r/pull/3"] == "2024-01-01 00:16:40+00:00"
+
+
+def test_histories_past_the_search_cap_are_walked_in_windows(stub, tmp_path):
+    for i in range(2500):
+        stub.add(i, i)
+    result = make_sync(stub, tmp_path).sync_once()
+    assert len(stored(tmp_path)) == 2500
+    assert result.changed == 2500
+    assert all(request["page"] <= SEARCH_RESULT_CAP // 100 for request in stub.requests)
+    assert len({request["q"] for request in stub.requests}) == 3
+
+
+def test_an_interrupted_sync_resumes_from_the_last_page(stub, tmp_path):
+    for i in range(300):
+        stub.add(i, i)
+    sync = make_sync(stub, tmp_path)
+    stub.fail_on_page = 3
+    with pytest.raises(Exception):
+        sync.sync_once()
+    assert len(stored(tmp_path)) == 200
+    assert cursor(tmp_path) == make_pr(199, 199)["updated_at"]
+    stub.fail_on_page = None
+    stub.requests.clear()
+    sync.sync_once()
+    assert len(stored(tmp_path)) == 300
+    assert stub.requests[0]["q"].endswith(f"updated:>={make_pr(199, 199)['updated_at']}")
+
+
+def test_rate_limit_raises_and_the_scheduler_backs_off_until_the_reset(stub, tmp_path):
+    stub.add(1, 1)
+    sync = make_sync(stub, tmp_path)
+    stub.rate_limited_until = time.time() + 120
+    with pytest.raises(RateLimited):
+        sync.sync_once()
+    scheduler = GithubSyncScheduler({"E001": sync, "E002": make_sync(stub, tmp_path / "other")}, interval=5)
+    wait = scheduler.run_round()
+    assert 100 < wait <= 120
+    # The round stopped at the first rate limited user
+    assert list(scheduler.last_errors) == ["E001"]
+    stub.rate_limited_until = None
+    assert scheduler.run_round() == 5
+    assert set(scheduler.last_results) == {"E001", "E002"}
+    assert scheduler.last_errors == {}
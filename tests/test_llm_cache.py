@@ -0,0 +1,151 @@
+import threading
+import time
+from typing import Any, List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.chatbot.llm_cache import DEFAULT_SCOPE, CachedChatModel, cache_scope
+
+
+class CountingModel(BaseChatModel):
+    """Answers with the number of calls so far, optionally after a delay."""
+
+    calls: int = 0
+    delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting"
+
+    def _generate(self, messages: List[Any], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.delay)
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"answer {self.calls}"))])
+
+
+def cached(tmp_path, model, **kwargs):
+    return CachedChatModel(model, str(tmp_path / "llm_cache.sqlite"), **kwargs)
+
+
+def test_identical_requests_are_served_from_the_cache(tmp_path):
+    model = CountingModel()
+    llm = cached(tmp_path, model)
+    assert llm.invoke("hi").content == "answer 1"
+    assert llm.invoke("hi").content == "answer 1"
+    assert llm.invoke("other").content == "answer 2"
+    assert model.calls == 2
+    assert llm.stats.memory_hits == 1
+
+
+def test_scope_is_named_by_the_call_site(tmp_path):
+    model = CountingModel()
+    llm = cached(tmp_path, model, ttls={"rethink": 0})
+    llm.invoke("hi", config=cache_scope("rethink"))
+    llm.invoke("hi", config=cache_scope("rethink"))
+    assert model.calls == 2
+    assert llm.stats_by_scope["rethink"].uncached == 2
+    # Without a scope the call is cached under the default scope, whatever the caller is named
+    llm.invoke("hi")
+    llm.invoke("hi")
+    assert model.calls == 3
+    assert llm.stats_by_scope[DEFAULT_SCOPE].memory_hits == 1
+
+
+def test_entries_survive_a_new_process(tmp_path):
+    cached(tmp_path, CountingModel()).invoke("hi")
+    model = CountingModel()
+    llm = cached(tmp_path, model)
+    assert llm.invoke("hi").content == "answer 1"
+    assert model.calls == 0
+    assert llm.stats.disk_hits == 1
+
+
+def test_expired_entries_are_regenerated(tmp_path):
+    model = CountingModel()
+    llm = cached(tmp_path, model, ttls={"short": 0.05})
+    llm.invoke("hi", config=cache_scope("short"))
+    time.sleep(0.1)
+    llm.invoke("hi", config=cache_scope("short"))
+    assert model.calls == 2
+    time.sleep(0.1)
+    assert llm.evict_expired() == 1
+
+
+def test_concurrent_identical_requests_call_the_model_once(tmp_path):
+    model = CountingModel(delay=0.2)
+    llm = cached(tmp_path, model)
+    answers = []
+    threads = [threading.Thread(target=lambda: answers.append(llm.invoke("hi").content)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert answers == ["answer 1"] * 8
+    assert model.calls == 1
+    assert llm.stats.misses == 1
+    assert llm.stats.inflight_joins == 7
+
+
+def test_a_failed_call_fails_its_waiters_and_is_not_cached(tmp_path):
+    class FailingModel(CountingModel):
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(0.2)
+            self.calls += 1
+            raise RuntimeError("model down")
+
+    model = FailingModel()
+    llm = cached(tmp_path, model)
+    errors = []
+
+    def call():
+        try:
+            llm.invoke("hi")
+        except RuntimeError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(errors) == 4
+    assert model.calls == 1
+    assert llm._inflight == {}
+
+
+def test_sqlite_tier_is_opened_on_first_use(tmp_path):
+    llm = cached(tmp_path, CountingModel())
+    assert not (tmp_path / "llm_cache.sqlite").exists()
+    llm.invoke("hi")
+    assert (tmp_path / "llm_cache.sqlite").exists()
+
+
+def test_calls_to_the_model_are_bounded(tmp_path):
+    class ConcurrencyModel(CountingModel):
+        running: int = 0
+        peak: int = 0
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            try:
+                return super()._generate(messages, stop, run_manager, **kwargs)
+            finally:
+                self.running -= 1
+
+    model = ConcurrencyModel(delay=0.1)
+    llm = cached(tmp_path, model, ttls={"uncached": 0}, max_concurrent=2)
+    threads = [threading.Thread(target=llm.invoke, args=(f"prompt {i}",)) for i in range(4)]
+    threads += [threading.Thread(target=llm.invoke, args=("hi",), kwargs={"config": cache_scope("uncached")}) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    assert llm.upstream_active == 2
+    assert llm.upstream_waiting == 4
+    for thread in threads:
+        thread.join(10)
+    assert model.calls == 6
+    assert model.peak == 2
+    assert llm.upstream_active == llm.upstream_waiting == 0
@@ -0,0 +1,60 @@
+from src.chatbot.context import count_tokens
+from src.chatbot.prompt_context import PromptContext, outline, tsv
+
+
+def numbered(prefix: str, count: int) -> str:
+    return "\n".join(f"{prefix} line {i} with a few more words in it" for i in range(count))
+
+
+def test_context_within_budget_is_rendered_whole():
+    context = PromptContext("test", budget=10_000).add("Notes", numbered("note", 5))
+    assert context.render() == "- Notes:\n" + numbered("note", 5)
+    assert context.sections[0].trimmed == 0
+
+
+def test_least_important_sections_are_trimmed_first():
+    context = (
+        PromptContext("test", budget=150)
+        .add("Goals", numbered("goal", 10), priority=0)
+        .add("Events", numbered("event", 10), priority=1)
+        .add("Updates", numbered("update", 10), priority=2)
+    )
+    full = context.token_counts()
+    context.render()
+    goals, events, updates = context.sections
+    assert sum(context.token_counts().values()) <= 150
+    # Priority 0 is never trimmed, and priority 1 only once priority 2 is exhausted
+    assert goals.trimmed == 0 and context.token_counts()["Goals"] == full["Goals"]
+    assert updates.trimmed == 10 and events.trimmed > 0
+    # Lines go from the end, so what is left is the head of the section
+    assert events.lines == numbered("event", 10).splitlines()[: 10 - events.trimmed]
+    assert events.render().endswith(f"... ({events.trimmed} more lines trimmed)")
+
+
+def test_equal_priorities_trim_the_later_section_first():
+    context = PromptContext("test", budget=0).add("First", numbered("a", 8)).add("Second", numbered("b", 8))
+    counts = context.token_counts()
+    # Room for the first section and half of the second
+    context.budget = counts["First"] + counts["Second"] // 2
+    context.render()
+    first, second = context.sections
+    assert first.trimmed == 0
+    assert 0 < second.trimmed < 8
+
+
+def test_tables_keep_their_header():
+    rows = [{"id": f"T-{i}", "title": f"Ticket number {i} with a long title"} for i in range(50)]
+    context = PromptContext("test", budget=60).add_table("Tickets", rows, ("id", "title"))
+    rendered = context.render()
+    table = context.sections[0]
+    assert table.lines[0] == "id\ttitle"
+    assert table.trimmed > 0 and len(table.lines) == 51 - table.trimmed
+    assert rendered.startswith("- Tickets:\nid\ttitle\nT-0\t")
+    assert count_tokens(rendered) <= 60 + count_tokens(f"... ({table.trimmed} more lines trimmed)") + 1
+
+
+def test_compact_serializations():
+    rows = [{"id": 1, "tags": ["a", "b"], "note": "two\n words"}, {"id": 1, "tags": ["a", "b"], "note": "two words"}]
+    assert tsv(rows, ("id", "tags", "note")) == "id\ttags\tnote\n1\ta, b\ttwo words"
+    value = {"name": "Ada", "empty": "", "none": None, "team": {"lead": "Grace", "members": ["x", "x", "y"]}}
+    assert outline(value) == "name: Ada\nteam:\n  lead: Grace\n  members:\n    - x\n    - y"
@@ -0,0 +1,90 @@
+import json
+import shutil
+from pathlib import Path
+
+from src.chatbot import tools
+from src.chatbot.context import count_tokens
+from src.chatbot.data_sources import TenantDataSources, use_user
+from src.chatbot.retrieval import chunk_sections, fts_query, markdown_sections, open_index
+
+MOCKS_DIR = Path(tools.__file__).resolve().parent.parent / "mocks"
+
+DOCUMENTS = {
+    "guide": [
+        ("Writing design docs", "A design doc states the problem, the options and the decision."),
+        ("Mentoring", "Pair with junior engineers and review their design docs early."),
+        ("On call", "Keep the pager quiet by fixing flaky alerts."),
+    ],
+    "spec": [
+        ("Rollout", "The rollout is staged behind a feature flag."),
+        ("Alerts", "Alerts page the on call engineer when the error rate doubles."),
+    ],
+}
+
+
+def build(tmp_path, fingerprint="v1", documents=DOCUMENTS):
+    # BM25 only, so the rankings below don't depend on numpy
+    return open_index(tmp_path, fingerprint, lambda: documents, embeddings=False)
+
+
+def test_bm25_ranks_title_matches_first(tmp_path):
+    index = build(tmp_path)
+    assert [p.title for p in index.search("design docs", k=2)] == ["Writing design docs", "Mentoring"]
+    assert [p.title for p in index.search("alerts", k=2)] == ["Alerts", "On call"]
+    # Porter stemming: "mentor" matches "Mentoring"
+    assert index.search("mentor", k=1)[0].title == "Mentoring"
+
+
+def test_search_is_limited_to_the_given_sources(tmp_path):
+    index = build(tmp_path)
+    assert [p.source for p in index.search("alerts on call", k=4, sources=["spec"])] == ["spec"]
+    assert index.search("nothing matches this", k=4) == []
+    # User text can't inject FTS syntax
+    assert fts_query('alerts" OR NEAR(') == '"alerts" OR "or" OR "near"'
+    assert index.search('alerts" OR NEAR(', k=1)[0].title == "Alerts"
+
+
+def test_chunks_stay_within_their_section_and_budget():
+    text = "# Intro\n" + "\n".join(f"Sentence number {i} about staff engineering." for i in range(60)) + "\n# Outro\nThe end."
+    chunks = chunk_sections(markdown_sections(text, "Guide"), max_tokens=50)
+    assert {title for title, _ in chunks} == {"Intro", "Outro"}
+    assert all(count_tokens(chunk) <= 50 for _, chunk in chunks)
+    assert chunks[-1] == ("Outro", "The end.")
+
+
+def test_an_index_is_built_once_per_fingerprint(tmp_path):
+    first = build(tmp_path)
+    # Same fingerprint: the existing index is opened, the documents aren't even read
+    reopened = open_index(tmp_path, "v1", lambda: 1 / 0, embeddings=False)
+    assert reopened.directory == first.directory and reopened.size == first.size
+    changed = build(tmp_path, "v2", {"guide": [("Only", "One passage.")]})
+    assert changed.size == 1 and first.size == 5
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["v1", "v2"]
+
+
+def copy_mocks(directory: Path, employee_id: str) -> None:
+    shutil.copytree(MOCKS_DIR, directory, ignore=shutil.ignore_patterns("__pycache__"))
+    employee = json.loads((directory / "employee_data.json").read_text())
+    (directory / "employee_data.json").write_text(json.dumps({**employee, "employee_id": employee_id}))
+
+
+def test_the_index_is_rebuilt_when_its_documents_change(tmp_path, monkeypatch):
+    copy_mocks(tmp_path / "E900", "E900")
+    copy_mocks(tmp_path / "E901", "E901")
+    monkeypatch.setattr(tools, "data_sources", TenantDataSources(tmp_path))
+
+    with use_user("E900"):
+        index = tools.get_retrieval_index()
+        assert tools.get_retrieval_index() is index
+        assert not any("quokka" in p.text for p in index.search("quokka"))
+
+        spec = json.loads((tmp_path / "E900" / "tech_spec.json").read_text())
+        spec["content"] += "\n\n# Mascot\nThe project mascot is a quokka."
+        (tmp_path / "E900" / "tech_spec.json").write_text(json.dumps(spec))
+        rebuilt = tools.get_retrieval_index()
+        assert rebuilt.directory != index.directory
+        assert rebuilt.search("quokka", k=1)[0].title == "Mascot"
+
+    # A user whose documents are identical shares the index
+    with use_user("E901"):
+        assert tools.get_retrieval_index().directory == index.directory
@@ -0,0 +1,86 @@
+import pytest
+
+from src.chatbot.router import DEFAULT_ROUTE, Router, normalize
+
+
+class Classifier:
+    def __init__(self, answer: str):
+        self.answer = answer
+        self.calls = []
+
+    def __call__(self, message: str) -> str:
+        self.calls.append(message)
+        return self.answer
+
+
+@pytest.mark.parametrize(
+    "message, route",
+    [
+        ("Can you zoom out on my career?", "chatbot"),
+        ("How are my PRs doing", "chatbot"),
+        ("Give me an in-depth synthesis", "create_synthesis_of_week"),
+        ("What's on my calendar?", "cal_sum"),
+    ],
+)
+def test_unambiguous_keywords_decide_the_route(message, route):
+    classifier = Classifier("chatbot")
+    decision = Router(classifier).route(message)
+    assert (decision.route, decision.tier) == (route, "keyword")
+    assert classifier.calls == []
+
+
+def test_examples_decide_when_keywords_do_not():
+    classifier = Classifier("chatbot")
+    router = Router(classifier)
+    # Both the synthesis and the calendar rules fire, so the keyword tier passes
+    decision = router.route("Synthesize the meetings of my week")
+    assert (decision.route, decision.tier) == ("create_synthesis_of_week", "bow")
+    assert decision.score >= router.min_score
+    assert classifier.calls == []
+
+
+def test_close_scores_are_left_to_the_llm():
+    classifier = Classifier("cal_sum")
+    router = Router(classifier)
+    (best, route), (second, _) = router.scores(normalize("show me my schedule for the week"))[:2]
+    assert route == "cal_sum" and best >= router.min_score and best - second < router.min_margin
+    decision = router.route("show me my schedule for the week")
+    assert (decision.route, decision.tier) == ("cal_sum", "llm")
+
+
+def test_empty_messages_go_to_the_default_route():
+    classifier = Classifier("cal_sum")
+    decision = Router(classifier).route("  ?! ")
+    assert (decision.route, decision.tier) == (DEFAULT_ROUTE, "empty")
+    assert classifier.calls == []
+
+
+def test_undecided_messages_ask_the_llm_once_per_normalized_message():
+    classifier = Classifier('"Create_Synthesis_Of_Week"\n')
+    router = Router(classifier)
+    first = router.route("Hmm, not sure where to begin")
+    assert (first.route, first.tier) == ("create_synthesis_of_week", "llm")
+    # Same words, other case and punctuation: served from the cache
+    again = router.route("hmm... NOT sure where to begin!")
+    assert (again.route, again.tier) == ("create_synthesis_of_week", "llm_cache")
+    assert classifier.calls == ["Hmm, not sure where to begin"]
+    assert router.tier_counts["llm"] == 1 and router.tier_counts["llm_cache"] == 1
+
+
+def test_unknown_llm_answers_fall_back_to_the_default_route():
+    router = Router(Classifier("the calendar node"))
+    assert router.route("Hmm, not sure where to begin").route == DEFAULT_ROUTE
+    # Without a classifier the default route is taken, and cached like an answer
+    router = Router()
+    assert router.route("Hmm, not sure where to begin").route == DEFAULT_ROUTE
+    assert router.route("hmm not sure where to begin").tier == "llm_cache"
+
+
+def test_llm_cache_is_bounded():
+    classifier = Classifier("chatbot")
+    router = Router(classifier, cache_size=2)
+    for message in ("hmm one", "hmm two", "hmm three", "hmm one"):
+        assert router.route(message).tier == "llm"
+    assert list(router._llm_cache) == [normalize("hmm three"), normalize("hmm one")]
+    assert router.route("hmm three").tier == "llm_cache"
+    assert len(classifier.calls) == 4
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+from src import server
+
+
+def test_stream_releases_turn_when_client_leaves_before_the_body():
+    async def scenario():
+        session = server.Session("disconnected", "E001")
+        server.sessions[session.thread_id] = session
+        response = await server.stream_message(session.thread_id, server.MessageRequest(content="hi"))
+        assert session.lock.locked()
+        assert server.limiter.active == 1
+
+        async def send(message):
+            raise OSError("client gone")
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        with pytest.raises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        assert not session.lock.locked()
+        assert server.limiter.active == 0
+        server.sessions.pop(session.thread_id)
+
+    asyncio.run(scenario())
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from src.chatbot.speculation import Speculator
+
+
+def run_with_timeout(fn, timeout=5):
+    """Runs fn in a thread and fails the test if it hangs (a deadlock would otherwise hang pytest)."""
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", fn()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "call did not return"
+    return result.get("value")
+
+
+def test_take_returns_result_and_discards_other_nodes():
+    speculator = Speculator(max_inflight=2)
+    assert speculator.start("t", "a", lambda: 1)
+    assert speculator.start("t", "b", lambda: 2)
+    assert speculator.take("t", "a") == (True, 1)
+    assert speculator.take("t", "b") == (False, None)
+    assert speculator.stats.hits == 1
+    assert speculator.stats.discarded == 1
+    assert speculator.stats.misses == 1
+
+
+def test_start_is_skipped_over_budget():
+    speculator = Speculator(max_inflight=1)
+    release = threading.Event()
+    assert speculator.start("t1", "a", release.wait)
+    assert not speculator.start("t2", "a", lambda: 1)
+    assert speculator.stats.skipped == 1
+    release.set()
+    assert speculator.take("t1", "a") == (True, True)
+
+
+def test_disabled_speculator_starts_nothing():
+    speculator = Speculator(max_inflight=0)
+    assert not speculator.start("t", "a", lambda: 1)
+    assert speculator.take("t", "a") == (False, None)
+
+
+def test_failed_speculation_is_a_miss():
+    speculator = Speculator(max_inflight=1)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    speculator.start("t", "a", fail)
+    assert speculator.take("t", "a") == (False, None)
+    assert speculator.stats.failed == 1
+    assert speculator.stats.misses == 1
+
+
+def test_expiring_a_queued_speculation_does_not_deadlock():
+    speculator = Speculator(max_inflight=2, ttl=0)
+    release = threading.Event()
+    # Occupy both workers so the next speculation stays queued
+    blockers = [speculator._executor.submit(release.wait) for _ in range(2)]
+    try:
+        assert speculator.start("t1", "a", lambda: 1)
+        time.sleep(0.01)
+        # Expires t1's queued speculation, whose cancel runs the done callback synchronously
+        run_with_timeout(lambda: speculator.start("t2", "a", lambda: 2))
+        assert speculator.stats.discarded == 1
+        run_with_timeout(lambda: speculator.discard("t2"))
+    finally:
+        release.set()
+        for blocker in blockers:
+            blocker.result()
+    assert speculator.inflight == 0
+
+
+def test_concurrent_starts_and_takes_keep_inflight_consistent():
+    speculator = Speculator(max_inflight=4, ttl=600)
+
+    def turn(i):
+        thread_id = f"t{i % 8}"
+        speculator.start(thread_id, "a", lambda: i)
+        speculator.start(thread_id, "b", lambda: i)
+        speculator.take(thread_id, "a" if i % 2 else "b")
+
+    threads = [threading.Thread(target=turn, args=(i,)) for i in range(64)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    for i in range(8):
+        speculator.discard(f"t{i}")
+    deadline = time.monotonic() + 5
+    while speculator.inflight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert speculator.inflight == 0
+    # Every speculation started was either used or discarded
+    assert speculator.stats.started == speculator.stats.hits + speculator.stats.discarded
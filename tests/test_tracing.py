@@ -0,0 +1,108 @@
+import json
+from typing import Any, List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langgraph.graph import START, MessagesState, StateGraph
+from langgraph.prebuilt import ToolNode, tools_condition
+
+from src.chatbot.llm_cache import CachedChatModel, cache_scope
+from src.chatbot.tracing import JsonlExporter, build_tracer, install
+
+
+class ToolCallingModel(BaseChatModel):
+    """Calls the `lookup` tool once, then answers."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "tool-calling"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages: List[Any], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if isinstance(messages[-1], ToolMessage):
+            message = AIMessage(content=f"Answer from {messages[-1].content}")
+        else:
+            message = AIMessage(content="", tool_calls=[{"name": "lookup", "args": {"topic": "goals"}, "id": "call-1"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class SummaryModel(BaseChatModel):
+    @property
+    def _llm_type(self) -> str:
+        return "summary"
+
+    def _generate(self, messages: List[Any], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="a short summary"))])
+
+
+def build_graph(tmp_path):
+    summarizer = CachedChatModel(SummaryModel(), str(tmp_path / "llm_cache.sqlite"))
+
+    @tool
+    def lookup(topic: str) -> str:
+        """Looks up a topic."""
+        # The second, identical call is a cache hit
+        for _ in range(2):
+            summary = summarizer.invoke(f"Summarize {topic}", config=cache_scope("lookup_summary")).content
+        return summary
+
+    model = ToolCallingModel().bind_tools([lookup])
+
+    def agent(state: MessagesState) -> dict:
+        return {"messages": [model.invoke(state["messages"])]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("agent", agent)
+    graph.add_node("tools", ToolNode([lookup]))
+    graph.add_edge(START, "agent")
+    graph.add_conditional_edges("agent", tools_condition)
+    graph.add_edge("tools", "agent")
+    return graph.compile()
+
+
+def test_install_keeps_the_first_tracer():
+    tracer = install(build_tracer())
+    assert install(build_tracer()) is tracer
+
+
+def test_spans_of_a_tool_calling_turn(tmp_path):
+    tracer = install(build_tracer())
+    exporter = JsonlExporter(str(tmp_path / "trace.jsonl"))
+    tracer.exporters.append(exporter)
+    try:
+        result = build_graph(tmp_path).invoke({"messages": [HumanMessage(content="What are my goals?")]})
+    finally:
+        tracer.exporters.remove(exporter)
+    assert result["messages"][-1].content == "Answer from a short summary"
+
+    spans = [json.loads(line) for line in (tmp_path / "trace.jsonl").read_text().splitlines()]
+    assert len({span["trace_id"] for span in spans}) == 1
+    by_id = {span["span_id"]: span for span in spans}
+
+    def named(kind, name):
+        return [span for span in spans if span["kind"] == kind and span["name"] == name]
+
+    agent_nodes, (tools_node,), (lookup,) = named("node", "agent"), named("node", "tools"), named("tool", "lookup")
+    assert len(agent_nodes) == 2
+    assert lookup["parent_id"] == tools_node["span_id"]
+    assert lookup["attrs"]["bytes_out"] == len("a short summary")
+
+    # The agent's chat model calls are named after their node, the tool's after its cache scope
+    agent_calls = named("llm", "agent")
+    assert len(agent_calls) == 2
+    assert {by_id[call["parent_id"]]["name"] for call in agent_calls} == {"agent"}
+    summaries = named("llm", "lookup_summary")
+    assert [s["attrs"]["cache"] for s in summaries] == ["misses", "memory_hits"]
+    assert all(s["parent_id"] == lookup["span_id"] for s in summaries)
+    assert all(s["attrs"]["prompt_tokens"] > 0 and s["attrs"]["completion_tokens"] > 0 for s in summaries)
+
+    metrics = tracer.render_prometheus()
+    assert 'coach_llm_calls_total{name="lookup_summary",cache="misses"} 1' in metrics
+    assert 'coach_llm_calls_total{name="lookup_summary",cache="memory_hits"} 1' in metrics
+    assert 'coach_span_duration_seconds_bucket{kind="tool",name="lookup",le="+Inf"} 1' in metrics
+    assert 'coach_span_duration_seconds_count{kind="node",name="agent"} 2' in metrics
+    assert "# TYPE coach_span_duration_seconds histogram" in metrics